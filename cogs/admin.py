@@ -3,12 +3,14 @@ from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
 import time
-import aiosqlite
 import os
 import sys
 import aiohttp
-from io import BytesIO
-from PIL import Image
+from utils.db import get_db
+from utils.profiler import profiler
+from utils.query_audit import audit_query_plans
+from utils.render import render, EmojiResizeJob
+from utils.message_pipeline import pipeline
 
 # ========================
 # CONFIG
@@ -18,19 +20,6 @@ DM_DELAY = 2
 START_TIME = time.time()
 
 
-# ========================
-# IMAGE RESIZE HELPER
-# ========================
-def resize_emoji(image_bytes: bytes) -> bytes:
-    with Image.open(BytesIO(image_bytes)) as img:
-        img = img.convert("RGBA")
-        img.thumbnail((128, 128))
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        return buffer.read()
-
-
 # ========================
 # CONFIRM VIEW
 # ========================
@@ -86,7 +75,6 @@ class SelfRoleView(discord.ui.View):
 class Admin(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.bot.loop.create_task(self.setup_db())
         self.auto_delete_dms.start()
 
     def cog_unload(self):
@@ -95,23 +83,11 @@ class Admin(commands.Cog):
     # ========================
     # DATABASE
     # ========================
-    async def setup_db(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-            """)
-            await db.commit()
-
     async def is_dm_autoclean_enabled(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            cur = await db.execute(
-                "SELECT value FROM settings WHERE key='dm_autoclean'"
-            )
-            row = await cur.fetchone()
-            return row and row[0] == "on"
+        row = await get_db(DB_NAME).fetchone(
+            "SELECT value FROM settings WHERE key='dm_autoclean'"
+        )
+        return row and row[0] == "on"
 
     # ========================
     # AUTO DELETE DMS
@@ -268,7 +244,7 @@ class Admin(commands.Cog):
                     async with session.get(url) as resp:
                         image_bytes = await resp.read()
 
-            image_bytes = resize_emoji(image_bytes)
+            image_bytes = await render.submit(EmojiResizeJob(image_bytes))
             new_emoji = await interaction.guild.create_custom_emoji(name=name, image=image_bytes)
             await interaction.followup.send(f"✅ Emoji added: {new_emoji}", ephemeral=True)
 
@@ -276,6 +252,96 @@ class Admin(commands.Cog):
             print("Addemoji error:", e)
             await interaction.followup.send("❌ Failed to add emoji.", ephemeral=True)
 
+    # ========================
+    # DATABASE PROFILER
+    # ========================
+    @app_commands.command(name="db_profile", description="Show database query stats")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_profile(self, interaction: discord.Interaction, top: int = 10, dump: bool = False):
+        await interaction.response.defer(ephemeral=True)
+
+        rows = profiler.top(limit=max(1, min(top, 20)))
+        embed = discord.Embed(title="🗄 Database Profile", color=discord.Color.blurple())
+
+        for r in rows:
+            embed.add_field(
+                name=f"{r['db']} • {r['count']}x • {r['total_ms']:.0f}ms total",
+                value=(
+                    f"p50 `{r['p50_ms']}ms` • p99 `{r['p99_ms']}ms` • rows `{r['rows']}`\n"
+                    f"```sql\n{r['sql'][:180]}```"
+                ),
+                inline=False
+            )
+
+        locks = "\n".join(
+            f"{path}: {s.count} waits, avg {s.total / s.count * 1000:.2f}ms, max {s.max * 1000:.1f}ms"
+            for path, s in profiler.lock_waits.items() if s.count
+        ) or "No writer lock waits recorded"
+        embed.add_field(name="🔒 Writer lock", value=locks, inline=False)
+        embed.set_footer(
+            text=f"Slow threshold {profiler.slow_ms:.0f}ms • {len(profiler.slow_log)} slow queries logged"
+        )
+
+        file = None
+        if dump:
+            path = profiler.dump()
+            file = discord.File(path, filename=os.path.basename(path))
+
+        if file:
+            await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+        else:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="db_profile_reset", description="Reset database query stats")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_profile_reset(self, interaction: discord.Interaction):
+        profiler.reset()
+        await interaction.response.send_message("🧹 Database profile reset", ephemeral=True)
+
+    @app_commands.command(name="db_audit", description="Check query plans for full-table scans")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_audit(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        results = await audit_query_plans()
+        flagged = [r for r in results if r["scans"]]
+
+        embed = discord.Embed(
+            title="🔎 Query Plan Audit",
+            description=f"{len(results) - len(flagged)}/{len(results)} known queries are index-backed",
+            color=discord.Color.red() if flagged else discord.Color.green()
+        )
+        for r in flagged[:20]:
+            embed.add_field(
+                name=f"⚠ {r['label']} ({r['db']})",
+                value="\n".join(f"`{step}`" for step in r["plan"])[:1024],
+                inline=False
+            )
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    # ========================
+    # MESSAGE PIPELINE STATS
+    # ========================
+    @app_commands.command(name="pipeline_stats", description="Show per-stage chat message timings")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def pipeline_stats(self, interaction: discord.Interaction, reset: bool = False):
+        embed = discord.Embed(
+            title="📨 Message Pipeline",
+            description=f"{pipeline.messages} messages since last reset",
+            color=discord.Color.blurple()
+        )
+        for s in pipeline.snapshot():
+            embed.add_field(
+                name=f"{s['order']:>2} • {s['name']}",
+                value=f"{s['calls']} calls • avg `{s['avg_us']}µs` • max `{s['max_ms']}ms` • errors `{s['errors']}`",
+                inline=False
+            )
+
+        if reset:
+            pipeline.reset()
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     # ========================
     # SERVER TOOLS
     # ========================
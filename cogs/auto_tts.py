@@ -1,35 +1,42 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from gtts import gTTS
-from langdetect import detect
-import asyncio
-import os
 import re
-import time
+from utils.message_pipeline import pipeline, ORDER_TTS
+from utils.cooldowns import Cooldown, TokenBucket
+from utils.tts_player import GuildPlayer
+from utils.tts_cache import clip_cache
+from utils import tts
+from utils.voice_connections import connections
+from utils.lang_detect import detect_lang
 
-TTS_FILE = "auto_tts.mp3"
 MAX_WORDS = 10
 COOLDOWN = 5
+GUILD_BURST = 5           # messages a server can queue at once
+GUILD_RATE = 0.5          # ... refilled per second
+
+
+LINK_RE = re.compile(r"https?://|www\.")
+CUSTOM_EMOJI_RE = re.compile(r"<a?:\w+:\d+>")
+EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA00-\U0001FAFF"
+    "]+",
+    flags=re.UNICODE
+)
 
 
 def contains_link(text: str) -> bool:
-    return bool(re.search(r"https?://|www\.", text))
+    return LINK_RE.search(text) is not None
 
 
 def remove_emojis(text: str) -> str:
-    text = re.sub(r"<a?:\w+:\d+>", "", text)  # custom emojis
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F900-\U0001F9FF"
-        "\U0001FA00-\U0001FAFF"
-        "]+",
-        flags=re.UNICODE
-    )
-    return emoji_pattern.sub("", text).strip()
+    text = CUSTOM_EMOJI_RE.sub("", text)
+    return EMOJI_RE.sub("", text).strip()
 
 
 class AutoTextToSpeech(commands.Cog):
@@ -37,10 +44,22 @@ class AutoTextToSpeech(commands.Cog):
         self.bot = bot
         self.enabled = True
         self.allowed_channel_id = None
-        self.queue = asyncio.Queue()
-        self.last_used = {}
+        self.players = {}
+        self.last_used = Cooldown(COOLDOWN)
+        self.guild_limit = TokenBucket(GUILD_BURST, GUILD_RATE)
+
+        pipeline.add_stage("tts", self.tts_stage, ORDER_TTS)
+
+    def cog_unload(self):
+        pipeline.remove_stage("tts")
+        for player in self.players.values():
+            player.stop()
 
-        bot.loop.create_task(self.audio_worker())
+    def player(self, guild_id: int) -> GuildPlayer:
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = GuildPlayer(self.bot, guild_id)
+        return player
 
     # ========================
     # ADMIN: SET CHANNEL
@@ -67,23 +86,109 @@ class AutoTextToSpeech(commands.Cog):
         await interaction.response.send_message(f"✅ Auto TTS is now {state.upper()}", ephemeral=True)
 
     # ========================
-    # MESSAGE LISTENER
+    # ADMIN: BACKEND
+    # ========================
+    @app_commands.command(name="autotts_backend", description="Pick the TTS engine for this server")
+    @app_commands.describe(
+        backend="gtts, espeak or default",
+        lang="ta, en, hi or all"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def autotts_backend(self, interaction: discord.Interaction, backend: str, lang: str = "all"):
+        backend = backend.lower()
+        lang = lang.lower()
+        if backend != "default" and backend not in tts.BACKENDS:
+            return await interaction.response.send_message(
+                f"Use one of: {', '.join(tts.BACKENDS)}, default", ephemeral=True
+            )
+        if lang not in ["ta", "en", "hi", "all"]:
+            return await interaction.response.send_message("Use: ta, en, hi or all", ephemeral=True)
+
+        await tts.set_backend(
+            interaction.guild.id,
+            tts.ALL_LANGS if lang == "all" else lang,
+            None if backend == "default" else backend
+        )
+
+        note = ""
+        if backend != "default" and not tts.BACKENDS[backend].available():
+            note = f"\n⚠️ `{backend}` isn't installed on this host; other engines will be used."
+        await interaction.response.send_message(
+            f"✅ Auto TTS engine for `{lang}` set to `{backend}`{note}", ephemeral=True
+        )
+
+    # ========================
+    # ADMIN: STATS
+    # ========================
+    @app_commands.command(name="autotts_stats", description="Show TTS engine, cache, voice and player stats")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def autotts_stats(self, interaction: discord.Interaction):
+        c = clip_cache.snapshot()
+        embed = discord.Embed(title="🔊 Auto TTS", color=discord.Color.blurple())
+        embed.add_field(
+            name="Clip cache",
+            value=(
+                f"hits `{c['memory_hits']}` memory • `{c['disk_hits']}` disk • "
+                f"misses `{c['misses']}` • hit rate `{c['hit_rate']:.0%}`\n"
+                f"memory `{c['memory_clips']}` clips / `{c['memory_mb']}MB` • "
+                f"disk `{c['disk_clips']}` clips / `{c['disk_mb']}MB` • "
+                f"evicted `{c['evictions']}`"
+            ),
+            inline=False
+        )
+
+        for b in tts.snapshot():
+            if not b["available"]:
+                value = "not installed"
+            else:
+                value = (
+                    f"{b['calls']} clips • avg `{b['avg_ms']}ms` • max `{b['max_ms']}ms` • "
+                    f"failures `{b['failures']}`"
+                )
+                if not b["healthy"]:
+                    value += f"\n⚠️ backing off: {b['last_error']}"
+            embed.add_field(name=f"Engine • {b['name']}", value=value, inline=False)
+
+        v = connections.snapshot()
+        embed.add_field(
+            name="Voice connections",
+            value=(
+                f"connected `{v['connected']}` • playing `{v['playing']}` • connecting `{v['connecting']}`\n"
+                f"connects `{v['connects']}` (reconnects `{v['reconnects']}`) • moves `{v['moves']}` • "
+                f"idle disconnects `{v['idle_disconnects']}` • drops `{v['drops']}` • failures `{v['failures']}`\n"
+                f"handshake avg `{v['handshake_avg_ms']}ms` • max `{v['handshake_max_ms']}ms`"
+            ),
+            inline=False
+        )
+
+        player = self.players.get(interaction.guild_id)
+        if player is not None:
+            embed.add_field(
+                name="This server",
+                value=(
+                    f"played `{player.played}` • queued `{player.queue.qsize()}` • "
+                    f"dropped `{player.dropped}` • errors `{player.errors}`"
+                ),
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # ========================
+    # MESSAGE STAGE
     # ========================
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    async def tts_stage(self, ctx):
 
         if not self.enabled:
             return
-        if message.author.bot:
-            return
         if not self.allowed_channel_id:
             return
-        if message.channel.id != self.allowed_channel_id:
+        if ctx.channel_id != self.allowed_channel_id:
             return
-        if not message.author.voice:
+        voice_channel = ctx.voice_channel
+        if not voice_channel:
             return
 
-        content = message.content.strip()
+        content = ctx.content
         if not content:
             return
         if contains_link(content):
@@ -97,67 +202,16 @@ class AutoTextToSpeech(commands.Cog):
             return
 
         # cooldown
-        now = time.time()
-        last = self.last_used.get(message.author.id, 0)
-        if now - last < COOLDOWN:
+        if self.last_used.remaining(ctx.author.id, ctx.now):
+            return
+        # keep one busy server from flooding the speaker
+        if not self.guild_limit.allow(ctx.guild.id, now=ctx.now):
             return
-        self.last_used[message.author.id] = now
-
-        voice_channel = message.author.voice.channel
-
-        try:
-            lang = detect(clean_text)
-        except:
-            lang = "en"
-
-        if lang not in ["ta", "en", "hi"]:
-            lang = "en"
-
-        await self.queue.put((message.guild.id, voice_channel.id, clean_text, lang))
-
-    # ========================
-    # AUDIO WORKER
-    # ========================
-    async def audio_worker(self):
-        await self.bot.wait_until_ready()
-
-        while True:
-            guild_id, channel_id, text, lang = await self.queue.get()
-
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                self.queue.task_done()
-                continue
-
-            voice_channel = guild.get_channel(channel_id)
-            if not voice_channel:
-                self.queue.task_done()
-                continue
-
-            try:
-                if guild.voice_client is None:
-                    vc = await voice_channel.connect()
-                else:
-                    vc = guild.voice_client
-                    if vc.channel != voice_channel:
-                        await vc.move_to(voice_channel)
-
-                tts = gTTS(text=text, lang=lang)
-                tts.save(TTS_FILE)
-
-                vc.play(discord.FFmpegPCMAudio(TTS_FILE))
-
-                while vc.is_playing():
-                    await asyncio.sleep(1)
-
-            except Exception as e:
-                print("TTS Error:", e)
-
-            finally:
-                if os.path.exists(TTS_FILE):
-                    os.remove(TTS_FILE)
 
-            self.queue.task_done()
+        lang = detect_lang(clean_text)
+        if self.player(ctx.guild.id).enqueue(voice_channel.id, clean_text, lang):
+            # only a message that will actually be spoken uses up the cooldown
+            self.last_used.hit(ctx.author.id, ctx.now)
 
 
 async def setup(bot: commands.Bot):
@@ -1,18 +1,66 @@
 import discord
-import os
-import shutil
 import traceback
 from discord.ext import commands, tasks
 from discord import app_commands
-from datetime import datetime
-
-DB_FILE = "bot.db"
-BACKUP_FOLDER = "balance_backups"
-MAX_BACKUPS = 2
+from utils.activity import activity
+from utils.backup import backup_db, restore_backup, restore_diff, list_backups_with_size, store_usage
+from utils.maintenance import maintenance
 
 ADMIN_ALERT_USER_ID = 671669229182779392
 
 
+# ==========================
+# DRY RUN EMBED
+# ==========================
+def diff_embed(name: str, changes) -> discord.Embed:
+    embed = discord.Embed(
+        title=f"♻ Restore preview — {name}",
+        description="Row counts that change if this backup is restored.",
+        color=discord.Color.orange()
+    )
+
+    if not changes:
+        embed.description = "No row-count changes. Restoring only rolls back edited rows."
+
+    by_db = {}
+    for path, table, before, after in changes:
+        before = "—" if before is None else before
+        after = "—" if after is None else after
+        by_db.setdefault(path, []).append(f"`{table}`: {before} → {after}")
+
+    for path, lines in by_db.items():
+        embed.add_field(name=path, value="\n".join(lines)[:1024], inline=False)
+
+    return embed
+
+
+# ==========================
+# DATABASE STATS EMBED
+# ==========================
+def stats_embed() -> discord.Embed:
+    usage = store_usage()
+    embed = discord.Embed(
+        title="🗄 Databases",
+        description=(
+            f"{usage['snapshots']} snapshots · {usage['logical_mb']} MB of data "
+            f"stored in {usage['stored_mb']} MB"
+        ),
+        color=discord.Color.blurple()
+    )
+
+    for path, s in maintenance.snapshot().items():
+        value = (
+            f"{s['size_mb']} MB · {s['pages']} pages\n"
+            f"Free pages: {s['free_pages']}\n"
+            f"WAL: {s['wal_mb']} MB"
+        )
+        if s["last_checkpoint"]:
+            value += f"\nCheckpoint: <t:{s['last_checkpoint']['at']}:R>"
+        embed.add_field(name=path, value=value, inline=True)
+
+    return embed
+
+
 # ==========================
 # CONFIRM RESTORE VIEW
 # ==========================
@@ -23,18 +71,19 @@ class RestoreConfirmView(discord.ui.View):
 
     @discord.ui.button(label="✅ Confirm Restore", style=discord.ButtonStyle.danger)
     async def confirm(self, interaction: discord.Interaction, _):
+        await interaction.response.defer()
         try:
-            shutil.copy(
-                os.path.join(BACKUP_FOLDER, self.filename),
-                DB_FILE
-            )
-            await interaction.response.edit_message(
-                content=f"♻ **Database restored from `{self.filename}`**\n⚠ Restart the bot now!",
+            await activity.flush()
+            await restore_backup(self.filename)
+            await interaction.edit_original_response(
+                content=f"♻ **Database restored from `{self.filename}`**\nCaches were reset; no restart needed.",
+                embed=None,
                 view=None
             )
         except Exception as e:
-            await interaction.response.edit_message(
+            await interaction.edit_original_response(
                 content=f"❌ Restore failed:\n```{e}```",
+                embed=None,
                 view=None
             )
 
@@ -42,6 +91,7 @@ class RestoreConfirmView(discord.ui.View):
     async def cancel(self, interaction: discord.Interaction, _):
         await interaction.response.edit_message(
             content="❌ Restore cancelled.",
+            embed=None,
             view=None
         )
 
@@ -52,8 +102,8 @@ class RestoreConfirmView(discord.ui.View):
 class BackupSelect(discord.ui.Select):
     def __init__(self, backups):
         options = [
-            discord.SelectOption(label=f)
-            for f in backups
+            discord.SelectOption(label=name, description=f"{size} MB")
+            for name, size in backups
         ]
 
         super().__init__(
@@ -63,8 +113,17 @@ class BackupSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         filename = self.values[0]
-        await interaction.response.send_message(
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        try:
+            await activity.flush()
+            changes = await restore_diff(filename)
+        except Exception as e:
+            return await interaction.followup.send(f"❌ Cannot read backup:\n```{e}```", ephemeral=True)
+
+        await interaction.followup.send(
             content=f"⚠ **Confirm restore from `{filename}`**",
+            embed=diff_embed(filename, changes),
             view=RestoreConfirmView(filename),
             ephemeral=True
         )
@@ -82,8 +141,12 @@ class BackupSelectView(discord.ui.View):
 class AutoBalanceBackup(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        os.makedirs(BACKUP_FOLDER, exist_ok=True)
         self.auto_backup.start()
+        self.maintenance_loop.start()
+
+    async def cog_unload(self):
+        self.auto_backup.cancel()
+        self.maintenance_loop.cancel()
 
     # ==========================
     # AUTO BACKUP TASK
@@ -91,49 +154,48 @@ class AutoBalanceBackup(commands.Cog):
     @tasks.loop(minutes=30)  # change time if needed
     async def auto_backup(self):
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            backup_name = f"balance_backup_{timestamp}.db"
-            backup_path = os.path.join(BACKUP_FOLDER, backup_name)
-
-            shutil.copy(DB_FILE, backup_path)
-            print(f"✅ Backup created: {backup_name}")
-
-            self.cleanup_old_backups()
+            # buffered XP / coins belong in the snapshot
+            await activity.flush()
+            manifest = await backup_db()
+            print(
+                f"✅ Backup created: {manifest['name']} "
+                f"({manifest['new_bytes'] // 1024} KB new, {manifest['seconds']}s)"
+            )
 
         except Exception as e:
             await self.alert_admin(e)
 
     # ==========================
-    # CLEANUP (KEEP ONLY 2)
+    # WAL / VACUUM MAINTENANCE
     # ==========================
-    def cleanup_old_backups(self):
-        files = sorted(os.listdir(BACKUP_FOLDER), reverse=True)
-
-        if len(files) > MAX_BACKUPS:
-            for old_file in files[MAX_BACKUPS:]:
-                os.remove(os.path.join(BACKUP_FOLDER, old_file))
-                print(f"🗑 Deleted old backup: {old_file}")
+    @tasks.loop(minutes=1)
+    async def maintenance_loop(self):
+        try:
+            await maintenance.run()
+        except Exception as e:
+            print("❌ Database maintenance error:", e)
 
     # ==========================
     # RESTORE COMMAND
     # ==========================
     @app_commands.command(
         name="restore_backup",
-        description="♻ Restore database from last balance backups"
+        description="♻ Restore databases from the latest backup sets"
     )
     @app_commands.checks.has_permissions(administrator=True)
     async def restore_backup_cmd(self, interaction: discord.Interaction):
-        files = sorted(os.listdir(BACKUP_FOLDER), reverse=True)
+        backups = list_backups_with_size()
 
-        if not files:
+        if not backups:
             return await interaction.response.send_message(
                 "❌ No backups found.",
                 ephemeral=True
             )
 
         await interaction.response.send_message(
-            "📂 Select a backup file to restore:",
-            view=BackupSelectView(files[:2]),  # only show last 2
+            "📂 Select a backup set to restore:",
+            embed=stats_embed(),
+            view=BackupSelectView(backups[:25]),  # select menus hold 25
             ephemeral=True
         )
 
@@ -1,7 +1,9 @@
 import discord
-import time, aiosqlite
+import time
 from discord.ext import commands, tasks
 from discord import app_commands
+from utils.db import get_db
+from utils import ledger
 
 DB_NAME = "bot.db"
 
@@ -40,22 +42,14 @@ class BuyPremiumModal(discord.ui.Modal):
         discount = 0
         coupon_code = self.coupon.value.strip().upper()
 
-        # Ensure coin row exists
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?, 0)",
-                (user_id,)
-            )
-            await db.commit()
+        db = get_db(DB_NAME)
 
         # ===== COUPON CHECK =====
         if coupon_code:
-            async with aiosqlite.connect(DB_NAME) as db:
-                async with db.execute(
-                    "SELECT type,value,max_uses,used,expires FROM coupons WHERE code=?",
-                    (coupon_code,)
-                ) as cur:
-                    row = await cur.fetchone()
+            row = await db.fetchone(
+                "SELECT type,value,max_uses,used,expires FROM coupons WHERE code=?",
+                (coupon_code,)
+            )
 
             if not row:
                 return await interaction.response.send_message(
@@ -83,12 +77,11 @@ class BuyPremiumModal(discord.ui.Modal):
         final_price = max(base_price - discount, 0)
 
         # ===== BALANCE CHECK =====
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute(
-                "SELECT balance FROM coins WHERE user_id=?",
-                (user_id,)
-            ) as cur:
-                balance = (await cur.fetchone())[0]
+        row = await db.fetchone(
+            "SELECT balance FROM coins WHERE user_id=?",
+            (user_id,)
+        )
+        balance = row[0] if row else 0
 
         if balance < final_price:
             return await interaction.response.send_message(
@@ -99,24 +92,29 @@ class BuyPremiumModal(discord.ui.Modal):
         expires = int(time.time()) + DAYS[tier] * 86400
 
         # ===== APPLY PURCHASE =====
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "UPDATE coins SET balance=balance-? WHERE user_id=?",
-                (final_price, user_id)
-            )
-
-            await db.execute(
-                "INSERT OR REPLACE INTO premium (user_id,tier,expires) VALUES (?,?,?)",
-                (user_id, tier, expires)
+        async with db.transaction() as conn:
+            paid = await ledger.debit(
+                user_id, final_price, "coin_shop", f"premium {tier}", coupon_code or None, db=conn
             )
 
-            if coupon_code:
-                await db.execute(
-                    "UPDATE coupons SET used = used + 1 WHERE code=?",
-                    (coupon_code,)
+            if paid:
+                await conn.execute(
+                    "INSERT OR REPLACE INTO premium (user_id,tier,expires) VALUES (?,?,?)",
+                    (user_id, tier, expires)
                 )
 
-            await db.commit()
+                if coupon_code:
+                    await conn.execute(
+                        "UPDATE coupons SET used = used + 1 WHERE code=?",
+                        (coupon_code,)
+                    )
+
+        # balance may have changed since the check above
+        if not paid:
+            return await interaction.response.send_message(
+                f"❌ Not enough coins. Need `{final_price}` coins.",
+                ephemeral=True
+            )
 
         role = interaction.guild.get_role(PREMIUM_ROLE_IDS[tier])
         if role:
@@ -207,9 +205,7 @@ class CoinShop(commands.Cog):
     # ================= AUTO EXPIRY + REMINDER =================
     @tasks.loop(minutes=1)
     async def expiry_task(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute("SELECT user_id,tier,expires FROM premium") as cur:
-                rows = await cur.fetchall()
+        rows = await get_db(DB_NAME).fetchall("SELECT user_id,tier,expires FROM premium")
 
         now = int(time.time())
 
@@ -230,9 +226,7 @@ class CoinShop(commands.Cog):
 
             # expired
             if expires <= now:
-                async with aiosqlite.connect(DB_NAME) as db:
-                    await db.execute("DELETE FROM premium WHERE user_id=?", (user_id,))
-                    await db.commit()
+                await get_db(DB_NAME).execute("DELETE FROM premium WHERE user_id=?", (user_id,))
 
                 for guild in self.bot.guilds:
                     member = guild.get_member(user_id)
@@ -1,8 +1,8 @@
 import discord
-import aiosqlite
 import time
 from discord.ext import commands
 from discord import app_commands
+from utils.db import get_db
 
 # =========================================================
 # COUPON TYPES
@@ -19,20 +19,16 @@ from discord import app_commands
 # =========================================================
 
 async def get_coupon(code: str):
-    async with aiosqlite.connect("bot.db") as db:
-        cur = await db.execute(
-            "SELECT code, type, value, max_uses, used, expires FROM coupons WHERE code=?",
-            (code.upper(),)
-        )
-        return await cur.fetchone()
+    return await get_db().fetchone(
+        "SELECT code, type, value, max_uses, used, expires FROM coupons WHERE code=?",
+        (code.upper(),)
+    )
 
 async def use_coupon(code: str):
-    async with aiosqlite.connect("bot.db") as db:
-        await db.execute(
-            "UPDATE coupons SET used = used + 1 WHERE code=?",
-            (code.upper(),)
-        )
-        await db.commit()
+    await get_db().execute(
+        "UPDATE coupons SET used = used + 1 WHERE code=?",
+        (code.upper(),)
+    )
 
 # =========================================================
 # COG
@@ -74,16 +70,14 @@ class Coupons(commands.Cog):
         if days_valid > 0:
             expires = int(time.time()) + days_valid * 86400
 
-        async with aiosqlite.connect("bot.db") as db:
-            await db.execute(
-                """
-                INSERT OR REPLACE INTO coupons
-                (code, type, value, max_uses, used, expires)
-                VALUES (?,?,?,?,0,?)
-                """,
-                (code.upper(), coupon_type, value, max_uses, expires)
-            )
-            await db.commit()
+        await get_db().execute(
+            """
+            INSERT OR REPLACE INTO coupons
+            (code, type, value, max_uses, used, expires)
+            VALUES (?,?,?,?,0,?)
+            """,
+            (code.upper(), coupon_type, value, max_uses, expires)
+        )
 
         await interaction.response.send_message(
             f"✅ Coupon **{code.upper()}** created!",
@@ -96,12 +90,10 @@ class Coupons(commands.Cog):
     @app_commands.command(name="delete_coupon", description="❌ Delete a coupon")
     @app_commands.checks.has_permissions(administrator=True)
     async def delete_coupon(self, interaction: discord.Interaction, code: str):
-        async with aiosqlite.connect("bot.db") as db:
-            await db.execute(
-                "DELETE FROM coupons WHERE code=?",
-                (code.upper(),)
-            )
-            await db.commit()
+        await get_db().execute(
+            "DELETE FROM coupons WHERE code=?",
+            (code.upper(),)
+        )
 
         await interaction.response.send_message(
             f"❌ Coupon **{code.upper()}** deleted.",
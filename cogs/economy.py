@@ -1,8 +1,13 @@
 import discord
-import aiosqlite
 import time
 from discord.ext import commands, tasks
 from discord import app_commands
+from utils.db import get_db
+from utils.activity import activity
+from utils.voice_sessions import voice
+from utils.message_pipeline import pipeline, ORDER_COINS
+from utils.cooldowns import Cooldown
+from utils import ledger
 
 # =========================================================
 # CONFIG
@@ -15,6 +20,8 @@ VC_COINS_EARNED = 5            # coins per interval
 VC_INTERVAL_MINUTES = 5        # every 5 minutes
 VC_AFK_MINUTES = 20            # AFK detection
 
+LEDGER_COMPACT_HOURS = 6       # fold old ledger rows into daily rollups
+
 # =========================================================
 # ECONOMY COG
 # =========================================================
@@ -22,103 +29,60 @@ VC_AFK_MINUTES = 20            # AFK detection
 class Economy(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.chat_cooldown = {}
-        self.vc_join_time = {}
+        self.chat_cooldown = Cooldown(CHAT_COIN_COOLDOWN)
+        # only unmuted, non-AFK time counts, after the first VC_AFK_MINUTES
+        voice.register("economy", active_only=True, warmup=VC_AFK_MINUTES * 60)
+        pipeline.add_stage("coins", self.chat_coin_stage, ORDER_COINS)
         self.vc_coin_loop.start()
+        self.ledger_compact_loop.start()
 
-    # -----------------------------------------------------
-    # CHAT COIN EARNING
-    # -----------------------------------------------------
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
-            return
-
-        user_id = message.author.id
-        now = time.time()
-
-        last = self.chat_cooldown.get(user_id, 0)
-        if now - last < CHAT_COIN_COOLDOWN:
-            return
-
-        self.chat_cooldown[user_id] = now
-
-        async with aiosqlite.connect("bot.db") as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                (user_id,)
-            )
-            await db.execute(
-                "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                (CHAT_COINS_EARNED, user_id)
-            )
-            await db.commit()
+    async def cog_unload(self):
+        pipeline.remove_stage("coins")
+        self.vc_coin_loop.cancel()
+        self.ledger_compact_loop.cancel()
+        await activity.flush()
 
     # -----------------------------------------------------
-    # VOICE JOIN / LEAVE TRACK
+    # CHAT COIN EARNING
     # -----------------------------------------------------
-    @commands.Cog.listener()
-    async def on_voice_state_update(self, member, before, after):
-        if member.bot:
+    async def chat_coin_stage(self, ctx):
+        user_id = ctx.author.id
+        if self.chat_cooldown.hit(user_id, ctx.now):
             return
 
-        # Joined VC
-        if after.channel and not before.channel:
-            self.vc_join_time[member.id] = time.time()
-
-        # Left VC
-        if before.channel and not after.channel:
-            self.vc_join_time.pop(member.id, None)
+        activity.add_coins(user_id, CHAT_COINS_EARNED, "chat", "message")
 
     # -----------------------------------------------------
     # VC COIN LOOP
     # -----------------------------------------------------
     @tasks.loop(minutes=VC_INTERVAL_MINUTES)
     async def vc_coin_loop(self):
-        now = time.time()
-
-        for guild in self.bot.guilds:
-            for channel in guild.voice_channels:
-                for member in channel.members:
-                    if member.bot:
-                        continue
-
-                    # AFK / muted protection
-                    if member.voice.self_mute or member.voice.afk:
-                        continue
-
-                    joined_at = self.vc_join_time.get(member.id)
-                    if not joined_at:
-                        continue
-
-                    # Must stay minimum time
-                    if now - joined_at < VC_AFK_MINUTES * 60:
-                        continue
-
-                    async with aiosqlite.connect("bot.db") as db:
-                        await db.execute(
-                            "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                            (member.id,)
-                        )
-                        await db.execute(
-                            "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                            (VC_COINS_EARNED, member.id)
-                        )
-                        await db.commit()
+        for guild_id, user_id, intervals in voice.take("economy", VC_INTERVAL_MINUTES * 60):
+            activity.add_coins(user_id, VC_COINS_EARNED * intervals, "voice", "vc interval")
+
+    # -----------------------------------------------------
+    # LEDGER COMPACTION
+    # -----------------------------------------------------
+    @tasks.loop(hours=LEDGER_COMPACT_HOURS)
+    async def ledger_compact_loop(self):
+        try:
+            folded = await ledger.compact()
+            if folded:
+                print(f"📒 Compacted {folded} coin ledger entries")
+        except Exception as e:
+            print("❌ Ledger compaction error:", e)
 
     # -----------------------------------------------------
     # /balance COMMAND
     # -----------------------------------------------------
     @app_commands.command(name="balance", description="🪙 Check your coin balance")
     async def balance(self, interaction: discord.Interaction):
-        async with aiosqlite.connect("bot.db") as db:
-            cur = await db.execute(
-                "SELECT balance FROM coins WHERE user_id=?",
-                (interaction.user.id,)
-            )
-            row = await cur.fetchone()
+        row = await get_db().fetchone(
+            "SELECT balance FROM coins WHERE user_id=?",
+            (interaction.user.id,)
+        )
 
-        balance = row[0] if row else 0
+        balance = (row[0] if row else 0) + activity.pending_coins(interaction.user.id)
 
         embed = discord.Embed(
             title="🪙 PSG Coin Balance",
@@ -146,16 +110,7 @@ class Economy(commands.Cog):
                 ephemeral=True
             )
 
-        async with aiosqlite.connect("bot.db") as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                (member.id,)
-            )
-            await db.execute(
-                "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                (amount, member.id)
-            )
-            await db.commit()
+        await ledger.credit(member.id, amount, "admin", "add_coins", interaction.user.id)
 
         await interaction.response.send_message(
             f"✅ Added **{amount} coins** to {member.mention}",
@@ -179,31 +134,104 @@ class Economy(commands.Cog):
                 ephemeral=True
             )
 
-        async with aiosqlite.connect("bot.db") as db:
-            cur = await db.execute(
-                "SELECT balance FROM coins WHERE user_id=?",
-                (member.id,)
-            )
-            row = await cur.fetchone()
-            balance = row[0] if row else 0
-
-            if balance < amount:
-                return await interaction.response.send_message(
-                    "❌ User does not have enough coins.",
-                    ephemeral=True
-                )
-
-            await db.execute(
-                "UPDATE coins SET balance = balance - ? WHERE user_id=?",
-                (amount, member.id)
+        if not await ledger.debit(member.id, amount, "admin", "remove_coins", interaction.user.id):
+            return await interaction.response.send_message(
+                "❌ User does not have enough coins.",
+                ephemeral=True
             )
-            await db.commit()
 
         await interaction.response.send_message(
             f"✅ Removed **{amount} coins** from {member.mention}",
             ephemeral=True
         )
 
+    # -----------------------------------------------------
+    # /coin_history COMMAND
+    # -----------------------------------------------------
+    @app_commands.command(name="coin_history", description="📒 Recent coin changes")
+    async def coin_history(
+        self,
+        interaction: discord.Interaction,
+        member: discord.Member = None
+    ):
+        member = member or interaction.user
+        if member != interaction.user and not interaction.user.guild_permissions.administrator:
+            return await interaction.response.send_message(
+                "❌ You can only view your own history.",
+                ephemeral=True
+            )
+
+        await activity.flush()
+        rows = await ledger.history(member.id, limit=15)
+
+        if not rows:
+            return await interaction.response.send_message(
+                "No coin history yet.", ephemeral=True
+            )
+
+        lines = [
+            f"`{delta:+}` **{source}** {reason} <t:{created_at}:R>"
+            for delta, source, reason, ref_id, created_at in rows
+        ]
+
+        embed = discord.Embed(
+            title=f"📒 Coin History — {member.name}",
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # -----------------------------------------------------
+    # ADMIN: COIN SOURCES
+    # -----------------------------------------------------
+    @app_commands.command(name="coin_sources", description="📊 Coins minted and spent per source")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def coin_sources(
+        self,
+        interaction: discord.Interaction,
+        days: int = 7,
+        source: str = None
+    ):
+        await activity.flush()
+        since = int(time.time()) - max(days, 1) * 86400
+        rows = await ledger.rollup(since, source)
+
+        embed = discord.Embed(
+            title=f"📊 Coin Flow — last {days} day(s)",
+            color=discord.Color.gold()
+        )
+        for r in rows[:25]:
+            embed.add_field(
+                name=r["source"],
+                value=f"➕ {r['minted']}  ➖ {r['burned']}\n{r['entries']} entries",
+                inline=True
+            )
+        if not rows:
+            embed.description = "No coin activity in this window."
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # -----------------------------------------------------
+    # ADMIN: LEDGER AUDIT
+    # -----------------------------------------------------
+    @app_commands.command(name="coin_audit", description="🔍 Check balances against the coin ledger")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def coin_audit(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        await activity.flush()
+        mismatches = await ledger.verify()
+
+        if not mismatches:
+            return await interaction.followup.send("✅ All balances match the ledger.")
+
+        lines = [
+            f"<@{user_id}> balance `{balance}` ledger `{total}`"
+            for user_id, balance, total in mismatches[:20]
+        ]
+        await interaction.followup.send(
+            f"⚠ {len(mismatches)} balance(s) disagree with the ledger:\n" + "\n".join(lines)
+        )
+
 # =========================================================
 # SETUP
 # =========================================================
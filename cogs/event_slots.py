@@ -1,61 +1,15 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import aiosqlite
 import aiohttp
 from datetime import datetime
+from utils.db import get_db
 
 DB_NAME = "slots.db"
 STAFF_CHANNEL_ID = 1465720466420269121
 STAFF_ROLE_ID = 1419223859483115591  # CHANGE
 
 
-# ================= DATABASE =================
-async def setup_database():
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.executescript("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            guild_id INTEGER,
-            event_id INTEGER,
-            event_name TEXT,
-            event_time INTEGER
-        );
-
-        CREATE TABLE IF NOT EXISTS panels (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_id INTEGER,
-            panel_name TEXT,
-            slot_image TEXT,
-            message_id INTEGER,
-            channel_id INTEGER
-        );
-
-        CREATE TABLE IF NOT EXISTS slots (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            panel_id INTEGER,
-            slot_number INTEGER,
-            booked_by INTEGER,
-            vtc_name TEXT,
-            vtc_url TEXT,
-            position TEXT,
-            member_count INTEGER,
-            status TEXT DEFAULT 'open'
-        );
-
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            panel_id INTEGER,
-            slot_number INTEGER,
-            user_id INTEGER,
-            vtc_name TEXT,
-            action TEXT,
-            timestamp INTEGER
-        );
-        """)
-        await db.commit()
-
-
 # ================= MODAL =================
 class BookingModal(discord.ui.Modal, title="Slot Booking"):
     def __init__(self, cog, panel_id, slot_number):
@@ -126,7 +80,7 @@ class StaffApproveView(discord.ui.View):
         if not self.check(interaction):
             return await interaction.response.send_message("No permission", ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
+        async with get_db(DB_NAME).transaction() as db:
             user_id = (await (await db.execute(
                 "SELECT booked_by FROM slots WHERE panel_id=? AND slot_number=?",
                 (self.panel_id, self.slot_number))).fetchone())[0]
@@ -145,8 +99,6 @@ class StaffApproveView(discord.ui.View):
             await db.execute("INSERT INTO history VALUES (NULL,?,?,?,?, 'approved', strftime('%s','now'))",
                              (self.panel_id, self.slot_number, user_id, ""))
 
-            await db.commit()
-
         user = interaction.client.get_user(user_id)
         if user:
             embed = discord.Embed(title="✅ Slot Approved")
@@ -164,7 +116,7 @@ class StaffApproveView(discord.ui.View):
         if not self.check(interaction):
             return await interaction.response.send_message("No permission", ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
+        async with get_db(DB_NAME).transaction() as db:
             user_id = (await (await db.execute(
                 "SELECT booked_by FROM slots WHERE panel_id=? AND slot_number=?",
                 (self.panel_id, self.slot_number))).fetchone())[0]
@@ -179,7 +131,6 @@ class StaffApproveView(discord.ui.View):
 
             await db.execute("UPDATE slots SET status='open', booked_by=NULL WHERE panel_id=? AND slot_number=?",
                              (self.panel_id, self.slot_number))
-            await db.commit()
 
         user = interaction.client.get_user(user_id)
         if user:
@@ -196,7 +147,6 @@ class StaffApproveView(discord.ui.View):
 class SlotBooking(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        bot.loop.create_task(setup_database())
         self.auto_refresh.start()
 
     def cog_unload(self):
@@ -216,8 +166,7 @@ class SlotBooking(commands.Cog):
 
     @tasks.loop(seconds=10)
     async def auto_refresh(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            panels = await db.execute_fetchall("SELECT id FROM panels WHERE message_id IS NOT NULL")
+        panels = await get_db(DB_NAME).fetchall("SELECT id FROM panels WHERE message_id IS NOT NULL")
         for (pid,) in panels:
             await self.refresh_panel(pid)
 
@@ -229,11 +178,9 @@ class SlotBooking(commands.Cog):
         async with aiohttp.ClientSession() as s:
             e = (await (await s.get(f"https://api.truckersmp.com/v2/events/{event_id}")).json())["response"]
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("INSERT INTO events VALUES (NULL,?,?,?,?)",
-                             (interaction.guild_id, event_id, e["name"],
-                              int(datetime.fromisoformat(e["start_at"].replace("Z","+00:00")).timestamp())))
-            await db.commit()
+        await get_db(DB_NAME).execute("INSERT INTO events VALUES (NULL,?,?,?,?)",
+                                      (interaction.guild_id, event_id, e["name"],
+                                       int(datetime.fromisoformat(e["start_at"].replace("Z","+00:00")).timestamp())))
 
         await interaction.followup.send("Event imported", ephemeral=True)
 
@@ -242,16 +189,16 @@ class SlotBooking(commands.Cog):
     async def createpanel(self, interaction, event_id: int, name: str, start: int, end: int, img: str):
         await interaction.response.defer(ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
+        async with get_db(DB_NAME).transaction() as db:
             pid = (await db.execute(
                 "INSERT INTO panels VALUES (NULL,?,?,?,NULL,NULL)",
                 (event_id, name, img)
             )).lastrowid
 
-            for i in range(start, end + 1):
-                await db.execute("INSERT INTO slots (panel_id, slot_number) VALUES (?,?)", (pid, i))
-
-            await db.commit()
+            await db.executemany(
+                "INSERT INTO slots (panel_id, slot_number) VALUES (?,?)",
+                [(pid, i) for i in range(start, end + 1)]
+            )
 
         await interaction.followup.send(f"Panel ID: {pid}", ephemeral=True)
 
@@ -260,14 +207,14 @@ class SlotBooking(commands.Cog):
     async def sendpanel(self, interaction, panel_id: int):
         await interaction.response.defer(ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            panel = await (await db.execute(
-                "SELECT panel_name, slot_image FROM panels WHERE id=?", (panel_id,)
-            )).fetchone()
+        db = get_db(DB_NAME)
+        panel = await db.fetchone(
+            "SELECT panel_name, slot_image FROM panels WHERE id=?", (panel_id,)
+        )
 
-            slots = await (await db.execute(
-                "SELECT slot_number, status, vtc_name FROM slots WHERE panel_id=?", (panel_id,)
-            )).fetchall()
+        slots = await db.fetchall(
+            "SELECT slot_number, status, vtc_name FROM slots WHERE panel_id=?", (panel_id,)
+        )
 
         embed = discord.Embed(title=panel[0], description=self.build(slots))
         if panel[1]:
@@ -275,23 +222,20 @@ class SlotBooking(commands.Cog):
 
         msg = await interaction.channel.send(embed=embed, view=SlotView(panel_id, slots))
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "UPDATE panels SET message_id=?, channel_id=? WHERE id=?",
-                (msg.id, interaction.channel.id, panel_id)
-            )
-            await db.commit()
+        await db.execute(
+            "UPDATE panels SET message_id=?, channel_id=? WHERE id=?",
+            (msg.id, interaction.channel.id, panel_id)
+        )
 
         await interaction.followup.send("Panel sent", ephemeral=True)
 
     @app_commands.command(name="leaderboard")
     async def leaderboard(self, interaction, event_id: int):
-        async with aiosqlite.connect(DB_NAME) as db:
-            rows = await db.execute_fetchall("""
-                SELECT vtc_name, COUNT(*) FROM history h
-                JOIN panels p ON h.panel_id=p.id
-                WHERE p.event_id=? GROUP BY vtc_name
-            """, (event_id,))
+        rows = await get_db(DB_NAME).fetchall("""
+            SELECT vtc_name, COUNT(*) FROM history h
+            JOIN panels p ON h.panel_id=p.id
+            WHERE p.event_id=? GROUP BY vtc_name
+        """, (event_id,))
 
         embed = discord.Embed(title=f"Leaderboard {event_id}")
         for v, c in rows:
@@ -301,12 +245,11 @@ class SlotBooking(commands.Cog):
 
     @app_commands.command(name="slothistory")
     async def slothistory(self, interaction, event_id: int):
-        async with aiosqlite.connect(DB_NAME) as db:
-            rows = await db.execute_fetchall("""
-                SELECT h.slot_number, h.vtc_name FROM history h
-                JOIN panels p ON h.panel_id=p.id
-                WHERE p.event_id=? LIMIT 10
-            """, (event_id,))
+        rows = await get_db(DB_NAME).fetchall("""
+            SELECT h.slot_number, h.vtc_name FROM history h
+            JOIN panels p ON h.panel_id=p.id
+            WHERE p.event_id=? LIMIT 10
+        """, (event_id,))
 
         embed = discord.Embed(title=f"History {event_id}")
         for s, v in rows:
@@ -318,12 +261,10 @@ class SlotBooking(commands.Cog):
     async def process_booking(self, interaction, panel_id, slot_number,
                               vtc_name, vtc_url, position, member_count):
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-                UPDATE slots SET status='pending', booked_by=?, vtc_name=?, vtc_url=?, position=?, member_count=?
-                WHERE panel_id=? AND slot_number=?
-            """, (interaction.user.id, vtc_name, vtc_url, position, member_count, panel_id, slot_number))
-            await db.commit()
+        await get_db(DB_NAME).execute("""
+            UPDATE slots SET status='pending', booked_by=?, vtc_name=?, vtc_url=?, position=?, member_count=?
+            WHERE panel_id=? AND slot_number=?
+        """, (interaction.user.id, vtc_name, vtc_url, position, member_count, panel_id, slot_number))
 
         await interaction.response.send_message("Sent for approval", ephemeral=True)
 
@@ -346,14 +287,14 @@ class SlotBooking(commands.Cog):
         await self.refresh_panel(panel_id)
 
     async def refresh_panel(self, panel_id):
-        async with aiosqlite.connect(DB_NAME) as db:
-            panel = await (await db.execute(
-                "SELECT message_id, channel_id FROM panels WHERE id=?", (panel_id,)
-            )).fetchone()
-
-            slots = await (await db.execute(
-                "SELECT slot_number, status, vtc_name FROM slots WHERE panel_id=?", (panel_id,)
-            )).fetchall()
+        db = get_db(DB_NAME)
+        panel = await db.fetchone(
+            "SELECT message_id, channel_id FROM panels WHERE id=?", (panel_id,)
+        )
+
+        slots = await db.fetchall(
+            "SELECT slot_number, status, vtc_name FROM slots WHERE panel_id=?", (panel_id,)
+        )
 
         channel = self.bot.get_channel(panel[1])
         if channel:
@@ -1,10 +1,17 @@
 import discord
-import aiosqlite
+import asyncio
 import time
+from io import BytesIO
 from discord.ext import commands, tasks
 from discord import app_commands
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
+from utils.db import get_db
+from utils.activity import activity
+from utils.level_curve import LevelCurve, get_curve, set_curve
+from utils.leaderboard import leaderboard, PAGE_SIZE
+from utils.rank_card import render_rank_card
+from utils.role_sync import RoleSync
+from utils.voice_sessions import voice
+from utils.message_pipeline import pipeline, ORDER_XP
 
 DB_NAME = "bot.db"
 
@@ -28,19 +35,12 @@ LEVEL_ROLES = {
 }
 
 
-# ================= LEVEL FORMULA =================
-def xp_needed(level: int):
-    return 100 + (level * 50)
-
-
 # ================= PREMIUM HELPERS =================
 async def get_xp_boost(user_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        cur = await db.execute(
-            "SELECT tier, expires FROM premium WHERE user_id=?",
-            (user_id,)
-        )
-        row = await cur.fetchone()
+    row = await get_db(DB_NAME).fetchone(
+        "SELECT tier, expires FROM premium WHERE user_id=?",
+        (user_id,)
+    )
 
     if not row:
         return 1.0
@@ -52,204 +52,74 @@ async def get_xp_boost(user_id):
     return PREMIUM_BOOST.get(tier, 1.0)
 
 
-# ================= RANK CARD =================
-def generate_rank_card(username, avatar_bytes, level, xp, needed, coins):
-    W, H = 900, 300
-    img = Image.new("RGB", (W, H), (20, 20, 20))
-    draw = ImageDraw.Draw(img)
-
-    try:
-        name_font = ImageFont.truetype("fonts/CinzelDecorative-Bold.ttf", 50)
-        level_font = ImageFont.truetype("fonts/CinzelDecorative-Bold.ttf", 33)
-        small_font = ImageFont.truetype("fonts/CinzelDecorative-Bold.ttf", 26)
-    except:
-        name_font = level_font = small_font = ImageFont.load_default()
-
-    avatar = Image.open(BytesIO(avatar_bytes)).resize((150, 150)).convert("RGBA")
-    img.paste(avatar, (30, 75), avatar)
-
-    draw.text((220, 40), username, font=name_font, fill="white")
-    draw.text((220, 120), f"LEVEL {level}", font=level_font, fill="gold")
-    draw.text((220, 160), f"{coins} COINS", font=level_font, fill=(0, 255, 200))
-    draw.text((220, 210), f"XP: {xp} / {needed}", font=small_font, fill="white")
-
-    bar_x = 220
-    bar_y = 250
-    bar_w = 600
-    bar_h = 25
-    progress = int((xp / needed) * bar_w)
-
-    draw.rectangle((bar_x, bar_y, bar_x + bar_w, bar_y + bar_h), fill=(60, 60, 60))
-    draw.rectangle((bar_x, bar_y, bar_x + progress, bar_y + bar_h), fill=(0, 200, 255))
-
-    buf = BytesIO()
-    img.save(buf, "PNG")
-    buf.seek(0)
-    return buf
-
-
 # ================= LEVEL COG =================
 class Levels(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.role_sync = RoleSync(LEVEL_ROLES)
+        self._effects = set()
+        voice.register("levels")
+        pipeline.add_stage("xp", self.xp_stage, ORDER_XP)
         self.voice_xp_loop.start()
 
-    async def cog_load(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS levels (
-                    user_id INTEGER,
-                    guild_id INTEGER,
-                    xp INTEGER,
-                    level INTEGER,
-                    PRIMARY KEY (user_id, guild_id)
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS coins (
-                    user_id INTEGER PRIMARY KEY,
-                    balance INTEGER DEFAULT 0
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS premium (
-                    user_id INTEGER PRIMARY KEY,
-                    tier TEXT,
-                    expires INTEGER
-                )
-            """)
-            await db.commit()
+    async def cog_unload(self):
+        pipeline.remove_stage("xp")
+        self.voice_xp_loop.cancel()
+        await activity.flush()
 
     # ---------------- APPLY LEVEL ROLES ----------------
     async def apply_level_roles(self, member: discord.Member, level: int):
-        for lvl, role_id in LEVEL_ROLES.items():
-            role = member.guild.get_role(role_id)
-            if not role:
-                continue
-            try:
-                if level >= lvl:
-                    await member.add_roles(role)
-                else:
-                    await member.remove_roles(role)
-            except:
-                pass
+        try:
+            await self.role_sync.sync_member(member, level)
+        except discord.HTTPException:
+            pass
+
+    # ---------------- GRANT XP ----------------
+    async def grant_xp(self, member: discord.Member, amount: int):
+        state = await activity.level_state(member.id, member.guild.id)
+        curve = await get_curve(member.guild.id)
+
+        old_level = state.level
+        state.level, state.xp = curve.add_xp(state.level, state.xp, amount)
+
+        # level L pays L * COINS_PER_LEVEL, summed over every level gained
+        gained = max(state.level - old_level, 0)
+        coins = COINS_PER_LEVEL * gained * (old_level + 1 + state.level) // 2
+
+        activity.touch_level(member.id, member.guild.id)
+        leaderboard.update(member.guild.id, member.id, state.level, state.xp)
+        activity.add_coins(member.id, coins, "levels", "level up")
+
+        if gained:
+            # roles and the level-up card stay off the message path
+            task = asyncio.create_task(self.level_up(member, state.level, state.xp, coins))
+            self._effects.add(task)
+            task.add_done_callback(self._effects.discard)
+
+    async def level_up(self, member: discord.Member, level: int, xp: int, coins: int):
+        try:
+            await self.apply_level_roles(member, level)
+            await self.send_levelup_effect(member, level, xp, coins)
+        except Exception as e:
+            print("❌ Level-up effect error:", e)
 
     # ---------------- CHAT XP ----------------
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-        if not message.guild:
-            return
-
-        user_id = message.author.id
-        guild_id = message.guild.id
-
-        async with aiosqlite.connect(DB_NAME) as db:
-            cur = await db.execute(
-                "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?",
-                (user_id, guild_id)
-            )
-            row = await cur.fetchone()
-
-            if not row:
-                xp = 0
-                level = 1
-                await db.execute(
-                    "INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?,?,?,?)",
-                    (user_id, guild_id, xp, level)
-                )
-            else:
-                xp, level = row
-
-            boost = await get_xp_boost(user_id)
-            xp += int(XP_PER_MESSAGE * boost)
-
-            coins = 0
-            leveled_up = False
-
-            while xp >= xp_needed(level):
-                xp -= xp_needed(level)
-                level += 1
-                coins += level * COINS_PER_LEVEL
-                leveled_up = True
-
-            await db.execute(
-                "UPDATE levels SET xp=?, level=? WHERE user_id=? AND guild_id=?",
-                (xp, level, user_id, guild_id)
-            )
-
-            if coins > 0:
-                await db.execute(
-                    "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                    (user_id,)
-                )
-                await db.execute(
-                    "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                    (coins, user_id)
-                )
-
-            await db.commit()
-
-        if leveled_up:
-            await self.apply_level_roles(message.author, level)
-            await self.send_levelup_effect(message.author, level, xp, coins)
+    async def xp_stage(self, ctx):
+        boost = await get_xp_boost(ctx.author.id)
+        await self.grant_xp(ctx.author, int(XP_PER_MESSAGE * boost))
 
     # ---------------- VOICE XP LOOP ----------------
     @tasks.loop(minutes=1)
     async def voice_xp_loop(self):
-        for guild in self.bot.guilds:
-            for vc in guild.voice_channels:
-                for member in vc.members:
-                    if member.bot:
-                        continue
-
-                    boost = await get_xp_boost(member.id)
-                    xp_gain = int(VOICE_XP_PER_MIN * boost)
-
-                    async with aiosqlite.connect(DB_NAME) as db:
-                        cur = await db.execute(
-                            "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?",
-                            (member.id, guild.id)
-                        )
-                        row = await cur.fetchone()
-
-                        if not row:
-                            xp = 0
-                            level = 1
-                        else:
-                            xp, level = row
-
-                        xp += xp_gain
-                        coins = 0
-                        leveled_up = False
-
-                        while xp >= xp_needed(level):
-                            xp -= xp_needed(level)
-                            level += 1
-                            coins += level * COINS_PER_LEVEL
-                            leveled_up = True
-
-                        await db.execute(
-                            "INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level) VALUES (?,?,?,?)",
-                            (member.id, guild.id, xp, level)
-                        )
-
-                        if coins > 0:
-                            await db.execute(
-                                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                                (member.id,)
-                            )
-                            await db.execute(
-                                "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                                (coins, member.id)
-                            )
-
-                        await db.commit()
-
-                    if leveled_up:
-                        await self.apply_level_roles(member, level)
-                        await self.send_levelup_effect(member, level, xp, coins)
+        # every voice minute accrued by the session tracker since the last run
+        for guild_id, user_id, minutes in voice.take("levels", 60):
+            guild = self.bot.get_guild(guild_id)
+            member = guild.get_member(user_id) if guild else None
+            if member is None:
+                continue
+
+            boost = await get_xp_boost(user_id)
+            await self.grant_xp(member, int(VOICE_XP_PER_MIN * boost) * minutes)
 
     # ---------------- LEVEL-UP MESSAGE ----------------
     async def send_levelup_effect(self, member, level, xp, coins):
@@ -257,14 +127,13 @@ class Levels(commands.Cog):
         if not channel:
             return
 
-        avatar = await member.display_avatar.read()
-        needed = xp_needed(level)
-
-        card = generate_rank_card(member.name, avatar, level, xp, needed, coins)
+        needed = (await get_curve(member.guild.id)).xp_needed(level)
+        rank = await leaderboard.rank(member.guild.id, member.id, level, xp)
+        card = await render_rank_card(member, level, xp, needed, coins, rank)
 
         await channel.send(
             content=f"🎉 {member.mention} leveled up to **Level {level}**!",
-            file=discord.File(card, "rank.png")
+            file=discord.File(BytesIO(card), "rank.png")
         )
 
     # ---------------- /LEVEL ----------------
@@ -274,94 +143,115 @@ class Levels(commands.Cog):
         user_id = member.id
         guild_id = interaction.guild.id
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            cur = await db.execute(
-                "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?",
-                (user_id, guild_id)
-            )
-            row = await cur.fetchone()
-
-            if not row:
-                return await interaction.response.send_message(
-                    "No level data yet.", ephemeral=True
-                )
+        # rendering may queue behind other cards; acknowledge first
+        await interaction.response.defer(ephemeral=True)
 
-            xp, level = row
+        state = await activity.level_state(user_id, guild_id)
+        if state.xp == 0 and state.level == 1:
+            return await interaction.followup.send("No level data yet.", ephemeral=True)
 
-            await db.execute(
-                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                (user_id,)
-            )
+        xp, level = state.xp, state.level
 
-            cur = await db.execute(
-                "SELECT balance FROM coins WHERE user_id=?",
-                (user_id,)
-            )
-            coin_row = await cur.fetchone()
-            coins = coin_row[0] if coin_row else 0
+        coin_row = await get_db(DB_NAME).fetchone(
+            "SELECT balance FROM coins WHERE user_id=?",
+            (user_id,)
+        )
+        coins = (coin_row[0] if coin_row else 0) + activity.pending_coins(user_id)
 
-        needed = xp_needed(level)
-        avatar = await member.display_avatar.read()
-        card = generate_rank_card(member.name, avatar, level, xp, needed, coins)
+        needed = (await get_curve(guild_id)).xp_needed(level)
+        rank = await leaderboard.rank(guild_id, user_id, level, xp)
+        card = await render_rank_card(member, level, xp, needed, coins, rank)
 
-        await interaction.response.send_message(
-            file=discord.File(card, "rank.png"),
+        await interaction.followup.send(
+            file=discord.File(BytesIO(card), "rank.png"),
             ephemeral=True
         )
 
+    # ---------------- /XP_LEADERBOARD ----------------
+    @app_commands.command(name="xp_leaderboard", description="Top members by level")
+    async def xp_leaderboard(self, interaction: discord.Interaction, page: int = 1):
+        await interaction.response.defer()
+
+        guild_id = interaction.guild.id
+        page = max(page, 1)
+        rows = await leaderboard.page(guild_id, page)
+        total = await leaderboard.total(guild_id)
+
+        if not rows:
+            return await interaction.followup.send("No level data on that page.")
+
+        desc = ""
+        for i, (user_id, level, xp) in enumerate(rows, start=(page - 1) * PAGE_SIZE + 1):
+            desc += f"{i}. <@{user_id}> — Level {level} • {xp} XP\n"
+
+        pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        embed = discord.Embed(title="🏆 XP Leaderboard", description=desc, color=discord.Color.gold())
+        embed.set_footer(text=f"Page {page}/{pages} • {total} members")
+        await interaction.followup.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
     # ---------------- /ADDXP ----------------
     @app_commands.command(name="addxp", description="Admin: Add XP to a user")
     @app_commands.checks.has_permissions(administrator=True)
     async def addxp(self, interaction: discord.Interaction, member: discord.Member, amount: int):
-        user_id = member.id
-        guild_id = interaction.guild.id
+        await self.grant_xp(member, amount)
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            cur = await db.execute(
-                "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?",
-                (user_id, guild_id)
-            )
-            row = await cur.fetchone()
-
-            if not row:
-                xp = 0
-                level = 1
-            else:
-                xp, level = row
-
-            xp += amount
-            coins = 0
-            leveled_up = False
-
-            while xp >= xp_needed(level):
-                xp -= xp_needed(level)
-                level += 1
-                coins += level * COINS_PER_LEVEL
-                leveled_up = True
-
-            await db.execute(
-                "INSERT OR REPLACE INTO levels (user_id, guild_id, xp, level) VALUES (?,?,?,?)",
-                (user_id, guild_id, xp, level)
-            )
+        await interaction.response.send_message(
+            f"✅ Added **{amount} XP** to {member.mention}",
+            ephemeral=True
+        )
 
-            if coins > 0:
-                await db.execute(
-                    "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?,0)",
-                    (user_id,)
-                )
-                await db.execute(
-                    "UPDATE coins SET balance = balance + ? WHERE user_id=?",
-                    (coins, user_id)
+    # ---------------- /LEVEL_ROLES_RESYNC ----------------
+    @app_commands.command(name="level_roles_resync", description="Admin: Re-check every member's level roles")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def level_roles_resync(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        async def show(progress):
+            p = progress.to_dict()
+            head = "✅ Level roles resynced" if progress.done else "🔄 Resyncing level roles..."
+            await interaction.edit_original_response(
+                content=(
+                    f"{head}\n"
+                    f"Checked **{p['checked']}/{p['rows']}** • changed **{p['changed']}** • "
+                    f"failed **{p['failed']}** • not in server **{p['missing']}** • {p['seconds']}s"
                 )
+            )
 
-            await db.commit()
+        try:
+            await self.role_sync.resync_guild(interaction.guild, show)
+        except RuntimeError as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+
+    # ---------------- /LEVEL_CURVE ----------------
+    @app_commands.command(name="level_curve", description="Admin: Change this server's XP curve")
+    @app_commands.describe(
+        base="XP needed for every level",
+        step="Extra XP needed per level"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def level_curve_cmd(self, interaction: discord.Interaction, base: int = None, step: int = None):
+        current = await get_curve(interaction.guild.id)
 
-        if leveled_up:
-            await self.apply_level_roles(member, level)
-            await self.send_levelup_effect(member, level, xp, coins)
+        if base is None and step is None:
+            return await interaction.response.send_message(
+                f"📈 XP for next level = **{current.base} + {current.step} × level**",
+                ephemeral=True
+            )
 
-        await interaction.response.send_message(
-            f"✅ Added **{amount} XP** to {member.mention}",
+        try:
+            curve = LevelCurve(
+                current.base if base is None else base,
+                current.step if step is None else step
+            )
+        except ValueError as e:
+            return await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True)
+        rows = await set_curve(interaction.guild.id, curve)
+
+        await interaction.followup.send(
+            f"✅ XP curve set to **{curve.base} + {curve.step} × level**\n"
+            f"♻ Re-levelled **{rows}** members (total XP kept)",
             ephemeral=True
         )
 
@@ -1,8 +1,8 @@
 import discord
-import aiosqlite
 import time
 from discord.ext import commands
 from discord import app_commands
+from utils.db import get_db
 
 # =========================================================
 # CONFIG
@@ -20,18 +20,16 @@ MOD_ROLE_NAME = None   # e.g. "Moderator"
 # =========================================================
 
 async def get_modlog_channel(guild: discord.Guild):
-    async with aiosqlite.connect("bot.db") as db:
-        cur = await db.execute(
-            "SELECT modlog_channel FROM guild_settings WHERE guild_id=?",
-            (guild.id,)
-        )
-        row = await cur.fetchone()
-        if not row or not row[0]:
-            return None
-        return guild.get_channel(row[0])
+    row = await get_db().fetchone(
+        "SELECT modlog_channel FROM guild_settings WHERE guild_id=?",
+        (guild.id,)
+    )
+    if not row or not row[0]:
+        return None
+    return guild.get_channel(row[0])
 
 async def add_warn(user_id: int, guild_id: int):
-    async with aiosqlite.connect("bot.db") as db:
+    async with get_db().transaction() as db:
         await db.execute(
             "INSERT OR IGNORE INTO warnings (user_id, guild_id, count) VALUES (?,?,0)",
             (user_id, guild_id)
@@ -40,24 +38,19 @@ async def add_warn(user_id: int, guild_id: int):
             "UPDATE warnings SET count = count + 1 WHERE user_id=? AND guild_id=?",
             (user_id, guild_id)
         )
-        await db.commit()
 
 async def get_warns(user_id: int, guild_id: int) -> int:
-    async with aiosqlite.connect("bot.db") as db:
-        cur = await db.execute(
-            "SELECT count FROM warnings WHERE user_id=? AND guild_id=?",
-            (user_id, guild_id)
-        )
-        row = await cur.fetchone()
-        return row[0] if row else 0
+    row = await get_db().fetchone(
+        "SELECT count FROM warnings WHERE user_id=? AND guild_id=?",
+        (user_id, guild_id)
+    )
+    return row[0] if row else 0
 
 async def reset_warns(user_id: int, guild_id: int):
-    async with aiosqlite.connect("bot.db") as db:
-        await db.execute(
-            "DELETE FROM warnings WHERE user_id=? AND guild_id=?",
-            (user_id, guild_id)
-        )
-        await db.commit()
+    await get_db().execute(
+        "DELETE FROM warnings WHERE user_id=? AND guild_id=?",
+        (user_id, guild_id)
+    )
 
 def mod_permission_check(interaction: discord.Interaction):
     if MOD_ROLE_NAME:
@@ -1,12 +1,11 @@
 import discord
-import aiosqlite
 import time
 import random
-import os
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
 from discord.ext import commands
 from discord import app_commands
+from utils import ledger
+from utils.render import render, InvoiceJob
 
 DB_NAME = "bot.db"
 
@@ -19,73 +18,6 @@ LOGO_URL = "https://cdn.discordapp.com/attachments/1415142396341256275/146380846
 
 PAYMENT_CATEGORY = "Payments"
 
-INVOICE_BG_PATH = "assets/invoice_bg.png"
-FONT_PATH = "fonts/CinzelDecorative-Bold.ttf"
-
-# ================= FONT =================
-def get_font(size: int):
-    if not os.path.exists(FONT_PATH):
-        return ImageFont.load_default()
-    return ImageFont.truetype(FONT_PATH, size)
-
-# ================= INVOICE CONFIG =================
-INVOICE_TEXT_CONFIG = {
-    "invoice_id": {"x": 152, "y": 525, "fontSize": 25},
-    "date": {"x": 675, "y": 525, "fontSize": 25},
-    "customer": {"x": 152, "y": 600, "fontSize": 23},
-    "paid_amount": {"x": 152, "y": 730, "fontSize": 22},
-    "coin_credit": {"x": 152, "y": 670, "fontSize": 22}
-}
-
-# ================= BACKGROUND =================
-def load_invoice_background():
-    W, H = 1080, 1080
-    try:
-        bg = Image.open(INVOICE_BG_PATH).convert("RGB")
-        return bg.resize((W, H))
-    except:
-        return Image.new("RGB", (W, H), (30, 30, 30))
-
-# ================= INVOICE GENERATOR =================
-def generate_invoice(username, rupees, coins):
-    img = load_invoice_background()
-    draw = ImageDraw.Draw(img)
-
-    invoice_id = f"PSG-{random.randint(10000, 99999)}"
-    date = time.strftime("%d/%m/%Y")
-
-    cfg = INVOICE_TEXT_CONFIG
-
-    draw.text((cfg["invoice_id"]["x"], cfg["invoice_id"]["y"]),
-              f"Invoice ID: {invoice_id}",
-              font=get_font(cfg["invoice_id"]["fontSize"]),
-              fill="gold")
-
-    draw.text((cfg["date"]["x"], cfg["date"]["y"]),
-              f"Date: {date}",
-              font=get_font(cfg["date"]["fontSize"]),
-              fill="white")
-
-    draw.text((cfg["customer"]["x"], cfg["customer"]["y"]),
-              f"Customer: {username}",
-              font=get_font(cfg["customer"]["fontSize"]),
-              fill="white")
-
-    draw.text((cfg["paid_amount"]["x"], cfg["paid_amount"]["y"]),
-              f"Paid Amount: ₹{rupees}",
-              font=get_font(cfg["paid_amount"]["fontSize"]),
-              fill="white")
-
-    draw.text((cfg["coin_credit"]["x"], cfg["coin_credit"]["y"]),
-              f"Coins Credited: {coins}",
-              font=get_font(cfg["coin_credit"]["fontSize"]),
-              fill="cyan")
-
-    buf = BytesIO()
-    img.save(buf, "PNG")
-    buf.seek(0)
-    return buf
-
 # ================= BUY COINS MODAL =================
 class BuyCoinsModal(discord.ui.Modal, title="Buy PSG Coins"):
     name = discord.ui.TextInput(label="Your Name", placeholder="Enter your name", required=True)
@@ -184,20 +116,17 @@ class Payment(commands.Cog):
 
         coins = (rupees // RUPEE_RATE) * COINS_PER_RATE
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO coins (user_id, balance) VALUES (?, 0)",
-                (member.id,)
-            )
-            await db.execute(
-                "UPDATE coins SET balance = balance + ? WHERE user_id = ?",
-                (coins, member.id)
-            )
-            await db.commit()
+        await ledger.credit(
+            member.id, coins, "payment", f"{rupees} rupees", interaction.user.id
+        )
 
-        invoice = generate_invoice(member.name, rupees, coins)
+        invoice = await render.submit(InvoiceJob(
+            f"PSG-{random.randint(10000, 99999)}",
+            time.strftime("%d/%m/%Y"),
+            member.name, rupees, coins
+        ))
 
-        await interaction.channel.send(file=discord.File(invoice, "invoice.png"))
+        await interaction.channel.send(file=discord.File(BytesIO(invoice), "invoice.png"))
 
         await interaction.followup.send(
             f"✅ Added **{coins} coins** to {member.mention}"
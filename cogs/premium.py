@@ -1,8 +1,8 @@
 import discord
-import aiosqlite
 import time
 from discord.ext import commands, tasks
 from discord import app_commands
+from utils.db import get_db
 
 # =========================================================
 # CONFIG
@@ -31,46 +31,42 @@ class Premium(commands.Cog):
     async def expiry_loop(self):
         now = int(time.time())
 
-        async with aiosqlite.connect("bot.db") as db:
-            cur = await db.execute(
-                "SELECT user_id, tier FROM premium WHERE expires < ?",
-                (now,)
+        db = get_db()
+        expired = await db.fetchall(
+            "SELECT user_id, tier FROM premium WHERE expires < ?",
+            (now,)
+        )
+
+        for user_id, tier in expired:
+            for guild in self.bot.guilds:
+                member = guild.get_member(user_id)
+                if not member:
+                    continue
+
+                role_id = PREMIUM_ROLES.get(tier)
+                if role_id:
+                    role = guild.get_role(role_id)
+                    if role:
+                        try:
+                            await member.remove_roles(role, reason="Premium expired")
+                        except:
+                            pass
+
+        if expired:
+            await db.executemany(
+                "DELETE FROM premium WHERE user_id=?",
+                [(user_id,) for user_id, _ in expired]
             )
-            expired = await cur.fetchall()
-
-            for user_id, tier in expired:
-                for guild in self.bot.guilds:
-                    member = guild.get_member(user_id)
-                    if not member:
-                        continue
-
-                    role_id = PREMIUM_ROLES.get(tier)
-                    if role_id:
-                        role = guild.get_role(role_id)
-                        if role:
-                            try:
-                                await member.remove_roles(role, reason="Premium expired")
-                            except:
-                                pass
-
-                await db.execute(
-                    "DELETE FROM premium WHERE user_id=?",
-                    (user_id,)
-                )
-
-            await db.commit()
 
     # -----------------------------------------------------
     # /premium — USER STATUS
     # -----------------------------------------------------
     @app_commands.command(name="premium", description="💎 View your premium status")
     async def premium(self, interaction: discord.Interaction):
-        async with aiosqlite.connect("bot.db") as db:
-            cur = await db.execute(
-                "SELECT tier, expires FROM premium WHERE user_id=?",
-                (interaction.user.id,)
-            )
-            row = await cur.fetchone()
+        row = await get_db().fetchone(
+            "SELECT tier, expires FROM premium WHERE user_id=?",
+            (interaction.user.id,)
+        )
 
         if not row:
             return await interaction.response.send_message(
@@ -112,17 +108,15 @@ class Premium(commands.Cog):
 
         expires = int(time.time()) + days * 86400
 
-        async with aiosqlite.connect("bot.db") as db:
-            await db.execute(
-                """
-                INSERT INTO premium (user_id, tier, expires)
-                VALUES (?,?,?)
-                ON CONFLICT(user_id)
-                DO UPDATE SET tier=excluded.tier, expires=excluded.expires
-                """,
-                (member.id, tier, expires)
-            )
-            await db.commit()
+        await get_db().execute(
+            """
+            INSERT INTO premium (user_id, tier, expires)
+            VALUES (?,?,?)
+            ON CONFLICT(user_id)
+            DO UPDATE SET tier=excluded.tier, expires=excluded.expires
+            """,
+            (member.id, tier, expires)
+        )
 
         role = interaction.guild.get_role(PREMIUM_ROLES[tier])
         if role:
@@ -146,26 +140,24 @@ class Premium(commands.Cog):
         interaction: discord.Interaction,
         member: discord.Member
     ):
-        async with aiosqlite.connect("bot.db") as db:
-            cur = await db.execute(
-                "SELECT tier FROM premium WHERE user_id=?",
-                (member.id,)
-            )
-            row = await cur.fetchone()
+        db = get_db()
+        row = await db.fetchone(
+            "SELECT tier FROM premium WHERE user_id=?",
+            (member.id,)
+        )
 
-            if not row:
-                return await interaction.response.send_message(
-                    "❌ User does not have premium.",
-                    ephemeral=True
-                )
+        if not row:
+            return await interaction.response.send_message(
+                "❌ User does not have premium.",
+                ephemeral=True
+            )
 
-            tier = row[0]
+        tier = row[0]
 
-            await db.execute(
-                "DELETE FROM premium WHERE user_id=?",
-                (member.id,)
-            )
-            await db.commit()
+        await db.execute(
+            "DELETE FROM premium WHERE user_id=?",
+            (member.id,)
+        )
 
         role = interaction.guild.get_role(PREMIUM_ROLES.get(tier))
         if role:
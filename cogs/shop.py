@@ -1,57 +1,15 @@
 import discord
-import aiosqlite
 import time
 import asyncio
 from discord.ext import commands
 from discord import app_commands
+from utils.db import get_db
+from utils import ledger
 
 DB_NAME = "bot.db"
 TAX_PERCENT = 5
 
 
-# ================= DATABASE SETUP =================
-async def setup_database():
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS shop_categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE,
-            channel_id INTEGER
-        )
-        """)
-
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS shop_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            price INTEGER,
-            stock INTEGER,
-            image_url TEXT,
-            category_id INTEGER,
-            product_link TEXT
-        )
-        """)
-
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS coins (
-            user_id INTEGER PRIMARY KEY,
-            balance INTEGER DEFAULT 0
-        )
-        """)
-
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            item_name TEXT,
-            total INTEGER,
-            timestamp INTEGER
-        )
-        """)
-
-        await db.commit()
-
-
 # ================= PRODUCT EMBED =================
 def product_embed(guild, item_id, name, price, stock, image_url, category):
     color = discord.Color.red() if stock <= 0 else discord.Color.green()
@@ -107,34 +65,43 @@ class PaymentConfirmView(discord.ui.View):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
+            in_stock = False
+            paid = False
+
+            async with get_db(DB_NAME).transaction() as db:
                 cur = await db.execute(
                     "SELECT stock, product_link FROM shop_items WHERE id=?",
                     (self.item_id,)
                 )
                 row = await cur.fetchone()
 
-                if not row or row[0] <= 0:
-                    return await interaction.followup.send(
-                        "❌ Item is out of stock.", ephemeral=True
+                if row and row[0] > 0:
+                    in_stock = True
+                    paid = await ledger.debit(
+                        interaction.user.id, self.final_price, "shop", self.product_name,
+                        self.item_id, db=db
                     )
 
-                await db.execute(
-                    "UPDATE coins SET balance = balance - ? WHERE user_id=?",
-                    (self.final_price, interaction.user.id)
-                )
+                if paid:
+                    await db.execute(
+                        "UPDATE shop_items SET stock = stock - 1 WHERE id=?",
+                        (self.item_id,)
+                    )
 
-                await db.execute(
-                    "UPDATE shop_items SET stock = stock - 1 WHERE id=?",
-                    (self.item_id,)
-                )
+                    await db.execute("""
+                    INSERT INTO orders (user_id, item_name, total, timestamp)
+                    VALUES (?,?,?,?)
+                    """, (interaction.user.id, self.product_name, self.final_price, int(time.time())))
 
-                await db.execute("""
-                INSERT INTO orders (user_id, item_name, total, timestamp)
-                VALUES (?,?,?,?)
-                """, (interaction.user.id, self.product_name, self.final_price, int(time.time())))
+            if not in_stock:
+                return await interaction.followup.send(
+                    "❌ Item is out of stock.", ephemeral=True
+                )
 
-                await db.commit()
+            if not paid:
+                return await interaction.followup.send(
+                    f"❌ Not enough coins. Need {self.final_price}.", ephemeral=True
+                )
 
             try:
                 await interaction.user.send(
@@ -166,36 +133,34 @@ class BuyModal(discord.ui.Modal, title="🛒 Purchase"):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                cur = await db.execute(
-                    "SELECT name, price, stock, product_link FROM shop_items WHERE id=?",
-                    (self.item_id,)
-                )
-                item = await cur.fetchone()
+            db = get_db(DB_NAME)
+            item = await db.fetchone(
+                "SELECT name, price, stock, product_link FROM shop_items WHERE id=?",
+                (self.item_id,)
+            )
 
-                if not item:
-                    return await interaction.followup.send("❌ Item not found.")
+            if not item:
+                return await interaction.followup.send("❌ Item not found.")
 
-                name, price, stock, link = item
+            name, price, stock, link = item
 
-                if stock <= 0:
-                    return await interaction.followup.send("❌ Out of stock.")
+            if stock <= 0:
+                return await interaction.followup.send("❌ Out of stock.")
 
-                tax = int(price * (TAX_PERCENT / 100))
-                final_price = price + tax
+            tax = int(price * (TAX_PERCENT / 100))
+            final_price = price + tax
 
-                cur = await db.execute(
-                    "SELECT balance FROM coins WHERE user_id=?",
-                    (interaction.user.id,)
-                )
-                bal = await cur.fetchone()
-                balance = bal[0] if bal else 0
+            bal = await db.fetchone(
+                "SELECT balance FROM coins WHERE user_id=?",
+                (interaction.user.id,)
+            )
+            balance = bal[0] if bal else 0
 
-                if balance < final_price:
-                    return await interaction.followup.send(
-                        f"❌ Not enough coins. Need {final_price}.",
-                        ephemeral=True
-                    )
+            if balance < final_price:
+                return await interaction.followup.send(
+                    f"❌ Not enough coins. Need {final_price}.",
+                    ephemeral=True
+                )
 
             embed = discord.Embed(
                 title="Payment",
@@ -237,7 +202,6 @@ class ShopView(discord.ui.View):
 class Shop(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.bot.loop.create_task(setup_database())
 
     # ---------- ADD CATEGORY ----------
     @app_commands.command(name="add_category")
@@ -246,12 +210,10 @@ class Shop(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                await db.execute(
-                    "INSERT OR REPLACE INTO shop_categories(name, channel_id) VALUES(?,?)",
-                    (name, channel.id)
-                )
-                await db.commit()
+            await get_db(DB_NAME).execute(
+                "INSERT OR REPLACE INTO shop_categories(name, channel_id) VALUES(?,?)",
+                (name, channel.id)
+            )
 
             await interaction.followup.send(f"✅ Category `{name}` added.", ephemeral=True)
 
@@ -265,26 +227,23 @@ class Shop(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                cur = await db.execute(
-                    "SELECT id FROM shop_categories WHERE name=?",
-                    (category,)
-                )
-                row = await cur.fetchone()
-
-                if not row:
-                    return await interaction.followup.send(
-                        "❌ Category not found.",
-                        ephemeral=True
-                    )
+            db = get_db(DB_NAME)
+            row = await db.fetchone(
+                "SELECT id FROM shop_categories WHERE name=?",
+                (category,)
+            )
 
-                await db.execute("""
-                INSERT INTO shop_items
-                (name, price, stock, image_url, category_id, product_link)
-                VALUES (?,?,?,?,?,?)
-                """, (name, price, stock, image_url, row[0], product_link))
+            if not row:
+                return await interaction.followup.send(
+                    "❌ Category not found.",
+                    ephemeral=True
+                )
 
-                await db.commit()
+            await db.execute("""
+            INSERT INTO shop_items
+            (name, price, stock, image_url, category_id, product_link)
+            VALUES (?,?,?,?,?,?)
+            """, (name, price, stock, image_url, row[0], product_link))
 
             await interaction.followup.send(f"✅ Product `{name}` added.", ephemeral=True)
 
@@ -297,15 +256,13 @@ class Shop(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                cur = await db.execute("""
-                SELECT shop_items.id, shop_items.name, shop_items.price,
-                       shop_items.stock, shop_items.image_url,
-                       shop_categories.name, shop_categories.channel_id
-                FROM shop_items
-                JOIN shop_categories ON shop_items.category_id = shop_categories.id
-                """)
-                items = await cur.fetchall()
+            items = await get_db(DB_NAME).fetchall("""
+            SELECT shop_items.id, shop_items.name, shop_items.price,
+                   shop_items.stock, shop_items.image_url,
+                   shop_categories.name, shop_categories.channel_id
+            FROM shop_items
+            JOIN shop_categories ON shop_items.category_id = shop_categories.id
+            """)
 
             if not items:
                 return await interaction.followup.send("🛒 Shop empty", ephemeral=True)
@@ -1,6 +1,8 @@
-import discord, time, io, aiosqlite
+import discord, time, io, math
 from discord.ext import commands
 from discord import app_commands
+from utils.db import get_db
+from utils.cooldowns import Cooldown
 
 STAFF_ROLE_ID = 1464425870675411064
 PREMIUM_ROLE_ID = 1463884209025187880
@@ -11,39 +13,37 @@ DB_NAME = "bot.db"
 
 # ================= DATABASE HELPERS =================
 async def save_ticket(channel_id, user_id, category):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "INSERT OR REPLACE INTO tickets (channel_id, user_id, claimed_by, category, created_at) VALUES (?,?,?,?,?)",
-            (channel_id, user_id, None, category, int(time.time()))
-        )
-        await db.commit()
+    await get_db(DB_NAME).execute(
+        "INSERT OR REPLACE INTO tickets (channel_id, user_id, claimed_by, category, created_at) VALUES (?,?,?,?,?)",
+        (channel_id, user_id, None, category, int(time.time()))
+    )
 
 
 async def update_claim(channel_id, staff_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "UPDATE tickets SET claimed_by=? WHERE channel_id=?",
-            (staff_id, channel_id)
-        )
-        await db.commit()
+    await get_db(DB_NAME).execute(
+        "UPDATE tickets SET claimed_by=? WHERE channel_id=?",
+        (staff_id, channel_id)
+    )
 
 
 async def get_ticket(channel_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute(
-            "SELECT user_id, claimed_by FROM tickets WHERE channel_id=?",
-            (channel_id,)
-        ) as cursor:
-            return await cursor.fetchone()
+    return await get_db(DB_NAME).fetchone(
+        "SELECT user_id, claimed_by FROM tickets WHERE channel_id=?",
+        (channel_id,)
+    )
 
 
 async def delete_ticket(channel_id):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute("DELETE FROM tickets WHERE channel_id=?", (channel_id,))
-        await db.commit()
+    await get_db(DB_NAME).execute("DELETE FROM tickets WHERE channel_id=?", (channel_id,))
 
 
 # ================= COOLDOWN =================
+# kept in memory, backed by ticket_cooldowns so it survives restarts
+ticket_cooldown = Cooldown(
+    TICKET_COOLDOWN_SECONDS, persist=("ticket_cooldowns", "user_id", "last_created")
+)
+
+
 async def check_cooldown(user: discord.Member):
     if user.guild_permissions.administrator:
         return 0
@@ -52,28 +52,12 @@ async def check_cooldown(user: discord.Member):
     if any(r.id == PREMIUM_ROLE_ID for r in user.roles):
         return 0
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        async with db.execute(
-            "SELECT last_created FROM ticket_cooldowns WHERE user_id=?",
-            (user.id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-
-    now = int(time.time())
-    if row:
-        remaining = TICKET_COOLDOWN_SECONDS - (now - row[0])
-        if remaining > 0:
-            return remaining
-    return 0
+    await ticket_cooldown.ensure_loaded()
+    return math.ceil(ticket_cooldown.remaining(user.id))
 
 
 async def update_cooldown(user_id: int):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "INSERT OR REPLACE INTO ticket_cooldowns (user_id, last_created) VALUES (?,?)",
-            (user_id, int(time.time()))
-        )
-        await db.commit()
+    await ticket_cooldown.use(user_id)
 
 
 # ================= MODAL =================
@@ -288,12 +272,10 @@ class Tickets(commands.Cog):
         if not (interaction.user.guild_permissions.administrator or staff_role in interaction.user.roles):
             return await interaction.response.send_message("❌ Staff only.", ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute(
-                "SELECT user_id FROM tickets WHERE channel_id=?",
-                (interaction.channel.id,)
-            ) as cursor:
-                ticket = await cursor.fetchone()
+        ticket = await get_db(DB_NAME).fetchone(
+            "SELECT user_id FROM tickets WHERE channel_id=?",
+            (interaction.channel.id,)
+        )
 
         if not ticket:
             return await interaction.response.send_message("❌ This is not a ticket channel.", ephemeral=True)
@@ -1,10 +1,10 @@
 import discord
 import requests
-import aiosqlite
 import re
 from discord.ext import commands, tasks
 from discord import app_commands
 from datetime import datetime
+from utils.db import get_db
 
 DB_NAME = "vtc_events.db"
 API_VTC_EVENTS = "https://api.truckersmp.com/v2/vtc/{}/events"
@@ -18,39 +18,19 @@ class VTCAutoEvents(commands.Cog):
     def cog_unload(self):
         self.sync_events.cancel()
 
-    # ================= DATABASE SETUP =================
-    async def init_db(self):
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS settings (
-                    guild_id INTEGER PRIMARY KEY,
-                    vtc_id INTEGER,
-                    channel_id INTEGER
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS posted_events (
-                    event_id INTEGER PRIMARY KEY
-                )
-            """)
-            await db.commit()
-
+    # ================= DATABASE =================
     async def is_posted(self, event_id: int):
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute(
-                "SELECT event_id FROM posted_events WHERE event_id=?",
-                (event_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                return row is not None
+        row = await get_db(DB_NAME).fetchone(
+            "SELECT event_id FROM posted_events WHERE event_id=?",
+            (event_id,)
+        )
+        return row is not None
 
     async def mark_posted(self, event_id: int):
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute(
-                "INSERT OR IGNORE INTO posted_events(event_id) VALUES(?)",
-                (event_id,)
-            )
-            await db.commit()
+        await get_db(DB_NAME).execute(
+            "INSERT OR IGNORE INTO posted_events(event_id) VALUES(?)",
+            (event_id,)
+        )
 
     # ================= COMMAND =================
     @app_commands.command(
@@ -63,14 +43,10 @@ class VTCAutoEvents(commands.Cog):
         vtc_id: int,
         channel: discord.TextChannel
     ):
-        await self.init_db()
-
-        async with aiosqlite.connect(DB_NAME) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO settings(guild_id, vtc_id, channel_id)
-                VALUES(?, ?, ?)
-            """, (interaction.guild.id, vtc_id, channel.id))
-            await db.commit()
+        await get_db(DB_NAME).execute("""
+            INSERT OR REPLACE INTO settings(guild_id, vtc_id, channel_id)
+            VALUES(?, ?, ?)
+        """, (interaction.guild.id, vtc_id, channel.id))
 
         await interaction.response.send_message(
             f"✅ Auto-sync enabled for VTC **{vtc_id}** in {channel.mention}"
@@ -79,13 +55,9 @@ class VTCAutoEvents(commands.Cog):
     # ================= AUTO SYNC LOOP =================
     @tasks.loop(minutes=1)
     async def sync_events(self):
-        await self.init_db()
-
-        async with aiosqlite.connect(DB_NAME) as db:
-            async with db.execute(
-                "SELECT guild_id, vtc_id, channel_id FROM settings"
-            ) as cursor:
-                rows = await cursor.fetchall()
+        rows = await get_db(DB_NAME).fetchall(
+            "SELECT guild_id, vtc_id, channel_id FROM settings"
+        )
 
         for guild_id, vtc_id, channel_id in rows:
             try:
@@ -181,7 +153,6 @@ class VTCAutoEvents(commands.Cog):
     @sync_events.before_loop
     async def before_sync(self):
         await self.bot.wait_until_ready()
-        await self.init_db()
 
 
 # ================= SETUP =================
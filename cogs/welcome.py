@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiosqlite
+from utils.db import get_db
 
 DB_NAME = "bot.db"
 
@@ -26,18 +26,16 @@ class Welcome(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                await db.execute("""
-                INSERT OR REPLACE INTO guild_settings
-                (guild_id, welcome_channel, welcome_role, welcome_message)
-                VALUES (?, ?, ?, ?)
-                """, (
-                    interaction.guild.id,
-                    channel.id,
-                    role.id,
-                    message
-                ))
-                await db.commit()
+            await get_db(DB_NAME).execute("""
+            INSERT OR REPLACE INTO guild_settings
+            (guild_id, welcome_channel, welcome_role, welcome_message)
+            VALUES (?, ?, ?, ?)
+            """, (
+                interaction.guild.id,
+                channel.id,
+                role.id,
+                message
+            ))
 
             await interaction.followup.send(
                 "✅ Welcome system configured!\n\n"
@@ -56,11 +54,9 @@ class Welcome(commands.Cog):
         await interaction.response.defer(ephemeral=True)
 
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                cursor = await db.execute("""
-                SELECT welcome_message FROM guild_settings WHERE guild_id=?
-                """, (interaction.guild.id,))
-                row = await cursor.fetchone()
+            row = await get_db(DB_NAME).fetchone("""
+            SELECT welcome_message FROM guild_settings WHERE guild_id=?
+            """, (interaction.guild.id,))
 
             if not row:
                 return await interaction.followup.send("❌ Welcome not configured.")
@@ -91,12 +87,10 @@ class Welcome(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         try:
-            async with aiosqlite.connect(DB_NAME) as db:
-                cursor = await db.execute("""
-                SELECT welcome_channel, welcome_role, welcome_message
-                FROM guild_settings WHERE guild_id=?
-                """, (member.guild.id,))
-                row = await cursor.fetchone()
+            row = await get_db(DB_NAME).fetchone("""
+            SELECT welcome_channel, welcome_role, welcome_message
+            FROM guild_settings WHERE guild_id=?
+            """, (member.guild.id,))
 
             if not row:
                 return
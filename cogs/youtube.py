@@ -1,15 +1,24 @@
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-import aiohttp
-import aiosqlite
 import os
 import re
+from collections import defaultdict
+from utils.db import get_db
+from utils.youtube_poller import YouTubePoller, API_BASE, FEED_BASE
 
 DB_NAME = "bot.db"
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 CHECK_INTERVAL = 10  # seconds (fast live detection)
 
+# feeds + conditional requests make a check nearly free; point these at
+# a local stand-in server to test without touching the real API
+poller = YouTubePoller(
+    YOUTUBE_API_KEY,
+    api_base=os.getenv("YOUTUBE_API_BASE", API_BASE),
+    feed_base=os.getenv("YOUTUBE_FEED_BASE", FEED_BASE),
+)
+
 
 # =========================
 # Resolve Channel ID from URL / @handle / ID
@@ -23,21 +32,7 @@ async def resolve_channel_id(input_text: str):
     if not match:
         return None
 
-    handle = match.group(1)
-
-    url = (
-        "https://www.googleapis.com/youtube/v3/channels"
-        f"?part=id&forHandle=@{handle}&key={YOUTUBE_API_KEY}"
-    )
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            data = await resp.json()
-
-    if not data.get("items"):
-        return None
-
-    return data["items"][0]["id"]
+    return await poller.resolve_handle(match.group(1))
 
 
 # =========================
@@ -47,6 +42,10 @@ class YouTube(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_unload(self):
+        self.check_videos.cancel()
+        await poller.close()
+
     # -------------------------
     # Start loop safely
     # -------------------------
@@ -76,20 +75,18 @@ class YouTube(commands.Cog):
             if not channel_id:
                 return await interaction.followup.send("❌ Invalid YouTube channel URL or ID")
 
-            async with aiosqlite.connect(DB_NAME) as db:
-                await db.execute("""
-                INSERT OR REPLACE INTO youtube_alerts
-                (guild_id, youtube_channel, discord_channel, role_ping, message, last_video)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    interaction.guild.id,
-                    channel_id,
-                    discord_channel.id,
-                    role.id if role else None,
-                    message,
-                    None
-                ))
-                await db.commit()
+            await get_db(DB_NAME).execute("""
+            INSERT OR REPLACE INTO youtube_alerts
+            (guild_id, youtube_channel, discord_channel, role_ping, message, last_video)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                interaction.guild.id,
+                channel_id,
+                discord_channel.id,
+                role.id if role else None,
+                message,
+                None
+            ))
 
             await interaction.followup.send(f"✅ YouTube channel added:\n`{channel_id}`")
 
@@ -124,12 +121,10 @@ class YouTube(commands.Cog):
             if not channel_id:
                 return await interaction.followup.send("❌ Invalid channel")
 
-            async with aiosqlite.connect(DB_NAME) as db:
-                await db.execute(
-                    "DELETE FROM youtube_alerts WHERE guild_id=? AND youtube_channel=?",
-                    (interaction.guild.id, channel_id)
-                )
-                await db.commit()
+            await get_db(DB_NAME).execute(
+                "DELETE FROM youtube_alerts WHERE guild_id=? AND youtube_channel=?",
+                (interaction.guild.id, channel_id)
+            )
 
             await interaction.followup.send("✅ Channel removed")
 
@@ -143,12 +138,10 @@ class YouTube(commands.Cog):
     async def list_channels(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            cursor = await db.execute(
-                "SELECT youtube_channel FROM youtube_alerts WHERE guild_id=?",
-                (interaction.guild.id,)
-            )
-            rows = await cursor.fetchall()
+        rows = await get_db(DB_NAME).fetchall(
+            "SELECT youtube_channel FROM youtube_alerts WHERE guild_id=?",
+            (interaction.guild.id,)
+        )
 
         if not rows:
             return await interaction.followup.send("❌ No channels added")
@@ -161,125 +154,88 @@ class YouTube(commands.Cog):
     # -------------------------
     @app_commands.command(name="youtube_test")
     async def youtube_test(self, interaction: discord.Interaction):
-        await interaction.response.send_message("✅ YouTube system running", ephemeral=True)
+        s = poller.snapshot()
+        calls = " • ".join(f"{name} `{n}`" for name, n in sorted(s["calls"].items())) or "none yet"
+        await interaction.response.send_message(
+            "✅ YouTube system running\n"
+            f"Channels `{s['channels']}` • ticks `{s['ticks']}` • not modified `{s['not_modified']}` • "
+            f"feed fallbacks `{s['feed_fallbacks']}`\n"
+            f"Last tick: `{s['last_tick_channels']}` channels in `{s['last_tick_ms']}ms` • "
+            f"quota `{s['last_tick_quota']}` (today `{s['quota_today']}`)\n"
+            f"Requests: {calls}",
+            ephemeral=True
+        )
 
     # -------------------------
-    # FETCH VIDEO (LIVE first)
+    # LOOP
     # -------------------------
-    async def fetch_latest_video(self, channel_id):
-        base = "https://www.googleapis.com/youtube/v3/search"
+    @tasks.loop(seconds=CHECK_INTERVAL)
+    async def check_videos(self):
+        if not YOUTUBE_API_KEY:
+            print("❌ YOUTUBE_API_KEY missing")
+            return
 
-        # 🔴 LIVE first
-        live_url = (
-            f"{base}?part=snippet&channelId={channel_id}"
-            f"&eventType=live&type=video&order=date&key={YOUTUBE_API_KEY}"
-        )
+        rows = await get_db(DB_NAME).fetchall("SELECT * FROM youtube_alerts")
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(live_url) as resp:
-                live_data = await resp.json()
-
-        if live_data.get("items"):
-            item = live_data["items"][0]
-            video_id = item["id"]["videoId"]
-            title = item["snippet"]["title"]
-            thumb = item["snippet"]["thumbnails"]["high"]["url"]
-
-            return {
-                "video_id": video_id,
-                "title": title,
-                "url": f"https://youtu.be/{video_id}",
-                "thumbnail": thumb,
-                "type": "🔴 LIVE"
-            }
-
-        # 📺 Normal / Shorts
-        normal_url = (
-            f"{base}?part=snippet&channelId={channel_id}"
-            f"&maxResults=1&order=date&type=video&key={YOUTUBE_API_KEY}"
-        )
+        # each YouTube channel is fetched once, then fanned out to every guild
+        subscriptions = defaultdict(list)
+        for row in rows:
+            subscriptions[row[1]].append(row)
+        poller.forget(subscriptions)
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(normal_url) as resp:
-                data = await resp.json()
+        poller.begin_tick()
+        try:
+            latest = await poller.poll(list(subscriptions))
+        finally:
+            poller.end_tick()
 
-        if not data.get("items"):
-            return None
+        for yt_channel, subs in subscriptions.items():
+            data = latest.get(yt_channel)
+            if not data:
+                continue
 
-        item = data["items"][0]
-        video_id = item["id"]["videoId"]
-        title = item["snippet"]["title"]
-        thumb = item["snippet"]["thumbnails"]["high"]["url"]
+            for row in subs:
+                try:
+                    await self.send_alert(row, data)
+                except Exception as e:
+                    print("❌ YouTube loop error:", e)
 
-        is_shorts = "#short" in title.lower()
+    async def send_alert(self, row, data):
+        guild_id, yt_channel, discord_channel_id, role_ping, message, last_video = row
 
-        return {
-            "video_id": video_id,
-            "title": title,
-            "url": f"https://youtu.be/{video_id}",
-            "thumbnail": thumb,
-            "type": "🎬 SHORTS" if is_shorts else "📺 VIDEO"
-        }
+        if data["video_id"] == last_video:
+            return
 
-    # -------------------------
-    # LOOP
-    # -------------------------
-    @tasks.loop(seconds=CHECK_INTERVAL)
-    async def check_videos(self):
-        if not YOUTUBE_API_KEY:
-            print("❌ YOUTUBE_API_KEY missing")
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
             return
 
-        async with aiosqlite.connect(DB_NAME) as db:
-            cursor = await db.execute("SELECT * FROM youtube_alerts")
-            rows = await cursor.fetchall()
+        channel = guild.get_channel(discord_channel_id)
+        if not channel:
+            return
 
-        for row in rows:
-            guild_id, yt_channel, discord_channel_id, role_ping, message, last_video = row
-
-            try:
-                data = await self.fetch_latest_video(yt_channel)
-                if not data:
-                    continue
-
-                if data["video_id"] == last_video:
-                    continue
-
-                guild = self.bot.get_guild(guild_id)
-                if not guild:
-                    continue
-
-                channel = guild.get_channel(discord_channel_id)
-                if not channel:
-                    continue
-
-                role_text = f"<@&{role_ping}>\n" if role_ping else ""
-
-                embed = discord.Embed(
-                    title=f"{data['type']} Alert",
-                    description=data["title"],
-                    color=discord.Color.red()
-                )
-                embed.set_image(url=data["thumbnail"])
-                embed.add_field(name="Watch", value=data["url"])
-
-                text = (
-                    message.replace("{title}", data["title"])
-                    .replace("{url}", data["url"])
-                    .replace("{type}", data["type"])
-                )
-
-                await channel.send(content=role_text + text, embed=embed)
-
-                async with aiosqlite.connect(DB_NAME) as db:
-                    await db.execute(
-                        "UPDATE youtube_alerts SET last_video=? WHERE guild_id=? AND youtube_channel=?",
-                        (data["video_id"], guild_id, yt_channel)
-                    )
-                    await db.commit()
-
-            except Exception as e:
-                print("❌ YouTube loop error:", e)
+        role_text = f"<@&{role_ping}>\n" if role_ping else ""
+
+        embed = discord.Embed(
+            title=f"{data['type']} Alert",
+            description=data["title"],
+            color=discord.Color.red()
+        )
+        embed.set_image(url=data["thumbnail"])
+        embed.add_field(name="Watch", value=data["url"])
+
+        text = (
+            message.replace("{title}", data["title"])
+            .replace("{url}", data["url"])
+            .replace("{type}", data["type"])
+        )
+
+        await channel.send(content=role_text + text, embed=embed)
+
+        await get_db(DB_NAME).execute(
+            "UPDATE youtube_alerts SET last_video=? WHERE guild_id=? AND youtube_channel=?",
+            (data["video_id"], guild_id, yt_channel)
+        )
 
     @check_videos.before_loop
     async def before_loop(self):
@@ -1,12 +1,17 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import os
 from dotenv import load_dotenv
 import threading
 
-from utils.db import init_db
-from utils.backup import backup_db
+from utils.db import open_databases, close_databases, get_db
+from utils.migrations import run_migrations
+from utils.activity import activity
+from utils.render import render
+from utils.voice_sessions import voice
+from utils.message_pipeline import pipeline
+from utils.voice_connections import connections
 
 # ================================
 # LOAD ENV
@@ -56,9 +61,18 @@ COGS = [
 # ================================
 class MyBot(commands.Bot):
     async def setup_hook(self):
-        await init_db()
+        await open_databases()
+        self.db = get_db()
+        await run_migrations()
+        activity.start()
+        voice.start(self)
+        pipeline.start(self)
+        connections.start(self)
         print("✅ Database initialized")
 
+        render.start()
+        print("✅ Render pool started")
+
         for cog in COGS:
             try:
                 await self.load_extension(cog)
@@ -69,20 +83,16 @@ class MyBot(commands.Bot):
         await self.tree.sync()
         print("✅ Slash commands synced")
 
+    async def close(self):
+        connections.close()
+        await super().close()
+        render.close()
+        await activity.close()
+        await close_databases()
+        print("✅ Database connections closed")
 
-bot = MyBot(command_prefix="!", intents=intents)
 
-# ================================
-# BACKUP TASK
-# ================================
-@tasks.loop(hours=6)
-async def db_backup_loop():
-    backup_db()
-    print("💾 Database backup created")
-
-@db_backup_loop.before_loop
-async def before_backup():
-    await bot.wait_until_ready()
+bot = MyBot(command_prefix="!", intents=intents)
 
 # ================================
 # BOT EVENTS
@@ -91,9 +101,6 @@ async def before_backup():
 async def on_ready():
     print(f"🤖 Logged in as {bot.user}")
 
-    if not db_backup_loop.is_running():
-        db_backup_loop.start()
-
     print("✅ Bot fully ready")
 
 
@@ -173,4 +180,6 @@ async def main():
     await bot.start(token)
 
 
-asyncio.run(main())
+# render workers are spawned and import this module; only the parent runs the bot
+if __name__ == "__main__":
+    asyncio.run(main())
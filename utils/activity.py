@@ -0,0 +1,186 @@
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from utils.db import get_db, register_invalidator
+from utils import ledger
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+FLUSH_INTERVAL = 5        # seconds between background flushes
+FLUSH_EVERY_EVENTS = 200  # flush early once this many changes pile up
+MAX_CACHED_LEVELS = 5000  # clean cache entries dropped after a flush beyond this
+
+
+# =========================================================
+# WRITE-BEHIND BUFFER FOR XP + COINS
+# =========================================================
+# Chat/voice XP and chat coin awards are folded in memory per
+# (user, guild) and written in one transaction every few seconds.
+# The cached level state is authoritative while it is in memory, so
+# level-up checks run immediately without touching the database.
+# Coins are kept per (user, source, reason) and land in the coin
+# ledger as one batched post per flush.
+
+class LevelState:
+    __slots__ = ("xp", "level")
+
+    def __init__(self, xp: int, level: int):
+        self.xp = xp
+        self.level = level
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self.levels = {}
+        self.dirty_levels = set()
+        self.coin_deltas = defaultdict(int)
+        self.pending_by_user = defaultdict(int)
+        self.pending_events = 0
+        self.generation = 0
+        self._flush_lock = asyncio.Lock()
+        self._loop_task = None
+        self._early_flush = None
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                print("❌ Activity flush error:", e)
+
+    def invalidate(self):
+        # cached levels are absolute values from the old database, so they
+        # are dropped; coin deltas are still valid on top of any data
+        self.levels.clear()
+        self.dirty_levels.clear()
+        self.generation += 1
+
+    # ---------------- LEVELS ----------------
+    async def level_state(self, user_id: int, guild_id: int) -> LevelState:
+        key = (user_id, guild_id)
+        state = self.levels.get(key)
+        if state is not None:
+            return state
+
+        generation = self.generation
+        row = await get_db(DB_NAME).fetchone(
+            "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?",
+            (user_id, guild_id)
+        )
+        if self.generation != generation:
+            return await self.level_state(user_id, guild_id)
+
+        # another message may have loaded it while we awaited
+        state = self.levels.get(key)
+        if state is None:
+            xp, level = row if row else (0, 1)
+            state = LevelState(xp or 0, level or 1)
+            self.levels[key] = state
+        return state
+
+    def touch_level(self, user_id: int, guild_id: int):
+        self.dirty_levels.add((user_id, guild_id))
+        self._count_event()
+
+    # ---------------- COINS ----------------
+    def add_coins(self, user_id: int, amount: int, source: str, reason: str = ""):
+        if amount:
+            self.coin_deltas[(user_id, source, reason)] += amount
+            self.pending_by_user[user_id] += amount
+            self._count_event()
+
+    def pending_coins(self, user_id: int) -> int:
+        return self.pending_by_user.get(user_id, 0)
+
+    # ---------------- FLUSH ----------------
+    def _count_event(self):
+        self.pending_events += 1
+        if self.pending_events >= FLUSH_EVERY_EVENTS:
+            if self._early_flush is None or self._early_flush.done():
+                self._early_flush = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._flush_lock:
+            await self._flush()
+
+    @asynccontextmanager
+    async def hold(self):
+        """Flush, then keep flushes out while the caller rewrites rows."""
+        async with self._flush_lock:
+            await self._flush()
+            yield
+
+    async def _flush(self):
+        if not self.dirty_levels and not self.coin_deltas:
+            return
+
+        dirty, self.dirty_levels = self.dirty_levels, set()
+        # coins stay in the buffer (and in pending_coins) until they commit,
+        # so balances never miss them while we wait for the writer
+        coins = dict(self.coin_deltas)
+        self.pending_events = 0
+
+        level_rows = [
+            (user_id, guild_id, self.levels[(user_id, guild_id)].xp,
+             self.levels[(user_id, guild_id)].level)
+            for user_id, guild_id in dirty
+            if (user_id, guild_id) in self.levels
+        ]
+        generation = self.generation
+        coin_rows = [
+            (user_id, delta, source, reason, None)
+            for (user_id, source, reason), delta in coins.items()
+            if delta
+        ]
+
+        try:
+            async with get_db(DB_NAME).transaction() as db:
+                # a restore swapped the database while we waited for the lock
+                if self.generation != generation:
+                    level_rows = []
+                if level_rows:
+                    await db.executemany(
+                        "INSERT INTO levels (user_id, guild_id, xp, level) VALUES (?,?,?,?) "
+                        "ON CONFLICT(user_id, guild_id) DO UPDATE "
+                        "SET xp=excluded.xp, level=excluded.level",
+                        level_rows
+                    )
+                if coin_rows:
+                    await ledger.post(db, coin_rows)
+        except Exception:
+            # keep the level changes for the next attempt
+            self.dirty_levels |= dirty
+            raise
+
+        # committed: take out what was written, keep anything added meanwhile
+        for (user_id, source, reason), delta in coins.items():
+            key = (user_id, source, reason)
+            self.coin_deltas[key] -= delta
+            if not self.coin_deltas[key]:
+                del self.coin_deltas[key]
+            self.pending_by_user[user_id] -= delta
+            if not self.pending_by_user[user_id]:
+                del self.pending_by_user[user_id]
+
+        if len(self.levels) > MAX_CACHED_LEVELS:
+            for key in list(self.levels):
+                if key not in self.dirty_levels:
+                    del self.levels[key]
+
+
+activity = ActivityBuffer()
+register_invalidator(activity.invalidate)
@@ -1,74 +1,248 @@
+import asyncio
+import os
 import shutil
+import sqlite3
 import time
-import os
 
-DB_FILE = "bot.db"
+from utils.db import DB_FILES, get_db, writers_paused, invalidate_caches
+from utils.backup_store import BackupStore
+from utils.migrations import migrate
+
 BACKUP_DIR = "db_backups"
+WORK_DIR = os.path.join(BACKUP_DIR, "work")
+
+store = BackupStore(BACKUP_DIR)
+
+# backups and restores never overlap: a restore removes WAL files that
+# a backup's pinned snapshot could still be reading
+_job_lock = asyncio.Lock()
 
 # ===============================
 # CONFIG
 # ===============================
-MAX_BACKUPS = 50   # keep latest 50 backups only
+PAGES_PER_STEP = 256  # pages copied per backup step
+STEP_PAUSE = 0.002    # seconds between steps so the bot's writers get the file
+
+# ===============================
+# HOW IT WORKS
+# ===============================
+# All three database files are copied as one consistent set with the
+# sqlite3 online backup API, on a worker thread:
+#
+#   1. every writer lock is held for a moment while the worker opens a
+#      read transaction on each file (pins one WAL snapshot per file)
+#   2. the locks are released; the bot keeps writing while the worker
+#      copies the pinned snapshots page by page
+#   3. each copy is checked with PRAGMA quick_check, then split into
+#      page-aligned chunks in the deduplicated store (utils/backup_store)
+#
+# Retention is grandfather-father-son (hourly/daily/weekly) and any
+# snapshot can be rebuilt from its chunks for a restore.
+#
+# A restore is hot: the snapshot files are rebuilt and checked first,
+# then with every writer paused and every reader drained each live file
+# is swapped for its rebuilt copy with os.replace, the connections are
+# reopened and in-memory caches are invalidated. No restart needed.
+
+
+# ===============================
+# WORKER THREAD
+# ===============================
+def _pin_snapshots(paths):
+    conns = {}
+    try:
+        for path in paths:
+            conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            conns[path] = conn
+    except Exception:
+        for conn in conns.values():
+            conn.close()
+        raise
+    return conns
+
+
+def _step_pause(status, remaining, total):
+    if remaining:
+        time.sleep(STEP_PAUSE)
+
+
+def _copy_snapshot(src, target: str) -> str:
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst, pages=PAGES_PER_STEP, progress=_step_pause)
+        return dst.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        dst.close()
+
+
+def _backup_set(paths, name: str, on_pinned) -> dict:
+    conns = _pin_snapshots(paths)
+    on_pinned()
+
+    work = os.path.join(WORK_DIR, name)
+    os.makedirs(work, exist_ok=True)
+    started = time.perf_counter()
+
+    try:
+        files = {}
+        for path, src in conns.items():
+            target = os.path.join(work, os.path.basename(path))
+            check = _copy_snapshot(src, target)
+            if check != "ok":
+                raise RuntimeError(f"quick_check failed for {path}: {check}")
+            files[path] = target
+
+        for conn in conns.values():
+            conn.close()
+        conns = {}
+
+        manifest = store.add(name, files, {"quick_check": "ok"})
+    finally:
+        for conn in conns.values():
+            conn.close()
+        shutil.rmtree(work, ignore_errors=True)
+
+    manifest["seconds"] = round(time.perf_counter() - started, 3)
+    return manifest
+
+
+def _extract_set(name: str, paths) -> dict:
+    """Rebuild and check every file of a snapshot. Returns path -> rebuilt file."""
+    work = os.path.join(WORK_DIR, f"restore_{name}")
+    os.makedirs(work, exist_ok=True)
+    manifest = store.manifest(name)
+
+    rebuilt = {}
+    try:
+        for path in paths:
+            if path not in manifest["files"]:
+                continue
+
+            target = os.path.join(work, os.path.basename(path))
+            store.extract(name, path, target)
+
+            conn = sqlite3.connect(target)
+            try:
+                check = conn.execute("PRAGMA quick_check").fetchone()[0]
+            finally:
+                conn.close()
+            if check != "ok":
+                raise RuntimeError(f"quick_check failed for {path} in {name}: {check}")
+
+            rebuilt[path] = target
+    except Exception:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return rebuilt
+
+
+def _count_rows(path: str) -> dict:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+    finally:
+        conn.close()
+
 
 # ===============================
 # CREATE BACKUP
 # ===============================
-def backup_db():
-    if not os.path.exists(DB_FILE):
-        raise FileNotFoundError("bot.db not found")
+async def backup_db(paths=DB_FILES) -> dict:
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found")
+
+    os.makedirs(WORK_DIR, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    pinned = loop.create_future()
 
-    os.makedirs(BACKUP_DIR, exist_ok=True)
+    def on_pinned():
+        loop.call_soon_threadsafe(lambda: pinned.done() or pinned.set_result(None))
 
-    ts = time.strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(BACKUP_DIR, f"bot_{ts}.db")
+    async with _job_lock:
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        name = f"set_{stamp}"
+        taken = set(store.snapshots())
+        suffix = 1
+        while name in taken:
+            suffix += 1
+            name = f"set_{stamp}_{suffix}"
 
-    shutil.copyfile(DB_FILE, backup_path)
+        # writers only wait while the snapshots are being pinned
+        async with writers_paused(paths):
+            job = loop.run_in_executor(None, _backup_set, paths, name, on_pinned)
+            await asyncio.wait({pinned, job}, return_when=asyncio.FIRST_COMPLETED)
 
-    cleanup_old_backups()
-    return backup_path
+        manifest = await job
+        await asyncio.to_thread(cleanup_old_backups)
+    return manifest
 
 # ===============================
 # RESTORE BACKUP
 # ===============================
-def restore_backup(filename: str):
-    path = os.path.join(BACKUP_DIR, filename)
-    if not os.path.exists(path):
-        raise FileNotFoundError("Backup file not found")
+async def restore_diff(name: str, paths=DB_FILES):
+    """Dry run: row counts per table, live vs snapshot, for changed tables."""
+    async with _job_lock:
+        rebuilt = await asyncio.to_thread(_extract_set, name, paths)
+        try:
+            changes = []
+            for path, snapshot in rebuilt.items():
+                live = await asyncio.to_thread(_count_rows, path)
+                restored = await asyncio.to_thread(_count_rows, snapshot)
+                for table in sorted(set(live) | set(restored)):
+                    before, after = live.get(table), restored.get(table)
+                    if before != after:
+                        changes.append((path, table, before, after))
+            return changes
+        finally:
+            shutil.rmtree(os.path.join(WORK_DIR, f"restore_{name}"), ignore_errors=True)
+
 
-    shutil.copyfile(path, DB_FILE)
+async def restore_backup(name: str, paths=DB_FILES):
+    async with _job_lock:
+        rebuilt = await asyncio.to_thread(_extract_set, name, paths)
+        try:
+            # in-flight transactions finish before the locks are granted
+            async with writers_paused(rebuilt):
+                for path, snapshot in rebuilt.items():
+                    await get_db(path).swap_file(snapshot)
+                invalidate_caches()
+
+            # an older snapshot may predate the current schema
+            for path in rebuilt:
+                await migrate(path)
+        finally:
+            shutil.rmtree(os.path.join(WORK_DIR, f"restore_{name}"), ignore_errors=True)
 
 # ===============================
 # LIST BACKUPS WITH SIZE
 # ===============================
 def list_backups_with_size():
-    if not os.path.exists(BACKUP_DIR):
-        return []
+    # size is the full reconstructed size of the set
+    return [
+        (name, round(store.logical_size(name) / (1024 * 1024), 2))
+        for name in store.snapshots()
+    ]
 
-    backups = []
-    for f in os.listdir(BACKUP_DIR):
-        if f.endswith(".db"):
-            path = os.path.join(BACKUP_DIR, f)
-            size_mb = os.path.getsize(path) / (1024 * 1024)
-            backups.append((f, round(size_mb, 2)))
 
-    # newest first
-    backups.sort(reverse=True)
-    return backups
+def store_usage() -> dict:
+    names = store.snapshots()
+    logical = sum(store.logical_size(name) for name in names)
+    return {
+        "snapshots": len(names),
+        "logical_mb": round(logical / (1024 * 1024), 2),
+        "stored_mb": round(store.stored_size() / (1024 * 1024), 2),
+    }
 
 # ===============================
 # AUTO CLEANUP OLD BACKUPS
 # ===============================
 def cleanup_old_backups():
-    files = sorted(
-        [f for f in os.listdir(BACKUP_DIR) if f.endswith(".db")],
-        reverse=True
-    )
-
-    if len(files) <= MAX_BACKUPS:
-        return
-
-    for old in files[MAX_BACKUPS:]:
-        try:
-            os.remove(os.path.join(BACKUP_DIR, old))
-        except:
-            pass
+    return store.prune()
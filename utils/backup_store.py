@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+# ===============================
+# CONFIG
+# ===============================
+CHUNK_SIZE = 64 * 1024   # 16 SQLite pages at the default 4 KiB page size
+COMPRESS_LEVEL = 6
+
+KEEP_LAST = 6      # most recent snapshots, whatever their age
+KEEP_HOURLY = 24   # newest snapshot of each of the last 24 hours
+KEEP_DAILY = 7     # ... of each of the last 7 days
+KEEP_WEEKLY = 4    # ... of each of the last 4 ISO weeks
+
+# ===============================
+# LAYOUT
+# ===============================
+# <root>/chunks/ab/abcdef...   zlib-compressed chunk, named by the
+#                              sha256 of its uncompressed bytes
+# <root>/snapshots/<name>.json manifest: per database file, its size
+#                              and the ordered list of chunk hashes
+#
+# Chunks are page aligned, so a snapshot only adds the chunks whose
+# pages changed since an earlier snapshot. Unreferenced chunks are
+# removed after retention drops a snapshot.
+
+
+class BackupStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.snapshot_dir = os.path.join(root, "snapshots")
+        self._lock = threading.Lock()
+
+    # ---------------- CHUNKS ----------------
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def _put_chunk(self, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, COMPRESS_LEVEL)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+        return digest, len(packed)
+
+    def _get_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Backup chunk {digest[:12]} is corrupt")
+        return data
+
+    # ---------------- SNAPSHOTS ----------------
+    def add(self, name: str, files: dict, meta: dict = None) -> dict:
+        """Store a snapshot. `files` maps database name -> file to ingest."""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        manifest = {"name": name, "created_at": int(time.time()), "files": {}}
+        manifest.update(meta or {})
+
+        with self._lock:
+            new_bytes = 0
+            for db_name, source in files.items():
+                chunks = []
+                with open(source, "rb") as f:
+                    while True:
+                        data = f.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        digest, stored = self._put_chunk(data)
+                        chunks.append(digest)
+                        new_bytes += stored
+
+                entry = manifest["files"].setdefault(db_name, {})
+                entry["size"] = os.path.getsize(source)
+                entry["chunks"] = chunks
+
+            manifest["new_bytes"] = new_bytes
+            path = os.path.join(self.snapshot_dir, f"{name}.json")
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(f"{path}.tmp", path)
+
+        return manifest
+
+    def manifest(self, name: str) -> dict:
+        path = os.path.join(self.snapshot_dir, f"{name}.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError("Backup snapshot not found")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshots(self):
+        if not os.path.exists(self.snapshot_dir):
+            return []
+        return sorted(
+            (f[:-5] for f in os.listdir(self.snapshot_dir) if f.endswith(".json")),
+            reverse=True
+        )
+
+    def extract(self, name: str, db_name: str, target: str):
+        """Rebuild one database file of a snapshot at `target`."""
+        entry = self.manifest(name)["files"].get(db_name)
+        if entry is None:
+            raise FileNotFoundError(f"{db_name} is not part of {name}")
+
+        tmp = f"{target}.tmp"
+        with open(tmp, "wb") as f:
+            for digest in entry["chunks"]:
+                f.write(self._get_chunk(digest))
+        os.replace(tmp, target)
+
+    # ---------------- RETENTION ----------------
+    def _keep(self, names):
+        """Grandfather-father-son: the last few snapshots, then the newest
+        snapshot per hour / day / ISO week bucket."""
+        now = time.time()
+        tiers = (
+            (KEEP_HOURLY, 3600, "%Y%m%d%H"),
+            (KEEP_DAILY, 86400, "%Y%m%d"),
+            (KEEP_WEEKLY, 7 * 86400, "%G%V"),
+        )
+
+        created = {}
+        for name in names:
+            try:
+                created[name] = self.manifest(name)["created_at"]
+            except (OSError, ValueError, KeyError):
+                created[name] = 0
+        names = sorted(names, key=created.get, reverse=True)
+
+        keep = set(names[:KEEP_LAST])
+        for count, span, fmt in tiers:
+            seen = set()
+            for name in names:  # newest first
+                ts = created[name]
+                if now - ts > count * span:
+                    continue
+                bucket = time.strftime(fmt, time.localtime(ts))
+                if bucket not in seen:
+                    seen.add(bucket)
+                    keep.add(name)
+        return keep
+
+    def prune(self) -> dict:
+        with self._lock:
+            names = self.snapshots()
+            keep = self._keep(names)
+
+            dropped = [n for n in names if n not in keep]
+            for name in dropped:
+                os.remove(os.path.join(self.snapshot_dir, f"{name}.json"))
+
+            referenced = set()
+            for name in keep:
+                for entry in self.manifest(name)["files"].values():
+                    referenced.update(entry["chunks"])
+
+            removed_chunks = 0
+            if os.path.exists(self.chunk_dir):
+                for prefix in os.listdir(self.chunk_dir):
+                    folder = os.path.join(self.chunk_dir, prefix)
+                    for digest in os.listdir(folder):
+                        if digest not in referenced:
+                            os.remove(os.path.join(folder, digest))
+                            removed_chunks += 1
+
+        return {"snapshots": len(dropped), "chunks": removed_chunks}
+
+    # ---------------- STATS ----------------
+    def logical_size(self, name: str) -> int:
+        return sum(e["size"] for e in self.manifest(name)["files"].values())
+
+    def stored_size(self) -> int:
+        total = 0
+        if os.path.exists(self.chunk_dir):
+            for prefix in os.listdir(self.chunk_dir):
+                folder = os.path.join(self.chunk_dir, prefix)
+                total += sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder))
+        return total
@@ -0,0 +1,209 @@
+import time
+
+from utils.db import get_db, register_invalidator
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+WHEEL_RESOLUTION = 1.0   # seconds per wheel slot
+MAX_WHEEL_SLOTS = 4096
+
+
+# =========================================================
+# COOLDOWNS + RATE LIMITS
+# =========================================================
+# Per-key state lives in a dict (O(1) lookups) and is dropped as soon
+# as it stops mattering: a cooldown once it has run out, a token bucket
+# once it has refilled. Expiry is driven by a timer wheel: every key is
+# filed in the slot of the tick it expires in, and each access sweeps
+# only the slots whose tick has passed since the last access. Memory is
+# bounded by the keys active within one cooldown window, not by every
+# user ever seen.
+#
+# A cooldown can be backed by a table (key column, last-used column)
+# so long cooldowns survive restarts; the table is only read on load
+# and written on use.
+
+class TimerWheel:
+    __slots__ = ("resolution", "slots", "cursor")
+
+    def __init__(self, horizon: float, resolution: float = WHEEL_RESOLUTION):
+        self.resolution = resolution
+        size = min(int(horizon / resolution) + 2, MAX_WHEEL_SLOTS)
+        self.slots = [set() for _ in range(size)]
+        self.cursor = None
+
+    def schedule(self, key, when: float):
+        self.slots[int(when // self.resolution) % len(self.slots)].add(key)
+
+    def due(self, now: float):
+        """Pop every key filed under a tick that has fully passed."""
+        tick = int(now // self.resolution)
+        if self.cursor is None:
+            self.cursor = tick
+        steps = min(tick - self.cursor, len(self.slots))
+        due = []
+        for t in range(self.cursor, self.cursor + steps):
+            slot = self.slots[t % len(self.slots)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self.cursor = max(self.cursor, tick)
+        return due
+
+    def clear(self):
+        for slot in self.slots:
+            slot.clear()
+
+
+class Cooldown:
+    """Fixed cooldown per key. Entries are just key -> expiry time."""
+
+    def __init__(self, seconds: float, persist: tuple = None):
+        self.seconds = seconds
+        self.expires = {}
+        self.wheel = TimerWheel(seconds)
+        # (table, key column, last-used column) in bot.db
+        self.persist = persist
+        self.loaded = persist is None
+        if persist is not None:
+            register_invalidator(self._unload)
+
+    def __len__(self):
+        return len(self.expires)
+
+    def _sweep(self, now: float):
+        for key in self.wheel.due(now):
+            expiry = self.expires.get(key)
+            if expiry is None:
+                continue
+            if expiry <= now:
+                del self.expires[key]
+            else:
+                # re-armed, or filed a full wheel turn ahead
+                self.wheel.schedule(key, expiry)
+
+    def _arm(self, key, now: float):
+        expiry = now + self.seconds
+        self.expires[key] = expiry
+        self.wheel.schedule(key, expiry)
+
+    # ---------------- LOOKUPS ----------------
+    def remaining(self, key, now: float = None) -> float:
+        now = time.time() if now is None else now
+        self._sweep(now)
+        expiry = self.expires.get(key)
+        return max(expiry - now, 0.0) if expiry is not None else 0.0
+
+    def hit(self, key, now: float = None) -> float:
+        """Start the cooldown if it isn't running. Returns the seconds left
+        (0 when the action is allowed)."""
+        now = time.time() if now is None else now
+        left = self.remaining(key, now)
+        if left <= 0:
+            self._arm(key, now)
+        return left
+
+    def reset(self, key):
+        self.expires.pop(key, None)
+
+    # ---------------- PERSISTENCE ----------------
+    def _unload(self):
+        # a restored database may hold different rows
+        self.expires.clear()
+        self.wheel.clear()
+        self.loaded = False
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        table, key_col, time_col = self.persist
+        since = int(time.time()) - self.seconds
+
+        db = get_db(DB_NAME)
+        async with db.transaction() as conn:
+            # rows of finished cooldowns are never read again
+            await conn.execute(f"DELETE FROM {table} WHERE {time_col} <= ?", (since,))
+            cur = await conn.execute(f"SELECT {key_col}, {time_col} FROM {table}")
+            rows = await cur.fetchall()
+
+        if self.loaded:
+            return
+        for key, used_at in rows:
+            self._arm(key, used_at)
+        self.loaded = True
+
+    async def use(self, key):
+        """Arm the cooldown now and persist it."""
+        now = time.time()
+        self._arm(key, now)
+        if self.persist is not None:
+            table, key_col, time_col = self.persist
+            await get_db(DB_NAME).execute(
+                f"INSERT OR REPLACE INTO {table} ({key_col}, {time_col}) VALUES (?,?)",
+                (key, int(now))
+            )
+
+
+class Bucket:
+    __slots__ = ("tokens", "stamp")
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+
+
+class TokenBucket:
+    """`capacity` actions at once, refilled at `rate` tokens per second.
+    A key is forgotten once its bucket is full again."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.buckets = {}
+        self.wheel = TimerWheel(capacity / rate)
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def _full_at(self, b: Bucket) -> float:
+        return b.stamp + (self.capacity - b.tokens) / self.rate
+
+    def _sweep(self, now: float):
+        for key in self.wheel.due(now):
+            b = self.buckets.get(key)
+            if b is None:
+                continue
+            full_at = self._full_at(b)
+            if full_at <= now:
+                del self.buckets[key]
+            else:
+                self.wheel.schedule(key, full_at)
+
+    def allow(self, key, cost: float = 1, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        self._sweep(now)
+
+        b = self.buckets.get(key)
+        if b is None:
+            b = Bucket(self.capacity, now)
+        else:
+            b.tokens = min(self.capacity, b.tokens + (now - b.stamp) * self.rate)
+            b.stamp = now
+
+        if b.tokens < cost:
+            return False
+
+        b.tokens -= cost
+        if key not in self.buckets:
+            self.buckets[key] = b
+        self.wheel.schedule(key, self._full_at(b))
+        return True
+
+    def retry_after(self, key, cost: float = 1, now: float = None) -> float:
+        now = time.time() if now is None else now
+        b = self.buckets.get(key)
+        if b is None:
+            return 0.0
+        tokens = min(self.capacity, b.tokens + (now - b.stamp) * self.rate)
+        return max((cost - tokens) / self.rate, 0.0)
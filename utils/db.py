@@ -1,183 +1,273 @@
+import asyncio
+import os
+import time
 import aiosqlite
+from contextlib import asynccontextmanager, AsyncExitStack
+
+from utils.profiler import profiler
 
 DB_NAME = "bot.db"
+SLOTS_DB_NAME = "slots.db"
+VTC_DB_NAME = "vtc_events.db"
+
+DB_FILES = (DB_NAME, SLOTS_DB_NAME, VTC_DB_NAME)
+
+READER_POOL_SIZE = 3
+
+
+# =========================================================
+# PROFILED WRITER HANDLE
+# =========================================================
+# transaction() hands this out instead of the raw connection so every
+# statement issued inside a transaction is timed as well.
+
+class ProfiledCursor:
+    def __init__(self, cursor, db, sql):
+        self._cursor = cursor
+        self._db = db
+        self._sql = sql
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    async def fetchone(self):
+        row = await self._cursor.fetchone()
+        if row is not None:
+            profiler.add_rows(self._db.path, self._sql, 1)
+        return row
+
+    async def fetchall(self):
+        rows = await self._cursor.fetchall()
+        profiler.add_rows(self._db.path, self._sql, len(rows))
+        return rows
+
+
+class ProfiledConnection:
+    def __init__(self, conn, db):
+        self._conn = conn
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def execute(self, sql: str, params=()):
+        start = time.perf_counter()
+        cur = await self._conn.execute(sql, params)
+        self._db.after_query(sql, params, time.perf_counter() - start, max(cur.rowcount, 0))
+        return ProfiledCursor(cur, self._db, sql)
+
+    async def executemany(self, sql: str, seq):
+        start = time.perf_counter()
+        cur = await self._conn.executemany(sql, seq)
+        self._db.after_query(sql, None, time.perf_counter() - start, max(cur.rowcount, 0))
+        return cur
+
+    async def executescript(self, script: str):
+        start = time.perf_counter()
+        cur = await self._conn.executescript(script)
+        self._db.after_query(script, None, time.perf_counter() - start, 0)
+        return cur
+
+
+# =========================================================
+# DATABASE SERVICE
+# =========================================================
+# One long-lived writer connection (serialized by a lock) and a small
+# pool of WAL reader connections per database file. Cogs never open
+# their own connections; they go through get_db(<file>).
+
+class Database:
+    def __init__(self, path: str, readers: int = READER_POOL_SIZE):
+        self.path = path
+        self.reader_count = readers
+        self.writer = None
+        self.write_lock = asyncio.Lock()
+        self.last_write = time.monotonic()
+        self.readers = asyncio.Queue()
+        self._reader_conns = []
+
+    async def _connect(self):
+        conn = await aiosqlite.connect(self.path)
+        await conn.execute("PRAGMA busy_timeout=5000;")
+        await conn.execute("PRAGMA foreign_keys=ON;")
+        return conn
+
+    async def start(self):
+        if self.writer is not None:
+            return
+
+        self.writer = await self._connect()
+        await self.writer.execute("PRAGMA journal_mode=WAL;")
+        await self.writer.execute("PRAGMA synchronous=NORMAL;")
+
+        for _ in range(self.reader_count):
+            conn = await self._connect()
+            await conn.execute("PRAGMA query_only=ON;")
+            self._reader_conns.append(conn)
+            self.readers.put_nowait(conn)
+
+    async def close(self):
+        async with self.write_lock:
+            for conn in self._reader_conns:
+                await conn.close()
+            self._reader_conns.clear()
+            self.readers = asyncio.Queue()
+
+            if self.writer is not None:
+                await self.writer.close()
+                self.writer = None
+
+    async def swap_file(self, source: str):
+        """Replace the database file with `source` and reconnect.
+
+        The caller must hold write_lock. In-flight reads are drained by
+        taking every reader out of the pool before anything is closed.
+        """
+        drained = [await self.readers.get() for _ in self._reader_conns]
+        for conn in drained:
+            await conn.close()
+        self._reader_conns.clear()
+
+        await self.writer.close()
+        self.writer = None
+
+        # a stale WAL would be replayed on top of the new file
+        for suffix in ("-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+        os.replace(source, self.path)
+        await self.start()
+
+    # ---------------- CONNECTION ACCESS ----------------
+    @asynccontextmanager
+    async def read(self):
+        conn = await self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        wait_start = time.perf_counter()
+        async with self.write_lock:
+            profiler.record_lock_wait(self.path, time.perf_counter() - wait_start)
+            try:
+                yield ProfiledConnection(self.writer, self)
+            except BaseException:
+                await self.writer.rollback()
+                raise
+            else:
+                start = time.perf_counter()
+                await self.writer.commit()
+                profiler.record(self.path, "COMMIT", time.perf_counter() - start)
+                self.last_write = time.monotonic()
+
+    # ---------------- PROFILING ----------------
+    def after_query(self, sql: str, params, elapsed: float, rows: int):
+        slow = profiler.record(self.path, sql, elapsed, rows)
+        if slow and profiler.explain and params is not None:
+            asyncio.create_task(self.capture_plan(sql, params))
+
+    async def explain(self, sql: str, params=()):
+        async with self.read() as conn:
+            async with conn.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cur:
+                return [row[-1] for row in await cur.fetchall()]
+
+    async def capture_plan(self, sql: str, params=()):
+        if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+            return None
+        try:
+            plan = await self.explain(sql, params)
+        except Exception as e:
+            plan = [f"explain failed: {e}"]
+        profiler.attach_plan(self.path, sql, plan)
+        return plan
+
+    # ---------------- SHORTCUTS ----------------
+    async def fetchone(self, sql: str, params=()):
+        async with self.read() as conn:
+            start = time.perf_counter()
+            async with conn.execute(sql, params) as cur:
+                row = await cur.fetchone()
+            self.after_query(sql, params, time.perf_counter() - start, 1 if row else 0)
+            return row
+
+    async def fetchall(self, sql: str, params=()):
+        async with self.read() as conn:
+            start = time.perf_counter()
+            async with conn.execute(sql, params) as cur:
+                rows = await cur.fetchall()
+            self.after_query(sql, params, time.perf_counter() - start, len(rows))
+            return rows
+
+    async def execute(self, sql: str, params=()):
+        async with self.transaction() as conn:
+            return await conn.execute(sql, params)
+
+    async def executemany(self, sql: str, seq):
+        async with self.transaction() as conn:
+            return await conn.executemany(sql, seq)
+
+
+# ================= REGISTRY =================
+_databases = {}
+_invalidators = []
+
+
+def get_db(path: str = DB_NAME) -> Database:
+    db = _databases.get(path)
+    if db is None:
+        raise RuntimeError(f"Database {path} is not open")
+    return db
+
+
+async def open_databases():
+    for path in DB_FILES:
+        if path not in _databases:
+            db = Database(path)
+            await db.start()
+            _databases[path] = db
+
+
+async def close_databases():
+    for db in list(_databases.values()):
+        await db.close()
+    _databases.clear()
+
+
+@asynccontextmanager
+async def writers_paused(paths=DB_FILES):
+    """Hold the writer lock of several databases at once.
+
+    Locks are always taken in DB_FILES order so two callers can't deadlock.
+    """
+    async with AsyncExitStack() as stack:
+        for path in sorted(paths, key=DB_FILES.index):
+            await stack.enter_async_context(get_db(path).write_lock)
+        yield
+
+
+# ================= CACHE INVALIDATION =================
+# Anything that keeps database rows in memory registers a callback
+# here; it runs after the database files are swapped by a restore.
+
+def register_invalidator(callback):
+    if callback not in _invalidators:
+        _invalidators.append(callback)
+
+
+def unregister_invalidator(callback):
+    if callback in _invalidators:
+        _invalidators.remove(callback)
+
 
-async def init_db():
-    async with aiosqlite.connect(DB_NAME) as db:
-
-        # ================= SQLITE SAFETY =================
-        await db.execute("PRAGMA journal_mode=WAL;")
-        await db.execute("PRAGMA synchronous=NORMAL;")
-        await db.execute("PRAGMA foreign_keys=ON;")
-
-        # ================= COINS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS coins (
-            user_id INTEGER PRIMARY KEY,
-            balance INTEGER DEFAULT 0
-        )
-        """)
-
-        # ================= PREMIUM =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS premium (
-            user_id INTEGER PRIMARY KEY,
-            tier TEXT,
-            expires INTEGER
-        )
-        """)
-
-        # ================= PAYMENTS / INVOICES =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS payments (
-            invoice_id TEXT PRIMARY KEY,
-            user_id INTEGER,
-            rupees INTEGER,
-            coins INTEGER,
-            timestamp INTEGER
-        )
-        """)
-
-        # ================= LEVELS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS levels (
-            user_id INTEGER,
-            guild_id INTEGER,
-            xp INTEGER DEFAULT 0,
-            level INTEGER DEFAULT 1,
-            PRIMARY KEY (user_id, guild_id)
-        )
-        """)
-
-        # ================= THEMES =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS user_themes (
-            user_id INTEGER PRIMARY KEY,
-            theme TEXT DEFAULT 'default'
-        )
-        """)
-
-        # ================= GUILD SETTINGS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS guild_settings (
-            guild_id INTEGER PRIMARY KEY,
-            welcome_channel INTEGER,
-            welcome_role INTEGER,
-            welcome_message TEXT
-        )
-        """)
-
-        # ================= TICKETS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS tickets (
-            channel_id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            claimed_by INTEGER,
-            category TEXT,
-            created_at INTEGER
-        )
-        """)
-
-        # ================= TICKET COOLDOWNS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS ticket_cooldowns (
-            user_id INTEGER PRIMARY KEY,
-            last_created INTEGER
-        )
-        """)
-
-        # ================= TRANSCRIPTS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS ticket_transcripts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            channel_id INTEGER,
-            author_id INTEGER,
-            message TEXT,
-            timestamp INTEGER
-        )
-        """)
-
-        # ================= WARNINGS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS warnings (
-            user_id INTEGER,
-            guild_id INTEGER,
-            count INTEGER DEFAULT 0,
-            PRIMARY KEY (user_id, guild_id)
-        )
-        """)
-
-        # ================= YOUTUBE ALERTS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS youtube_alerts (
-            guild_id INTEGER,
-            youtube_channel TEXT,
-            discord_channel INTEGER,
-            role_ping INTEGER,
-            message TEXT,
-            last_video TEXT,
-            PRIMARY KEY (guild_id, youtube_channel)
-        )
-        """)
-
-        # ================= COUPONS (OLD + SHOP) =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS coupons (
-            code TEXT PRIMARY KEY,
-            type TEXT,
-            value INTEGER,
-            max_uses INTEGER,
-            used INTEGER DEFAULT 0,
-            discount INTEGER,
-            expires INTEGER
-        )
-        """)
-
-        # ================= SHOP CATEGORIES =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS shop_categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE, 
-            channel_id INTEGER
-        )
-        """)
-
-        # ================= SHOP ITEMS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS shop_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            price INTEGER,
-            stock INTEGER,
-            image_url TEXT,
-            category_id INTEGER,
-            product_link TEXT,
-            FOREIGN KEY(category_id) REFERENCES shop_categories(id)
-        )
-        """)
-
-        # ================= USER LINKS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS user_links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            item_id INTEGER,
-            link TEXT,
-            expires INTEGER,
-            used INTEGER DEFAULT 0
-        )
-        """)
-
-        # ================= ORDERS =================
-        await db.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            item_name TEXT,
-            total INTEGER,
-            timestamp INTEGER
-        )
-        """)
-
-        await db.commit()
-        print("✅ Database checked & updated (shop + user links system ready)")
+def invalidate_caches():
+    for callback in list(_invalidators):
+        try:
+            callback()
+        except Exception as e:
+            print("❌ Cache invalidation error:", e)
@@ -1,29 +1,17 @@
-import aiosqlite
+from utils.db import get_db
+from utils import ledger
 
 DB_NAME = "bot.db"
 
-async def add_coins(user_id: int, amount: int):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "INSERT INTO coins (user_id, balance) VALUES (?, ?) "
-            "ON CONFLICT(user_id) DO UPDATE SET balance = balance + ?",
-            (user_id, amount, amount)
-        )
-        await db.commit()
+async def add_coins(user_id: int, amount: int, source: str = "manual", reason: str = ""):
+    await ledger.credit(user_id, amount, source, reason)
 
-async def remove_coins(user_id: int, amount: int):
-    async with aiosqlite.connect(DB_NAME) as db:
-        await db.execute(
-            "UPDATE coins SET balance = balance - ? WHERE user_id=? AND balance >= ?",
-            (amount, user_id, amount)
-        )
-        await db.commit()
+async def remove_coins(user_id: int, amount: int, source: str = "manual", reason: str = "") -> bool:
+    return await ledger.debit(user_id, amount, source, reason)
 
 async def get_coins(user_id: int) -> int:
-    async with aiosqlite.connect(DB_NAME) as db:
-        cur = await db.execute(
-            "SELECT balance FROM coins WHERE user_id=?",
-            (user_id,)
-        )
-        row = await cur.fetchone()
-        return row[0] if row else 0
+    row = await get_db(DB_NAME).fetchone(
+        "SELECT balance FROM coins WHERE user_id=?",
+        (user_id,)
+    )
+    return row[0] if row else 0
@@ -0,0 +1,149 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+# ================= CONFIG =================
+DEFAULT_LANG = "en"
+MIN_LETTERS = 2          # fewer script letters than this don't count
+MIN_ROMANIZED = 4        # romanized text shorter than this is read as English
+ROMANIZED_MARGIN = 0.3   # avg log-prob per trigram a romanized guess must beat English by
+CACHE_SIZE = 4096
+
+
+# =========================================================
+# LANGUAGE DETECTION (TTS)
+# =========================================================
+# Auto TTS only speaks Tamil, Hindi and English, so detection is mostly
+# a question of which script the message is written in: Tamil letters
+# -> ta, Devanagari -> hi. Only Latin-only text is ambiguous (English
+# vs. romanized Tamil/Hindi); that goes to a tiny character-trigram
+# model built once from the seed words below. Results are deterministic
+# and cached per text.
+
+_TAMIL = re.compile(r"[஀-௿]")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_NON_LATIN = re.compile(r"[^a-z]+")
+
+_SEEDS = {
+    "en": (
+        "the and you that is it to of in what are this have for not with on be do was "
+        "but so my me just get like can your how know all no yes okay ok bro thanks good "
+        "morning night come going will where why who when there here they we he she time "
+        "now today love play game lol haha lmao please sorry really want need think right one"
+    ),
+    "ta": (
+        "enna epdi eppadi irukinga iruka irukeenga nalla naan nee neenga avan aval avanga "
+        "vaa vaanga po ponga saptiya sapten sollu sollunga paaru paarunga illa illai aama "
+        "seri sari romba konjam ippo appo inga anga enga yaaru ethuku enakku unakku namma "
+        "vanakkam nanba machan dei ennachu theriyum theriyala pannu pannunga panren "
+        "panniten vandhu vandhen poren varen kaalai iravu thoongu saapadu thanni veedu"
+    ),
+    "hi": (
+        "kya kaise ho hai hain main mein tum aap kaha kahan kyun kyon nahi nahin haan acha "
+        "accha theek thik bhai yaar kuch bahut bohot abhi kab kaun mera meri tera teri apna "
+        "hum humko tumko mujhe tujhe khana pani ghar chalo chal jao aao karo kar raha rahi "
+        "gaya gayi hoga hogi namaste dhanyavad shukriya bas matlab samajh pata"
+    ),
+}
+
+
+def _trigrams(text: str):
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3]
+
+
+@lru_cache(maxsize=None)
+def _model():
+    """lang -> (log-prob per trigram, log-prob of an unseen trigram)"""
+    model = {}
+    for lang, seed in _SEEDS.items():
+        counts = Counter(_trigrams(seed))
+        total = sum(counts.values()) + len(counts) + 1
+        model[lang] = (
+            {gram: math.log((n + 1) / total) for gram, n in counts.items()},
+            math.log(1 / total),
+        )
+    return model
+
+
+def _romanized(text: str) -> str:
+    words = _NON_LATIN.sub(" ", text.lower())
+    grams = list(_trigrams(words))
+    if len(grams) < MIN_ROMANIZED:
+        return DEFAULT_LANG
+
+    scores = {}
+    for lang, (probs, unseen) in _model().items():
+        scores[lang] = sum(probs.get(g, unseen) for g in grams) / len(grams)
+
+    best = max(scores, key=scores.get)
+    if best != "en" and scores[best] - scores["en"] >= ROMANIZED_MARGIN:
+        return best
+    return DEFAULT_LANG
+
+
+def _classify(text: str) -> str:
+    if not text.isascii():
+        tamil = len(_TAMIL.findall(text))
+        devanagari = len(_DEVANAGARI.findall(text))
+        if max(tamil, devanagari) >= MIN_LETTERS:
+            return "ta" if tamil >= devanagari else "hi"
+    return _romanized(text)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def detect_lang(text: str) -> str:
+    """"ta", "hi" or "en" for a chat message."""
+    return _classify(text)
+
+
+# =========================================================
+# BENCHMARK: python -m utils.lang_detect
+# =========================================================
+if __name__ == "__main__":
+    import time
+
+    from langdetect import DetectorFactory, detect
+
+    samples = [
+        "hello everyone how are you", "good morning bro", "gg well played",
+        "வணக்கம் நண்பா", "எப்படி இருக்கீங்க", "சாப்டியா",
+        "नमस्ते दोस्तों", "क्या हाल है", "बहुत बढ़िया",
+        "enna panra machan", "saptiya da", "romba nalla irukku",
+        "kya kar rahe ho bhai", "acha theek hai", "kaise ho yaar",
+        "ok", "lol", "see you tomorrow",
+    ]
+    rounds = 200
+
+    def legacy(text):
+        # the old cog path: langdetect, anything unexpected -> en
+        try:
+            lang = detect(text)
+        except Exception:
+            lang = "en"
+        return lang if lang in ("ta", "en", "hi") else "en"
+
+    def bench(name, func):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for text in samples:
+                func(text)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<22} {elapsed / (rounds * len(samples)) * 1e6:9.1f} µs/msg")
+
+    DetectorFactory.seed = 0
+    started = time.perf_counter()
+    legacy("warm up")
+    print(f"langdetect first call  {(time.perf_counter() - started) * 1000:9.1f} ms")
+    _model()
+
+    bench("langdetect", legacy)
+    bench("detect_lang (uncached)", _classify)
+    bench("detect_lang (cached)", detect_lang)
+
+    print()
+    for text in samples:
+        print(f"{legacy(text):>4} {detect_lang(text):>4}  {text}")
@@ -0,0 +1,158 @@
+import time
+from bisect import insort
+
+from utils.db import get_db, register_invalidator
+from utils.activity import activity
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+TOP_K = 100          # ranks kept in memory per guild
+PAGE_SIZE = 10
+TOTAL_TTL = 60       # seconds a guild's member count is reused
+
+
+# =========================================================
+# XP LEADERBOARD
+# =========================================================
+# Each guild keeps its top TOP_K entries in memory, sorted by
+# (level DESC, xp DESC, user_id). The list is loaded once from
+# idx_levels_guild_rank and then kept up to date by grant_xp, which
+# reports every change: a user either moves inside the list or pushes
+# the last entry out. Buffered XP that hasn't been flushed yet counts.
+#
+# Anything below the top K is answered by the same index:
+#   - rank:  COUNT(*) of rows with a higher (level, xp), a covering
+#            index range scan
+#   - pages: LIMIT/OFFSET walking the index, no sort
+# Those see the database, so they can trail chat XP by one flush.
+
+class GuildBoard:
+    __slots__ = ("entries", "complete", "total", "total_at")
+
+    def __init__(self, entries, complete):
+        self.entries = entries      # [(-level, -xp, user_id)], best first
+        self.complete = complete    # the guild has no rows beyond entries
+        self.total = 0
+        self.total_at = 0.0
+
+    def position(self, user_id: int):
+        for i, entry in enumerate(self.entries):
+            if entry[2] == user_id:
+                return i
+        return None
+
+
+class Leaderboard:
+    def __init__(self):
+        self.guilds = {}
+
+    def invalidate(self, guild_id: int = None):
+        if guild_id is None:
+            self.guilds.clear()
+        else:
+            self.guilds.pop(guild_id, None)
+
+    # ---------------- LOAD ----------------
+    async def board(self, guild_id: int) -> GuildBoard:
+        board = self.guilds.get(guild_id)
+        if board is not None:
+            return board
+
+        generation = activity.generation
+        rows = await get_db(DB_NAME).fetchall(
+            "SELECT user_id, level, xp FROM levels WHERE guild_id=? "
+            "ORDER BY level DESC, xp DESC LIMIT ?",
+            (guild_id, TOP_K)
+        )
+        if activity.generation != generation:
+            return await self.board(guild_id)
+
+        scores = {user_id: (-(level or 1), -(xp or 0)) for user_id, level, xp in rows}
+        # cached level state is newer than the database
+        for (user_id, gid), state in activity.levels.items():
+            if gid == guild_id:
+                scores[user_id] = (-state.level, -state.xp)
+
+        entries = sorted((*score, user_id) for user_id, score in scores.items())
+        board = GuildBoard(entries[:TOP_K], len(rows) < TOP_K and len(entries) <= TOP_K)
+
+        # another command may have loaded it while we awaited
+        return self.guilds.setdefault(guild_id, board)
+
+    # ---------------- UPDATES ----------------
+    def update(self, guild_id: int, user_id: int, level: int, xp: int):
+        """Called after a user's level state changed."""
+        board = self.guilds.get(guild_id)
+        if board is None:
+            return
+
+        entries = board.entries
+        key = (-level, -xp, user_id)
+        i = board.position(user_id)
+
+        if i is not None:
+            if key > entries[i] and not board.complete:
+                # moved down: someone outside the list may now rank higher
+                del self.guilds[guild_id]
+                return
+            del entries[i]
+        elif not board.complete and key > entries[-1]:
+            return
+        else:
+            board.total_at = 0.0  # may be a new member
+
+        insort(entries, key)
+        if len(entries) > TOP_K:
+            entries.pop()
+            board.complete = False
+
+    # ---------------- QUERIES ----------------
+    async def total(self, guild_id: int) -> int:
+        board = await self.board(guild_id)
+        if time.monotonic() - board.total_at >= TOTAL_TTL:
+            row = await get_db(DB_NAME).fetchone(
+                "SELECT COUNT(*) FROM levels WHERE guild_id=?",
+                (guild_id,)
+            )
+            board.total = row[0]
+            board.total_at = time.monotonic()
+        return max(board.total, len(board.entries))
+
+    async def rank(self, guild_id: int, user_id: int, level: int, xp: int):
+        """(rank, members ranked) for a user; rank is 1-based."""
+        board = await self.board(guild_id)
+        total = await self.total(guild_id)
+
+        i = board.position(user_id)
+        if i is not None:
+            return i + 1, total
+        if board.complete:
+            return len(board.entries) + 1, max(total, len(board.entries) + 1)
+
+        row = await get_db(DB_NAME).fetchone(
+            "SELECT COUNT(*) FROM levels WHERE guild_id=? AND (level, xp) > (?, ?)",
+            (guild_id, level, xp)
+        )
+        return row[0] + 1, total
+
+    async def page(self, guild_id: int, page: int):
+        """[(user_id, level, xp)] for a 1-based page."""
+        board = await self.board(guild_id)
+        start = (max(page, 1) - 1) * PAGE_SIZE
+
+        if board.complete or start + PAGE_SIZE <= len(board.entries):
+            return [
+                (user_id, -level, -xp)
+                for level, xp, user_id in board.entries[start:start + PAGE_SIZE]
+            ]
+
+        return await get_db(DB_NAME).fetchall(
+            "SELECT user_id, level, xp FROM levels WHERE guild_id=? "
+            "ORDER BY level DESC, xp DESC LIMIT ? OFFSET ?",
+            (guild_id, PAGE_SIZE, start)
+        )
+
+
+leaderboard = Leaderboard()
+register_invalidator(leaderboard.invalidate)
@@ -0,0 +1,175 @@
+import time
+
+from utils.db import get_db
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+LEDGER_RETAIN_DAYS = 30   # raw entries older than this are folded into daily rollups
+DAY = 86400
+
+
+# =========================================================
+# COIN LEDGER
+# =========================================================
+# Every coin change is one row in coin_ledger:
+#   (user_id, delta, source, reason, ref_id, created_at)
+# and the coins table holds the materialized balance, updated in the
+# same transaction as the ledger insert. Nothing writes coins.balance
+# directly anymore.
+#
+# Compaction folds old ledger rows into coin_ledger_daily per
+# (day, user, source, reason), so SUM(ledger) + SUM(daily) always
+# equals the balance and rollups keep working over any window.
+
+async def post(db, entries):
+    """Write ledger entries and apply them to balances.
+
+    `db` is a connection from Database.transaction(); entries are
+    (user_id, delta, source, reason, ref_id) tuples.
+    """
+    now = int(time.time())
+    rows = [
+        (user_id, delta, source, reason or "", None if ref_id is None else str(ref_id), now)
+        for user_id, delta, source, reason, ref_id in entries
+        if delta
+    ]
+    if not rows:
+        return
+
+    totals = {}
+    for row in rows:
+        totals[row[0]] = totals.get(row[0], 0) + row[1]
+
+    await db.executemany(
+        "INSERT INTO coin_ledger (user_id, delta, source, reason, ref_id, created_at) "
+        "VALUES (?,?,?,?,?,?)",
+        rows
+    )
+    await db.executemany(
+        "INSERT INTO coins (user_id, balance) VALUES (?,?) "
+        "ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance",
+        list(totals.items())
+    )
+
+
+async def credit(user_id: int, amount: int, source: str, reason: str, ref_id=None, db=None):
+    if amount <= 0:
+        return
+    entry = [(user_id, amount, source, reason, ref_id)]
+    if db is not None:
+        return await post(db, entry)
+    async with get_db(DB_NAME).transaction() as conn:
+        await post(conn, entry)
+
+
+async def debit(user_id: int, amount: int, source: str, reason: str, ref_id=None, db=None) -> bool:
+    """Take coins only if the balance covers it. Returns False otherwise."""
+    if amount <= 0:
+        return True
+    if db is None:
+        async with get_db(DB_NAME).transaction() as conn:
+            return await debit(user_id, amount, source, reason, ref_id, conn)
+
+    cur = await db.execute(
+        "UPDATE coins SET balance = balance - ? WHERE user_id=? AND balance >= ?",
+        (amount, user_id, amount)
+    )
+    if cur.rowcount == 0:
+        return False
+
+    await db.execute(
+        "INSERT INTO coin_ledger (user_id, delta, source, reason, ref_id, created_at) "
+        "VALUES (?,?,?,?,?,?)",
+        (user_id, -amount, source, reason or "", None if ref_id is None else str(ref_id), int(time.time()))
+    )
+    return True
+
+
+# =========================================================
+# READS
+# =========================================================
+async def history(user_id: int, limit: int = 10):
+    return await get_db(DB_NAME).fetchall(
+        "SELECT delta, source, reason, ref_id, created_at FROM coin_ledger "
+        "WHERE user_id=? ORDER BY id DESC LIMIT ?",
+        (user_id, limit)
+    )
+
+
+async def rollup(since: int, source: str = None):
+    """Minted / burned totals per source since a unix timestamp.
+
+    Windows reaching past the retention period are answered from the
+    daily rollups at day granularity.
+    """
+    where = "WHERE day >= ?" if source is None else "WHERE day >= ? AND source = ?"
+    params = (since // DAY * DAY,) if source is None else (since // DAY * DAY, source)
+    live_where = "WHERE created_at >= ?" if source is None else "WHERE created_at >= ? AND source = ?"
+    live_params = (since,) if source is None else (since, source)
+
+    rows = await get_db(DB_NAME).fetchall(f"""
+    SELECT source, SUM(minted), SUM(burned), SUM(entries) FROM (
+        SELECT source,
+               SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END) AS minted,
+               SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END) AS burned,
+               COUNT(*) AS entries
+        FROM coin_ledger {live_where}
+        GROUP BY source
+        UNION ALL
+        SELECT source, SUM(minted), SUM(burned), SUM(entries)
+        FROM coin_ledger_daily {where}
+        GROUP BY source
+    )
+    GROUP BY source
+    ORDER BY 2 DESC
+    """, live_params + params)
+
+    return [
+        {"source": src, "minted": minted or 0, "burned": burned or 0, "entries": entries or 0}
+        for src, minted, burned, entries in rows
+    ]
+
+
+async def verify():
+    """Users whose materialized balance disagrees with their ledger."""
+    return await get_db(DB_NAME).fetchall("""
+    SELECT c.user_id, c.balance, COALESCE(l.total, 0)
+    FROM coins c
+    LEFT JOIN (
+        SELECT user_id, SUM(total) AS total FROM (
+            SELECT user_id, SUM(delta) AS total FROM coin_ledger GROUP BY user_id
+            UNION ALL
+            SELECT user_id, SUM(minted - burned) FROM coin_ledger_daily GROUP BY user_id
+        )
+        GROUP BY user_id
+    ) l ON l.user_id = c.user_id
+    WHERE c.balance != COALESCE(l.total, 0)
+    """)
+
+
+# =========================================================
+# COMPACTION
+# =========================================================
+async def compact(retain_days: int = LEDGER_RETAIN_DAYS) -> int:
+    """Fold ledger rows older than the retention window into daily rollups."""
+    cutoff = (int(time.time()) - retain_days * DAY) // DAY * DAY
+
+    async with get_db(DB_NAME).transaction() as db:
+        await db.execute("""
+        INSERT INTO coin_ledger_daily (day, user_id, source, reason, minted, burned, entries)
+        SELECT created_at / 86400 * 86400, user_id, source, reason,
+               SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END),
+               SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END),
+               COUNT(*)
+        FROM coin_ledger
+        WHERE created_at < ?
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT(day, user_id, source, reason) DO UPDATE SET
+            minted = minted + excluded.minted,
+            burned = burned + excluded.burned,
+            entries = entries + excluded.entries
+        """, (cutoff,))
+
+        cur = await db.execute("DELETE FROM coin_ledger WHERE created_at < ?", (cutoff,))
+        return cur.rowcount
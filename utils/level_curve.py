@@ -0,0 +1,156 @@
+import time
+from math import isqrt
+
+from utils.db import get_db, register_invalidator
+from utils.activity import activity
+from utils.leaderboard import leaderboard
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+DEFAULT_BASE = 100   # XP needed for level 1 -> 2 is base + step
+DEFAULT_STEP = 50
+RELEVEL_CHUNK = 500  # rows rewritten per executemany during a bulk re-level
+
+
+# =========================================================
+# LEVEL CURVE
+# =========================================================
+# XP needed to go from `level` to `level + 1` is  base + step * level.
+# The levels table stores (level, xp into that level); the curve turns
+# that into total XP and back in O(1):
+#
+#   total(L) = base * (L - 1) + step * (L - 1) * L / 2
+#
+# which is a quadratic in n = L - 1, inverted with an integer sqrt.
+
+class LevelCurve:
+    __slots__ = ("base", "step")
+
+    def __init__(self, base: int = DEFAULT_BASE, step: int = DEFAULT_STEP):
+        if base <= 0 or step < 0:
+            raise ValueError("base must be positive and step non-negative")
+        self.base = base
+        self.step = step
+
+    def __eq__(self, other):
+        return isinstance(other, LevelCurve) and (self.base, self.step) == (other.base, other.step)
+
+    def __repr__(self):
+        return f"LevelCurve(base={self.base}, step={self.step})"
+
+    def xp_needed(self, level: int) -> int:
+        return self.base + self.step * level
+
+    def total_xp(self, level: int, xp: int = 0) -> int:
+        n = level - 1
+        return self.base * n + self.step * n * (n + 1) // 2 + xp
+
+    def level_for(self, total: int):
+        """Total XP -> (level, xp into that level)."""
+        total = max(total, 0)
+
+        if self.step == 0:
+            n = total // self.base
+        else:
+            # step * n^2 + (2 * base + step) * n - 2 * total = 0
+            b = 2 * self.base + self.step
+            n = (isqrt(b * b + 8 * self.step * total) - b) // (2 * self.step)
+
+        # isqrt floors; nudge onto the exact boundary
+        while self.total_xp(n + 2) <= total:
+            n += 1
+        while n > 0 and self.total_xp(n + 1) > total:
+            n -= 1
+
+        level = n + 1
+        return level, total - self.total_xp(level)
+
+    def add_xp(self, level: int, xp: int, amount: int):
+        return self.level_for(self.total_xp(level, xp) + amount)
+
+
+DEFAULT_CURVE = LevelCurve()
+
+
+# =========================================================
+# PER-GUILD CURVES
+# =========================================================
+_curves = {}
+
+
+def _clear_curves():
+    _curves.clear()
+
+
+register_invalidator(_clear_curves)
+
+
+async def get_curve(guild_id: int) -> LevelCurve:
+    curve = _curves.get(guild_id)
+    if curve is not None:
+        return curve
+
+    row = await get_db(DB_NAME).fetchone(
+        "SELECT base, step FROM level_curves WHERE guild_id=?",
+        (guild_id,)
+    )
+    # set_curve may have switched the guild while we were reading
+    return _curves.setdefault(guild_id, LevelCurve(*row) if row else DEFAULT_CURVE)
+
+
+# =========================================================
+# BULK RE-LEVEL
+# =========================================================
+async def set_curve(guild_id: int, curve: LevelCurve) -> int:
+    """Switch a guild to a new curve, keeping everyone's total XP.
+
+    Every levels row of the guild is rewritten in one transaction, in
+    chunks of RELEVEL_CHUNK rows. Cached level state is converted in
+    place so buffered XP isn't lost or written back on the old curve.
+    Returns the number of rows rewritten.
+    """
+    old = await get_curve(guild_id)
+    rewritten = 0
+
+    async with activity.hold():
+        async with get_db(DB_NAME).transaction() as db:
+            last_user = -1
+            while True:
+                cur = await db.execute(
+                    "SELECT user_id, level, xp FROM levels "
+                    "WHERE guild_id=? AND user_id>? ORDER BY user_id LIMIT ?",
+                    (guild_id, last_user, RELEVEL_CHUNK)
+                )
+                rows = await cur.fetchall()
+                if not rows:
+                    break
+
+                updates = [
+                    (*curve.level_for(old.total_xp(level or 1, xp or 0)), user_id, guild_id)
+                    for user_id, level, xp in rows
+                ]
+                await db.executemany(
+                    "UPDATE levels SET level=?, xp=? WHERE user_id=? AND guild_id=?",
+                    updates
+                )
+                rewritten += len(updates)
+                last_user = rows[-1][0]
+
+            await db.execute(
+                "INSERT INTO level_curves (guild_id, base, step, updated_at) VALUES (?,?,?,?) "
+                "ON CONFLICT(guild_id) DO UPDATE SET "
+                "base=excluded.base, step=excluded.step, updated_at=excluded.updated_at",
+                (guild_id, curve.base, curve.step, int(time.time()))
+            )
+
+        # no awaits from here on: cache and curve switch together
+        for (user_id, gid), state in activity.levels.items():
+            if gid == guild_id:
+                state.level, state.xp = curve.level_for(old.total_xp(state.level, state.xp))
+        _curves[guild_id] = curve
+        leaderboard.invalidate(guild_id)
+        # level_state() loads that started before the commit re-read
+        activity.generation += 1
+
+    return rewritten
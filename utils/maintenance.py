@@ -0,0 +1,142 @@
+import os
+import time
+
+from utils.db import DB_FILES, get_db
+
+# ================= CONFIG =================
+WAL_PASSIVE_BYTES = 4 * 1024 * 1024     # checkpoint what we can past 4 MiB of WAL
+WAL_TRUNCATE_BYTES = 32 * 1024 * 1024   # reset the WAL file past 32 MiB
+IDLE_SECONDS = 15                       # no commits for this long counts as idle
+OPTIMIZE_HOURS = 6
+VACUUM_HOURS = 24
+VACUUM_FREE_RATIO = 0.10                # vacuum once 10% of pages are free
+VACUUM_STEP_PAGES = 2000                # pages released per incremental vacuum
+
+
+# =========================================================
+# DATABASE MAINTENANCE
+# =========================================================
+# Called every minute from the backup cog. Per database file:
+#   - PASSIVE checkpoint when the WAL passes WAL_PASSIVE_BYTES; a
+#     TRUNCATE checkpoint instead once the file is big and writes idle
+#   - PRAGMA optimize every OPTIMIZE_HOURS
+#   - incremental vacuum in an idle window when the freelist is large
+#     (the first run switches auto_vacuum to INCREMENTAL with one VACUUM)
+# Page and freelist counts are sampled every run for the stats views.
+
+class FileStats:
+    __slots__ = (
+        "page_size", "page_count", "freelist", "wal_bytes", "auto_vacuum",
+        "checkpoints", "last_checkpoint", "last_optimize", "last_vacuum",
+    )
+
+    def __init__(self):
+        self.page_size = 0
+        self.page_count = 0
+        self.freelist = 0
+        self.wal_bytes = 0
+        self.auto_vacuum = 0
+        self.checkpoints = 0
+        self.last_checkpoint = None
+        self.last_optimize = 0.0
+        self.last_vacuum = 0.0
+
+    def to_dict(self):
+        return {
+            "size_mb": round(self.page_size * self.page_count / (1024 * 1024), 2),
+            "pages": self.page_count,
+            "free_pages": self.freelist,
+            "wal_mb": round(self.wal_bytes / (1024 * 1024), 2),
+            "checkpoints": self.checkpoints,
+            "last_checkpoint": self.last_checkpoint,
+            "last_optimize": int(self.last_optimize) or None,
+            "last_vacuum": int(self.last_vacuum) or None,
+        }
+
+
+class Maintenance:
+    def __init__(self, paths=DB_FILES):
+        self.paths = paths
+        self.files = {path: FileStats() for path in paths}
+        self.started = time.time()
+
+    # ---------------- SAMPLING ----------------
+    async def sample(self, path: str) -> FileStats:
+        stats = self.files[path]
+        db = get_db(path)
+
+        stats.page_size = (await db.fetchone("PRAGMA page_size"))[0]
+        stats.page_count = (await db.fetchone("PRAGMA page_count"))[0]
+        stats.freelist = (await db.fetchone("PRAGMA freelist_count"))[0]
+        stats.auto_vacuum = (await db.fetchone("PRAGMA auto_vacuum"))[0]
+
+        try:
+            stats.wal_bytes = os.path.getsize(f"{path}-wal")
+        except FileNotFoundError:
+            stats.wal_bytes = 0
+        return stats
+
+    # ---------------- TASKS ----------------
+    async def checkpoint(self, path: str, mode: str = "PASSIVE"):
+        async with get_db(path).transaction() as conn:
+            cur = await conn.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, log_frames, done_frames = await cur.fetchone()
+
+        stats = self.files[path]
+        stats.checkpoints += 1
+        stats.last_checkpoint = {
+            "mode": mode,
+            "at": int(time.time()),
+            "busy": bool(busy),
+            "frames": log_frames,
+            "checkpointed": done_frames,
+        }
+
+    async def optimize(self, path: str):
+        async with get_db(path).transaction() as conn:
+            await conn.execute("PRAGMA optimize")
+        self.files[path].last_optimize = time.time()
+
+    async def vacuum(self, path: str):
+        stats = self.files[path]
+        async with get_db(path).transaction() as conn:
+            if stats.auto_vacuum != 2:
+                # one-off: incremental vacuum needs auto_vacuum set before a VACUUM
+                await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                await conn.execute("VACUUM")
+            else:
+                await conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+        stats.last_vacuum = time.time()
+
+    # ---------------- SCHEDULER ----------------
+    async def run(self):
+        now = time.time()
+        for path in self.paths:
+            db = get_db(path)
+            stats = await self.sample(path)
+            idle = time.monotonic() - db.last_write >= IDLE_SECONDS
+
+            if stats.wal_bytes >= WAL_TRUNCATE_BYTES and idle:
+                await self.checkpoint(path, "TRUNCATE")
+            elif stats.wal_bytes >= WAL_PASSIVE_BYTES:
+                await self.checkpoint(path, "PASSIVE")
+
+            if now - stats.last_optimize >= OPTIMIZE_HOURS * 3600:
+                await self.optimize(path)
+
+            free_ratio = stats.freelist / stats.page_count if stats.page_count else 0
+            if (
+                idle
+                and free_ratio >= VACUUM_FREE_RATIO
+                and now - stats.last_vacuum >= VACUUM_HOURS * 3600
+            ):
+                await self.vacuum(path)
+                await self.checkpoint(path, "TRUNCATE")
+
+            await self.sample(path)
+
+    def snapshot(self) -> dict:
+        return {path: stats.to_dict() for path, stats in self.files.items()}
+
+
+maintenance = Maintenance()
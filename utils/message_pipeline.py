@@ -0,0 +1,127 @@
+import time
+
+# =========================================================
+# MESSAGE PIPELINE
+# =========================================================
+# One on_message listener for every chat feature. Each message is
+# parsed once into a MessageContext and passed through the registered
+# stages in order (filter -> XP -> coins -> TTS ...). A stage can stop
+# the message for the stages after it. Stages don't write to the
+# database themselves: XP and coins go to the activity buffer, which
+# persists everything in one batched transaction.
+#
+# Every stage keeps call/time/error counters for /pipeline_stats.
+
+ORDER_FILTER = 0
+ORDER_XP = 10
+ORDER_COINS = 20
+ORDER_TTS = 30
+
+
+class MessageContext:
+    __slots__ = ("message", "author", "guild", "channel_id", "content", "now", "stopped")
+
+    def __init__(self, message):
+        self.message = message
+        self.author = message.author
+        self.guild = message.guild
+        self.channel_id = message.channel.id
+        self.content = message.content.strip()
+        self.now = time.time()
+        self.stopped = False
+
+    @property
+    def voice_channel(self):
+        voice = getattr(self.author, "voice", None)
+        return voice.channel if voice else None
+
+    def stop(self):
+        self.stopped = True
+
+
+class Stage:
+    __slots__ = ("name", "order", "func", "calls", "total", "max", "errors")
+
+    def __init__(self, name: str, order: int, func):
+        self.name = name
+        self.order = order
+        self.func = func
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "order": self.order,
+            "calls": self.calls,
+            "avg_us": round(self.total / self.calls * 1e6, 1) if self.calls else 0,
+            "max_ms": round(self.max * 1000, 2),
+            "errors": self.errors,
+        }
+
+
+class MessagePipeline:
+    def __init__(self):
+        self.stages = []
+        self.messages = 0
+        self.bot = None
+        self.add_stage("filter", _filter_stage, ORDER_FILTER)
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self, bot):
+        if self.bot is None:
+            self.bot = bot
+            bot.add_listener(self.on_message)
+
+    def add_stage(self, name: str, func, order: int):
+        """Register an async `func(ctx)`; replaces a stage of the same name."""
+        self.remove_stage(name)
+        self.stages.append(Stage(name, order, func))
+        self.stages.sort(key=lambda s: s.order)
+
+    def remove_stage(self, name: str):
+        self.stages = [s for s in self.stages if s.name != name]
+
+    # ---------------- DISPATCH ----------------
+    async def on_message(self, message):
+        self.messages += 1
+        ctx = MessageContext(message)
+
+        for stage in self.stages:
+            started = time.perf_counter()
+            try:
+                await stage.func(ctx)
+            except Exception as e:
+                stage.errors += 1
+                print(f"❌ Message stage {stage.name} error:", e)
+
+            elapsed = time.perf_counter() - started
+            stage.calls += 1
+            stage.total += elapsed
+            stage.max = max(stage.max, elapsed)
+
+            if ctx.stopped:
+                break
+
+    # ---------------- STATS ----------------
+    def snapshot(self):
+        return [stage.to_dict() for stage in self.stages]
+
+    def reset(self):
+        self.messages = 0
+        for stage in self.stages:
+            stage.calls = 0
+            stage.total = 0.0
+            stage.max = 0.0
+            stage.errors = 0
+
+
+async def _filter_stage(ctx: MessageContext):
+    # bots and DMs never earn or speak
+    if ctx.author.bot or ctx.guild is None:
+        ctx.stop()
+
+
+pipeline = MessagePipeline()
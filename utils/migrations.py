@@ -0,0 +1,366 @@
+import time
+
+from utils.db import get_db, DB_NAME, SLOTS_DB_NAME, VTC_DB_NAME
+
+# =========================================================
+# SCHEMA MIGRATIONS
+# =========================================================
+# Every table lives here, as numbered migrations per database file.
+# Each file keeps a schema_version table; on startup only migrations
+# newer than the recorded version are applied, once, in order.
+#
+# A migration is (version, name, step) where step is either an SQL
+# script or an async callable taking the writer connection.
+# Never edit a shipped migration; append a new one instead.
+
+
+# ================= bot.db =================
+async def _add_modlog_channel(db):
+    cur = await db.execute("PRAGMA table_info(guild_settings)")
+    columns = [row[1] for row in await cur.fetchall()]
+    if "modlog_channel" not in columns:
+        await db.execute("ALTER TABLE guild_settings ADD COLUMN modlog_channel INTEGER")
+
+
+BOT_MIGRATIONS = [
+    (1, "initial schema", """
+    CREATE TABLE IF NOT EXISTS coins (
+        user_id INTEGER PRIMARY KEY,
+        balance INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS premium (
+        user_id INTEGER PRIMARY KEY,
+        tier TEXT,
+        expires INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS payments (
+        invoice_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        rupees INTEGER,
+        coins INTEGER,
+        timestamp INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS levels (
+        user_id INTEGER,
+        guild_id INTEGER,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 1,
+        PRIMARY KEY (user_id, guild_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS user_themes (
+        user_id INTEGER PRIMARY KEY,
+        theme TEXT DEFAULT 'default'
+    );
+
+    CREATE TABLE IF NOT EXISTS guild_settings (
+        guild_id INTEGER PRIMARY KEY,
+        welcome_channel INTEGER,
+        welcome_role INTEGER,
+        welcome_message TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS tickets (
+        channel_id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        claimed_by INTEGER,
+        category TEXT,
+        created_at INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS ticket_cooldowns (
+        user_id INTEGER PRIMARY KEY,
+        last_created INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS ticket_transcripts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_id INTEGER,
+        author_id INTEGER,
+        message TEXT,
+        timestamp INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS warnings (
+        user_id INTEGER,
+        guild_id INTEGER,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, guild_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS youtube_alerts (
+        guild_id INTEGER,
+        youtube_channel TEXT,
+        discord_channel INTEGER,
+        role_ping INTEGER,
+        message TEXT,
+        last_video TEXT,
+        PRIMARY KEY (guild_id, youtube_channel)
+    );
+
+    CREATE TABLE IF NOT EXISTS coupons (
+        code TEXT PRIMARY KEY,
+        type TEXT,
+        value INTEGER,
+        max_uses INTEGER,
+        used INTEGER DEFAULT 0,
+        discount INTEGER,
+        expires INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS shop_categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE,
+        channel_id INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS shop_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        price INTEGER,
+        stock INTEGER,
+        image_url TEXT,
+        category_id INTEGER,
+        product_link TEXT,
+        FOREIGN KEY(category_id) REFERENCES shop_categories(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS user_links (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        item_id INTEGER,
+        link TEXT,
+        expires INTEGER,
+        used INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        item_name TEXT,
+        total INTEGER,
+        timestamp INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS birthdays (
+        user_id INTEGER,
+        guild_id INTEGER,
+        day INTEGER,
+        month INTEGER,
+        year INTEGER,
+        message TEXT,
+        PRIMARY KEY (user_id, guild_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS birthday_settings (
+        guild_id INTEGER PRIMARY KEY,
+        channel_id INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS birthday_rewards (
+        user_id INTEGER,
+        guild_id INTEGER,
+        streak INTEGER DEFAULT 0,
+        last_year INTEGER,
+        background TEXT DEFAULT "default",
+        PRIMARY KEY (user_id, guild_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """),
+    (2, "guild_settings.modlog_channel", _add_modlog_channel),
+    (3, "hot lookup indexes", """
+    CREATE INDEX IF NOT EXISTS idx_birthdays_day_month ON birthdays(day, month);
+    CREATE INDEX IF NOT EXISTS idx_birthdays_guild_year ON birthdays(guild_id, year);
+    CREATE INDEX IF NOT EXISTS idx_premium_expires ON premium(expires);
+    CREATE INDEX IF NOT EXISTS idx_levels_guild_rank ON levels(guild_id, level DESC, xp DESC);
+    """),
+    (4, "coin ledger", """
+    CREATE TABLE IF NOT EXISTS coin_ledger (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        reason TEXT NOT NULL DEFAULT '',
+        ref_id TEXT,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS coin_ledger_daily (
+        day INTEGER,
+        user_id INTEGER,
+        source TEXT NOT NULL,
+        reason TEXT NOT NULL DEFAULT '',
+        minted INTEGER DEFAULT 0,
+        burned INTEGER DEFAULT 0,
+        entries INTEGER DEFAULT 0,
+        PRIMARY KEY (day, user_id, source, reason)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_coin_ledger_user ON coin_ledger(user_id, id);
+    CREATE INDEX IF NOT EXISTS idx_coin_ledger_created ON coin_ledger(created_at, source);
+    CREATE INDEX IF NOT EXISTS idx_coin_ledger_daily_user ON coin_ledger_daily(user_id);
+
+    -- existing balances become opening entries so the ledger sums match
+    INSERT INTO coin_ledger (user_id, delta, source, reason, created_at)
+    SELECT user_id, balance, 'migration', 'opening balance', CAST(strftime('%s','now') AS INTEGER)
+    FROM coins WHERE balance != 0;
+    """),
+    (5, "per-guild level curves", """
+    CREATE TABLE IF NOT EXISTS level_curves (
+        guild_id INTEGER PRIMARY KEY,
+        base INTEGER NOT NULL,
+        step INTEGER NOT NULL,
+        updated_at INTEGER
+    );
+    """),
+    (6, "open voice sessions", """
+    CREATE TABLE IF NOT EXISTS voice_sessions (
+        user_id INTEGER,
+        guild_id INTEGER,
+        channel_id INTEGER,
+        joined_at INTEGER,
+        PRIMARY KEY (user_id, guild_id)
+    );
+    """),
+    (7, "tts backend per guild", """
+    CREATE TABLE IF NOT EXISTS tts_backends (
+        guild_id INTEGER,
+        lang TEXT,
+        backend TEXT NOT NULL,
+        PRIMARY KEY (guild_id, lang)
+    );
+    """),
+]
+
+
+# ================= slots.db =================
+SLOTS_MIGRATIONS = [
+    (1, "initial schema", """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER,
+        event_id INTEGER,
+        event_name TEXT,
+        event_time INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS panels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER,
+        panel_name TEXT,
+        slot_image TEXT,
+        message_id INTEGER,
+        channel_id INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS slots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        panel_id INTEGER,
+        slot_number INTEGER,
+        booked_by INTEGER,
+        vtc_name TEXT,
+        vtc_url TEXT,
+        position TEXT,
+        member_count INTEGER,
+        status TEXT DEFAULT 'open'
+    );
+
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        panel_id INTEGER,
+        slot_number INTEGER,
+        user_id INTEGER,
+        vtc_name TEXT,
+        action TEXT,
+        timestamp INTEGER
+    );
+    """),
+    (2, "panel and history indexes", """
+    CREATE INDEX IF NOT EXISTS idx_slots_panel ON slots(panel_id, slot_number);
+    CREATE INDEX IF NOT EXISTS idx_panels_event ON panels(event_id);
+    CREATE INDEX IF NOT EXISTS idx_history_panel ON history(panel_id);
+    CREATE INDEX IF NOT EXISTS idx_events_event_id ON events(event_id);
+    """),
+]
+
+
+# ================= vtc_events.db =================
+VTC_MIGRATIONS = [
+    (1, "initial schema", """
+    CREATE TABLE IF NOT EXISTS settings (
+        guild_id INTEGER PRIMARY KEY,
+        vtc_id INTEGER,
+        channel_id INTEGER
+    );
+
+    CREATE TABLE IF NOT EXISTS posted_events (
+        event_id INTEGER PRIMARY KEY
+    );
+    """),
+]
+
+
+MIGRATIONS = {
+    DB_NAME: BOT_MIGRATIONS,
+    SLOTS_DB_NAME: SLOTS_MIGRATIONS,
+    VTC_DB_NAME: VTC_MIGRATIONS,
+}
+
+
+# =========================================================
+# RUNNER
+# =========================================================
+async def current_version(path: str) -> int:
+    db = get_db(path)
+    await db.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at INTEGER
+    )
+    """)
+    row = await db.fetchone("SELECT MAX(version) FROM schema_version")
+    return row[0] or 0
+
+
+async def migrate(path: str) -> int:
+    version = await current_version(path)
+    pending = [m for m in MIGRATIONS[path] if m[0] > version]
+
+    db = get_db(path)
+    for number, name, step in sorted(pending, key=lambda m: m[0]):
+        async with db.transaction() as conn:
+            now = int(time.time())
+            if callable(step):
+                await step(conn)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?,?,?)",
+                    (number, name, now)
+                )
+            else:
+                # executescript commits first, so the script carries its own
+                # BEGIN/COMMIT and the version row lands in the same transaction
+                safe_name = name.replace("'", "''")
+                await conn.executescript(
+                    f"BEGIN;\n{step}\n"
+                    f"INSERT INTO schema_version (version, name, applied_at) "
+                    f"VALUES ({number}, '{safe_name}', {now});\n"
+                    f"COMMIT;"
+                )
+        print(f"🧱 {path}: applied migration {number} ({name})")
+
+    return len(pending)
+
+
+async def run_migrations():
+    for path in MIGRATIONS:
+        applied = await migrate(path)
+        if applied:
+            print(f"✅ {path} schema updated ({applied} migration(s))")
@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import time
+from collections import deque
+
+# ================= CONFIG =================
+PROFILE_ENABLED = os.getenv("DB_PROFILE", "on").lower() != "off"
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "50"))
+EXPLAIN_SLOW_QUERIES = os.getenv("DB_EXPLAIN_SLOW", "off").lower() == "on"
+SAMPLES_PER_STATEMENT = 512
+SLOW_LOG_SIZE = 100
+PROFILE_DIR = "db_profiles"
+
+
+# =========================================================
+# STATEMENT NORMALIZATION
+# =========================================================
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _SPACE_RE.sub(" ", sql).strip().rstrip(";")
+    return _IN_LIST_RE.sub("IN (?)", sql)
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# =========================================================
+# QUERY STATS
+# =========================================================
+class StatementStats:
+    __slots__ = ("count", "total", "max", "rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_PER_STATEMENT)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 3),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class LockStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def to_dict(self):
+        return {
+            "acquisitions": self.count,
+            "total_wait_ms": round(self.total * 1000, 3),
+            "avg_wait_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_wait_ms": round(self.max * 1000, 3),
+        }
+
+
+class QueryProfiler:
+    def __init__(self):
+        self.enabled = PROFILE_ENABLED
+        self.slow_ms = SLOW_QUERY_MS
+        self.explain = EXPLAIN_SLOW_QUERIES
+        self.reset()
+
+    def reset(self):
+        self.statements = {}
+        self.lock_waits = {}
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        self.started_at = time.time()
+
+    # ---------------- RECORDING ----------------
+    # returns True when the statement crossed the slow threshold
+    def record(self, path: str, sql: str, elapsed: float, rows: int = 0) -> bool:
+        if not self.enabled:
+            return False
+
+        key = (path, normalize_sql(sql))
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats()
+
+        stats.count += 1
+        stats.total += elapsed
+        stats.rows += rows
+        stats.samples.append(elapsed)
+        if elapsed > stats.max:
+            stats.max = elapsed
+
+        if elapsed * 1000 >= self.slow_ms:
+            self.slow_log.append({
+                "db": path,
+                "sql": key[1],
+                "ms": round(elapsed * 1000, 3),
+                "at": int(time.time()),
+                "plan": None,
+            })
+            print(f"🐢 Slow query on {path} ({elapsed * 1000:.1f}ms): {key[1][:120]}")
+            return True
+        return False
+
+    def add_rows(self, path: str, sql: str, rows: int):
+        stats = self.statements.get((path, normalize_sql(sql)))
+        if stats is not None:
+            stats.rows += rows
+
+    def record_lock_wait(self, path: str, waited: float):
+        if not self.enabled:
+            return
+        stats = self.lock_waits.get(path)
+        if stats is None:
+            stats = self.lock_waits[path] = LockStats()
+        stats.count += 1
+        stats.total += waited
+        if waited > stats.max:
+            stats.max = waited
+
+    def attach_plan(self, path: str, sql: str, plan: list):
+        normalized = normalize_sql(sql)
+        for entry in reversed(self.slow_log):
+            if entry["db"] == path and entry["sql"] == normalized and entry["plan"] is None:
+                entry["plan"] = plan
+                return
+
+    # ---------------- REPORTING ----------------
+    def top(self, limit: int = 10, order: str = "total_ms"):
+        rows = [
+            {"db": path, "sql": sql, **stats.to_dict()}
+            for (path, sql), stats in self.statements.items()
+        ]
+        rows.sort(key=lambda r: r[order], reverse=True)
+        return rows[:limit]
+
+    def snapshot(self) -> dict:
+        return {
+            "started_at": int(self.started_at),
+            "generated_at": int(time.time()),
+            "slow_query_ms": self.slow_ms,
+            "statements": self.top(limit=len(self.statements)),
+            "lock_waits": {path: s.to_dict() for path, s in self.lock_waits.items()},
+            "slow_queries": list(self.slow_log),
+        }
+
+    def dump(self, path: str = None) -> str:
+        if path is None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            ts = time.strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(PROFILE_DIR, f"db_profile_{ts}.json")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+profiler = QueryProfiler()
@@ -0,0 +1,73 @@
+from utils.db import get_db, DB_NAME, SLOTS_DB_NAME, VTC_DB_NAME
+
+# =========================================================
+# QUERY PLAN AUDIT
+# =========================================================
+# Hot lookups that must stay index-backed. Each entry is
+# (label, db file, sql, sample params). Any plan step that scans a
+# whole table is reported so regressions show up as tables grow.
+
+KNOWN_QUERIES = [
+    ("birthdays today", DB_NAME,
+     "SELECT user_id, guild_id, year, message FROM birthdays WHERE day=? AND month=?", (1, 1)),
+    ("birthday leaderboard", DB_NAME,
+     "SELECT user_id, year FROM birthdays WHERE guild_id=? ORDER BY year ASC LIMIT 10", (1,)),
+    ("premium expiry", DB_NAME,
+     "SELECT user_id, tier FROM premium WHERE expires < ?", (0,)),
+    ("premium lookup", DB_NAME,
+     "SELECT tier, expires FROM premium WHERE user_id=?", (1,)),
+    ("level lookup", DB_NAME,
+     "SELECT xp, level FROM levels WHERE user_id=? AND guild_id=?", (1, 1)),
+    ("guild level ranking", DB_NAME,
+     "SELECT user_id, level, xp FROM levels WHERE guild_id=? ORDER BY level DESC, xp DESC LIMIT 10", (1,)),
+    ("guild level rank", DB_NAME,
+     "SELECT COUNT(*) FROM levels WHERE guild_id=? AND (level, xp) > (?, ?)", (1, 1, 0)),
+    ("guild level page", DB_NAME,
+     "SELECT user_id, level, xp FROM levels WHERE guild_id=? "
+     "ORDER BY level DESC, xp DESC LIMIT ? OFFSET ?", (1, 10, 10)),
+    ("coin balance", DB_NAME,
+     "SELECT balance FROM coins WHERE user_id=?", (1,)),
+    ("coin history", DB_NAME,
+     "SELECT delta, source, reason, ref_id, created_at FROM coin_ledger WHERE user_id=? ORDER BY id DESC LIMIT ?", (1, 15)),
+    ("ticket lookup", DB_NAME,
+     "SELECT user_id, claimed_by FROM tickets WHERE channel_id=?", (1,)),
+    ("warn count", DB_NAME,
+     "SELECT count FROM warnings WHERE user_id=? AND guild_id=?", (1, 1)),
+    ("youtube per guild", DB_NAME,
+     "SELECT youtube_channel FROM youtube_alerts WHERE guild_id=?", (1,)),
+    ("panel slots", SLOTS_DB_NAME,
+     "SELECT slot_number, status, vtc_name FROM slots WHERE panel_id=?", (1,)),
+    ("slot booking", SLOTS_DB_NAME,
+     "SELECT booked_by FROM slots WHERE panel_id=? AND slot_number=?", (1, 1)),
+    ("event name", SLOTS_DB_NAME,
+     "SELECT event_name FROM events WHERE event_id=?", (1,)),
+    ("slot leaderboard", SLOTS_DB_NAME,
+     "SELECT vtc_name, COUNT(*) FROM history h JOIN panels p ON h.panel_id=p.id "
+     "WHERE p.event_id=? GROUP BY vtc_name", (1,)),
+    ("posted event", VTC_DB_NAME,
+     "SELECT event_id FROM posted_events WHERE event_id=?", (1,)),
+]
+
+
+def is_full_scan(step: str) -> bool:
+    # "SCAN t" is a full table scan; "SCAN t USING (COVERING) INDEX" walks an index
+    return step.startswith("SCAN ") and "USING" not in step
+
+
+async def audit_query_plans():
+    results = []
+    for label, path, sql, params in KNOWN_QUERIES:
+        try:
+            plan = await get_db(path).explain(sql, params)
+        except Exception as e:
+            plan = [f"explain failed: {e}"]
+
+        scans = [step for step in plan if is_full_scan(step)]
+        results.append({
+            "label": label,
+            "db": path,
+            "sql": sql,
+            "plan": plan,
+            "scans": scans,
+        })
+    return results
@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+from utils.render import render, RankCardJob
+
+# ================= CONFIG =================
+AVATAR_FETCH_SIZE = 256     # CDN size to download; avoids pulling 1024px originals
+AVATAR_CACHE_SIZE = 512     # downloaded avatars kept in memory
+
+
+# =========================================================
+# RANK CARD
+# =========================================================
+# Drawing happens in the render pool (utils/render_jobs.RankCardJob).
+# Avatars are downloaded once per avatar hash and kept in an LRU here;
+# each worker keeps its own decoded copy keyed by the same hash.
+
+_avatars = OrderedDict()
+
+
+# ================= AVATARS =================
+async def avatar_bytes(member):
+    asset = member.display_avatar
+    key = asset.key
+
+    data = _avatars.get(key)
+    if data is not None:
+        _avatars.move_to_end(key)
+        return key, data
+
+    try:
+        data = await asset.with_size(AVATAR_FETCH_SIZE).read()
+    except Exception:
+        return key, None
+
+    _avatars[key] = data
+    if len(_avatars) > AVATAR_CACHE_SIZE:
+        _avatars.popitem(last=False)
+    return key, data
+
+
+# ================= PUBLIC =================
+async def render_rank_card(member, level, xp, needed, coins, rank=None) -> bytes:
+    key, data = await avatar_bytes(member)
+    return await render.submit(
+        RankCardJob(member.name, key, data, level, xp, needed, coins, rank)
+    )
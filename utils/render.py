@@ -0,0 +1,151 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import render_jobs
+from utils.render_jobs import (
+    RankCardJob, BirthdayCardJob, BirthdayProfileJob, InvoiceJob, EmojiResizeJob,
+)
+
+# ================= CONFIG =================
+WORKERS = max(1, min(2, (os.cpu_count() or 1) - 1))
+MAX_PENDING = 16        # jobs queued or running across all workers
+QUEUE_WAIT = 5.0        # seconds a caller waits for a free slot before giving up
+JOB_TIMEOUT = 10.0      # default per-job timeout, seconds
+
+
+# =========================================================
+# RENDER SERVICE
+# =========================================================
+# All Pillow work runs in a small process pool so image rendering never
+# holds the event loop (or the GIL) while interactions wait to be
+# acknowledged. Cogs build a job from utils/render_jobs and await
+# `render.submit(job)` for the encoded bytes.
+#
+#   - backpressure: at most MAX_PENDING jobs are in flight; further
+#     callers wait up to QUEUE_WAIT seconds for a slot, then get a
+#     RuntimeError instead of piling more work onto the workers
+#   - timeout: the caller stops waiting after `timeout` seconds. A job
+#     that is already running can't be interrupted, so it keeps its slot
+#     until the worker is done with it
+#   - workers are spawned, not forked, and load fonts once on start-up
+#     (render_jobs.warm_up); templates and avatars are cached per worker
+
+class KindStats:
+    __slots__ = ("count", "total", "max", "timeouts", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+        self.errors = 0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0,
+            "max_ms": round(self.max * 1000, 1),
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+class RenderService:
+    def __init__(self, workers: int = WORKERS, max_pending: int = MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = None
+        self._slots = asyncio.Semaphore(max_pending)
+        self.pending = 0
+        self.rejected = 0
+        self.kinds = {}
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=render_jobs.warm_up,
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ---------------- SUBMIT ----------------
+    async def submit(self, job, timeout: float = JOB_TIMEOUT) -> bytes:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), QUEUE_WAIT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RuntimeError("Render queue is full") from None
+
+        stats = self.kinds.setdefault(job.kind, KindStats())
+        self.pending += 1
+        try:
+            future = self.start().submit(_run, job)
+        except BrokenProcessPool:
+            # a worker died (OOM, killed); replace the pool and retry once
+            self.close()
+            try:
+                future = self.start().submit(_run, job)
+            except Exception:
+                self._release()
+                raise
+        except Exception:
+            self._release()
+            raise
+
+        # the slot is held until the worker is done, not until we stop waiting
+        loop = asyncio.get_running_loop()
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                pass  # loop already closed on shutdown
+
+        future.add_done_callback(done)
+
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+
+        elapsed = time.perf_counter() - started
+        stats.count += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        return data
+
+    def _release(self):
+        self.pending -= 1
+        self._slots.release()
+
+    # ---------------- STATS ----------------
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "kinds": {kind: s.to_dict() for kind, s in self.kinds.items()},
+        }
+
+
+def _run(job) -> bytes:
+    return job.run()
+
+
+render = RenderService()
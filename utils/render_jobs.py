@@ -0,0 +1,263 @@
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+# =========================================================
+# RENDER JOBS
+# =========================================================
+# Everything here runs inside a render worker process (utils/render).
+# A job is a small picklable description of one image; `run()` draws it
+# and returns the encoded PNG/GIF bytes.
+#
+# Fonts, backgrounds and templates are cached per worker process, so
+# each is loaded from disk once per worker rather than once per image.
+# This module must not import discord or anything that touches the
+# database: workers import it on their own.
+
+FONT_PATH = "fonts/CinzelDecorative-Bold.ttf"
+ARIAL_PATH = "arial.ttf"
+INVOICE_BG_PATH = "assets/invoice_bg.png"
+
+AVATAR_SIZE = 150
+AVATAR_CACHE_SIZE = 128     # prepared avatars kept per worker
+
+_fonts = {}
+_images = {}
+_avatars = OrderedDict()
+
+
+# ================= WORKER CACHES =================
+def font(path: str, size: int):
+    key = (path, size)
+    f = _fonts.get(key)
+    if f is None:
+        try:
+            f = ImageFont.truetype(path, size)
+        except OSError:
+            f = ImageFont.load_default()
+        _fonts[key] = f
+    return f
+
+
+def cached_image(key, build) -> Image.Image:
+    """Shared, read-only image. Callers copy() before drawing on it."""
+    img = _images.get(key)
+    if img is None:
+        img = _images[key] = build()
+    return img
+
+
+def avatar(key: str, data: bytes) -> Image.Image:
+    img = _avatars.get(key)
+    if img is not None:
+        _avatars.move_to_end(key)
+        return img
+
+    img = Image.open(BytesIO(data)).resize((AVATAR_SIZE, AVATAR_SIZE)).convert("RGBA")
+    _avatars[key] = img
+    if len(_avatars) > AVATAR_CACHE_SIZE:
+        _avatars.popitem(last=False)
+    return img
+
+
+def warm_up():
+    """Pool initializer: load the common fonts before the first job."""
+    for size in (26, 33, 50):
+        font(FONT_PATH, size)
+    for size in (25, 40, 60):
+        font(ARIAL_PATH, size)
+
+
+def encode(img: Image.Image, fmt: str = "PNG", **params) -> bytes:
+    buf = BytesIO()
+    img.save(buf, fmt, **params)
+    return buf.getvalue()
+
+
+# =========================================================
+# RANK CARD
+# =========================================================
+CARD_SIZE = (900, 300)
+BAR_X, BAR_Y, BAR_W, BAR_H = 220, 250, 600, 25
+
+
+def _rank_template():
+    img = Image.new("RGB", CARD_SIZE, (20, 20, 20))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((BAR_X, BAR_Y, BAR_X + BAR_W, BAR_Y + BAR_H), fill=(60, 60, 60))
+    return img
+
+
+class RankCardJob:
+    __slots__ = ("username", "avatar_key", "avatar", "level", "xp", "needed", "coins", "rank")
+    kind = "rank_card"
+
+    def __init__(self, username, avatar_key, avatar, level, xp, needed, coins, rank=None):
+        self.username = username
+        self.avatar_key = avatar_key
+        self.avatar = avatar        # raw avatar bytes or None
+        self.level = level
+        self.xp = xp
+        self.needed = needed
+        self.coins = coins
+        self.rank = rank            # (position, members) or None
+
+    def run(self) -> bytes:
+        img = cached_image("rank_card", _rank_template).copy()
+        draw = ImageDraw.Draw(img)
+
+        if self.avatar is not None:
+            face = avatar(self.avatar_key, self.avatar)
+            img.paste(face, (30, 75), face)
+
+        draw.text((220, 40), self.username, font=font(FONT_PATH, 50), fill="white")
+        draw.text((220, 120), f"LEVEL {self.level}", font=font(FONT_PATH, 33), fill="gold")
+        draw.text((220, 160), f"{self.coins} COINS", font=font(FONT_PATH, 33), fill=(0, 255, 200))
+        draw.text((220, 210), f"XP: {self.xp} / {self.needed}", font=font(FONT_PATH, 26), fill="white")
+
+        if self.rank is not None:
+            position, members = self.rank
+            draw.text((BAR_X + BAR_W, 130), f"RANK #{position}", font=font(FONT_PATH, 33),
+                      fill="white", anchor="ra")
+            draw.text((BAR_X + BAR_W, 175), f"of {members}", font=font(FONT_PATH, 26),
+                      fill=(160, 160, 160), anchor="ra")
+
+        progress = int((self.xp / self.needed) * BAR_W) if self.needed else 0
+        draw.rectangle((BAR_X, BAR_Y, BAR_X + progress, BAR_Y + BAR_H), fill=(0, 200, 255))
+
+        return encode(img)
+
+
+# =========================================================
+# BIRTHDAY
+# =========================================================
+PROFILE_BACKGROUNDS = {
+    "default": (30, 30, 30),
+    "neon": (10, 10, 40),
+    "gold": (60, 45, 10),
+    "space": (5, 5, 20),
+    "anime": (60, 20, 60)
+}
+
+
+class BirthdayCardJob:
+    __slots__ = ("username", "age")
+    kind = "birthday_card"
+
+    def __init__(self, username, age):
+        self.username = username
+        self.age = age
+
+    def run(self) -> bytes:
+        img = Image.new("RGB", (800, 300), (255, 182, 193))
+        draw = ImageDraw.Draw(img)
+
+        draw.text((50, 80), "Happy Birthday!", font=font(ARIAL_PATH, 60), fill=(255, 255, 255))
+        draw.text((50, 170), f"{self.username} - {self.age} years old",
+                  font=font(ARIAL_PATH, 40), fill=(255, 255, 255))
+
+        return encode(img)
+
+
+class BirthdayProfileJob:
+    __slots__ = ("username", "age", "streak", "background")
+    kind = "birthday_profile"
+
+    def __init__(self, username, age, streak, background="default"):
+        self.username = username
+        self.age = age
+        self.streak = streak
+        self.background = background
+
+    def run(self) -> bytes:
+        bg_color = PROFILE_BACKGROUNDS.get(self.background, (30, 30, 30))
+        font_big = font(ARIAL_PATH, 40)
+        font_small = font(ARIAL_PATH, 25)
+
+        frames = []
+        for i in range(6):
+            img = Image.new("RGB", (500, 250), bg_color)
+            draw = ImageDraw.Draw(img)
+
+            glow = 100 + i * 20
+            draw.text((30, 30), self.username, font=font_big, fill=(255, glow, 0))
+            draw.text((30, 120), f"Age: {self.age}", font=font_small, fill=(255, 255, 255))
+            draw.text((30, 170), f"Streak: {self.streak} years", font=font_small, fill=(0, 255, 0))
+
+            frames.append(img)
+
+        return encode(
+            frames[0], "GIF",
+            save_all=True,
+            append_images=frames[1:],
+            duration=120,
+            loop=0
+        )
+
+
+# =========================================================
+# INVOICE
+# =========================================================
+INVOICE_SIZE = (1080, 1080)
+INVOICE_TEXT_CONFIG = {
+    "invoice_id": {"x": 152, "y": 525, "fontSize": 25},
+    "date": {"x": 675, "y": 525, "fontSize": 25},
+    "customer": {"x": 152, "y": 600, "fontSize": 23},
+    "paid_amount": {"x": 152, "y": 730, "fontSize": 22},
+    "coin_credit": {"x": 152, "y": 670, "fontSize": 22}
+}
+
+
+def _invoice_background():
+    try:
+        return Image.open(INVOICE_BG_PATH).convert("RGB").resize(INVOICE_SIZE)
+    except Exception:
+        return Image.new("RGB", INVOICE_SIZE, (30, 30, 30))
+
+
+class InvoiceJob:
+    __slots__ = ("invoice_id", "date", "username", "rupees", "coins")
+    kind = "invoice"
+
+    def __init__(self, invoice_id, date, username, rupees, coins):
+        self.invoice_id = invoice_id
+        self.date = date
+        self.username = username
+        self.rupees = rupees
+        self.coins = coins
+
+    def run(self) -> bytes:
+        img = cached_image("invoice_bg", _invoice_background).copy()
+        draw = ImageDraw.Draw(img)
+        cfg = INVOICE_TEXT_CONFIG
+
+        lines = (
+            ("invoice_id", f"Invoice ID: {self.invoice_id}", "gold"),
+            ("date", f"Date: {self.date}", "white"),
+            ("customer", f"Customer: {self.username}", "white"),
+            ("paid_amount", f"Paid Amount: ₹{self.rupees}", "white"),
+            ("coin_credit", f"Coins Credited: {self.coins}", "cyan"),
+        )
+        for key, text, fill in lines:
+            c = cfg[key]
+            draw.text((c["x"], c["y"]), text, font=font(FONT_PATH, c["fontSize"]), fill=fill)
+
+        return encode(img)
+
+
+# =========================================================
+# EMOJI
+# =========================================================
+class EmojiResizeJob:
+    __slots__ = ("data",)
+    kind = "emoji_resize"
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def run(self) -> bytes:
+        with Image.open(BytesIO(self.data)) as img:
+            img = img.convert("RGBA")
+            img.thumbnail((128, 128))
+            return encode(img)
@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+import discord
+
+from utils.db import get_db
+from utils.activity import activity
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+EDIT_INTERVAL = 1.0     # seconds between member edits during a bulk resync
+RESYNC_CHUNK = 500      # levels rows read per query
+QUEUE_SIZE = 1000       # members waiting for the edit worker
+PROGRESS_EVERY = 5.0    # seconds between progress callbacks
+
+
+# =========================================================
+# LEVEL ROLE SYNC
+# =========================================================
+# A member's level roles are computed from their level and compared
+# with the roles they have. Only a real difference costs an API call,
+# and that is one `member.edit(roles=...)` for the whole change.
+#
+# A bulk resync reads the guild's levels rows in user_id order and
+# feeds members through a bounded queue to a single edit worker that
+# spaces edits EDIT_INTERVAL apart. Members already in sync are
+# skipped without waiting. One resync per guild at a time.
+
+class ResyncProgress:
+    __slots__ = ("rows", "checked", "changed", "failed", "missing", "started", "done")
+
+    def __init__(self):
+        self.rows = 0
+        self.checked = 0
+        self.changed = 0
+        self.failed = 0
+        self.missing = 0
+        self.started = time.monotonic()
+        self.done = False
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "checked": self.checked,
+            "changed": self.changed,
+            "failed": self.failed,
+            "missing": self.missing,
+            "seconds": round(time.monotonic() - self.started, 1),
+        }
+
+
+class RoleSync:
+    def __init__(self, level_roles: dict):
+        self.level_roles = level_roles
+        self.running = {}   # guild_id -> ResyncProgress
+
+    # ---------------- SINGLE MEMBER ----------------
+    def target_roles(self, member: discord.Member, level: int):
+        """Member's roles as they should be for `level`, or None if nothing changes."""
+        guild = member.guild
+        me = guild.me
+        current = set(member.roles)
+        roles = set(current)
+
+        for lvl, role_id in self.level_roles.items():
+            role = guild.get_role(role_id)
+            # roles above the bot (or managed ones) can't be changed; leave them
+            if role is None or role.managed or (me is not None and role >= me.top_role):
+                continue
+            if level >= lvl:
+                roles.add(role)
+            else:
+                roles.discard(role)
+
+        if roles == current:
+            return None
+        return [r for r in roles if not r.is_default()]
+
+    async def sync_member(self, member: discord.Member, level: int) -> bool:
+        roles = self.target_roles(member, level)
+        if roles is None:
+            return False
+        await member.edit(roles=roles, reason=f"Level roles (level {level})")
+        return True
+
+    # ---------------- BULK RESYNC ----------------
+    async def resync_guild(self, guild: discord.Guild, on_progress=None) -> ResyncProgress:
+        if guild.id in self.running:
+            raise RuntimeError("A role resync is already running for this server")
+
+        progress = self.running[guild.id] = ResyncProgress()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+        async def report():
+            if on_progress is not None:
+                try:
+                    await on_progress(progress)
+                except Exception as e:
+                    print("❌ Role resync progress error:", e)
+
+        async def produce():
+            try:
+                last_user = -1
+                while True:
+                    rows = await get_db(DB_NAME).fetchall(
+                        "SELECT user_id, level FROM levels "
+                        "WHERE guild_id=? AND user_id>? ORDER BY user_id LIMIT ?",
+                        (guild.id, last_user, RESYNC_CHUNK)
+                    )
+                    if not rows:
+                        break
+                    for user_id, level in rows:
+                        await queue.put((user_id, level or 1))
+                    last_user = rows[-1][0]
+            finally:
+                await queue.put(None)
+
+        async def consume():
+            last_edit = 0.0
+            last_report = time.monotonic()
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+
+                user_id, level = item
+                progress.checked += 1
+                member = guild.get_member(user_id)
+                roles = self.target_roles(member, level) if member else None
+
+                if member is None:
+                    progress.missing += 1
+                elif roles is not None:
+                    wait = last_edit + EDIT_INTERVAL - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    try:
+                        await member.edit(roles=roles, reason="Level role resync")
+                        progress.changed += 1
+                    except discord.HTTPException:
+                        progress.failed += 1
+                    last_edit = time.monotonic()
+
+                if time.monotonic() - last_report >= PROGRESS_EVERY:
+                    last_report = time.monotonic()
+                    await report()
+
+        try:
+            # buffered XP first, so rows hold everyone's current level
+            await activity.flush()
+            row = await get_db(DB_NAME).fetchone(
+                "SELECT COUNT(*) FROM levels WHERE guild_id=?", (guild.id,)
+            )
+            progress.rows = row[0]
+
+            producer = asyncio.create_task(produce())
+            try:
+                await consume()
+                await producer  # re-raises a failed read
+            finally:
+                producer.cancel()
+
+            progress.done = True
+            await report()
+            return progress
+        finally:
+            del self.running[guild.id]
@@ -0,0 +1,212 @@
+import asyncio
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from gtts import gTTS
+
+from utils.db import get_db, register_invalidator
+from utils.tts_cache import clip_cache
+
+DB_NAME = "bot.db"
+
+# ================= CONFIG =================
+SYNTH_THREADS = 4           # gTTS is network bound; a few requests in flight
+SYNTH_TIMEOUT = 10          # seconds before a backend counts as failed
+FAILURE_BACKOFF = 60        # a failed backend is tried last for this long
+DEFAULT_ORDER = ("gtts", "espeak")
+ALL_LANGS = "*"
+
+
+# =========================================================
+# SPEECH SYNTHESIS
+# =========================================================
+# A backend turns (text, lang) into audio bytes FFmpeg can read (MP3 or
+# WAV). Each guild picks a backend, optionally per language; the other
+# backends follow in DEFAULT_ORDER as fallbacks, so a gTTS outage falls
+# through to the local engine. A backend that just failed is moved to
+# the back of the line for FAILURE_BACKOFF seconds. Every backend
+# records how long its clips take for /autotts_stats, and clips are
+# cached per backend (utils/tts_cache).
+
+_synth_pool = ThreadPoolExecutor(max_workers=SYNTH_THREADS, thread_name_prefix="tts")
+
+
+class Backend:
+    name = None
+    langs = ()
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.down_until = 0.0
+        self.last_error = None
+
+    def available(self) -> bool:
+        return True
+
+    def supports(self, lang: str) -> bool:
+        return self.available() and lang in self.langs
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    async def _synthesize(self, text: str, lang: str) -> bytes:
+        raise NotImplementedError
+
+    async def synthesize(self, text: str, lang: str) -> bytes:
+        started = time.perf_counter()
+        try:
+            audio = await asyncio.wait_for(self._synthesize(text, lang), SYNTH_TIMEOUT)
+        except Exception as e:
+            self.failures += 1
+            self.down_until = time.monotonic() + FAILURE_BACKOFF
+            self.last_error = str(e) or type(e).__name__
+            raise
+
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.down_until = 0.0
+        return audio
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "available": self.available(),
+            "calls": self.calls,
+            "avg_ms": round(self.total / self.calls * 1000, 1) if self.calls else 0,
+            "max_ms": round(self.max * 1000, 1),
+            "failures": self.failures,
+            "healthy": self.healthy(time.monotonic()),
+            "last_error": self.last_error,
+        }
+
+
+class GTTSBackend(Backend):
+    """Google Translate TTS over HTTP (MP3). Blocking, so it runs on the pool."""
+    name = "gtts"
+    langs = ("en", "ta", "hi")
+
+    @staticmethod
+    def _run(text: str, lang: str) -> bytes:
+        buf = BytesIO()
+        gTTS(text=text, lang=lang, timeout=SYNTH_TIMEOUT).write_to_fp(buf)
+        return buf.getvalue()
+
+    async def _synthesize(self, text: str, lang: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_synth_pool, self._run, text, lang)
+
+
+class EspeakBackend(Backend):
+    """Local espeak-ng (WAV on stdout). No network, a few ms per clip."""
+    name = "espeak"
+    langs = ("en", "ta", "hi")
+
+    def __init__(self):
+        super().__init__()
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self.binary is not None
+
+    async def _synthesize(self, text: str, lang: str) -> bytes:
+        proc = await asyncio.create_subprocess_exec(
+            self.binary, "-v", lang, "--stdin", "--stdout",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            audio, err = await proc.communicate(text.encode())
+        except BaseException:
+            proc.kill()
+            raise
+        if proc.returncode != 0 or not audio:
+            raise RuntimeError(f"espeak exited {proc.returncode}: {err.decode(errors='ignore').strip()}")
+        return audio
+
+
+BACKENDS = {b.name: b for b in (GTTSBackend(), EspeakBackend())}
+
+
+# =========================================================
+# PER-GUILD CHOICE
+# =========================================================
+# tts_backends rows are (guild_id, lang, backend); lang "*" covers every
+# language without a row of its own.
+
+_choices = {}   # guild_id -> {lang: backend name}
+
+
+def _clear_choices():
+    _choices.clear()
+
+
+register_invalidator(_clear_choices)
+
+
+async def guild_backends(guild_id: int) -> dict:
+    choices = _choices.get(guild_id)
+    if choices is not None:
+        return choices
+
+    rows = await get_db(DB_NAME).fetchall(
+        "SELECT lang, backend FROM tts_backends WHERE guild_id=?",
+        (guild_id,)
+    )
+    return _choices.setdefault(guild_id, {lang: backend for lang, backend in rows})
+
+
+async def set_backend(guild_id: int, lang: str, backend: str = None):
+    """Pick `backend` for a guild's `lang` ("*" for all); None goes back to the default."""
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend: {backend}")
+
+    db = get_db(DB_NAME)
+    if backend is None:
+        await db.execute("DELETE FROM tts_backends WHERE guild_id=? AND lang=?", (guild_id, lang))
+    else:
+        await db.execute(
+            "INSERT OR REPLACE INTO tts_backends (guild_id, lang, backend) VALUES (?,?,?)",
+            (guild_id, lang, backend)
+        )
+    _choices.pop(guild_id, None)
+
+
+async def backend_chain(guild_id: int, lang: str) -> list:
+    """Backends to try for this guild and language, best first."""
+    choices = await guild_backends(guild_id) if guild_id is not None else {}
+    preferred = choices.get(lang) or choices.get(ALL_LANGS)
+
+    order = [preferred] if preferred in BACKENDS else []
+    order += [name for name in DEFAULT_ORDER if name not in order]
+    chain = [BACKENDS[name] for name in order if BACKENDS[name].supports(lang)]
+
+    # anything that failed recently goes last (stable, so preference holds)
+    now = time.monotonic()
+    chain.sort(key=lambda b: not b.healthy(now))
+    return chain
+
+
+async def synthesize(text: str, lang: str, guild_id: int = None) -> bytes:
+    chain = await backend_chain(guild_id, lang)
+    if not chain:
+        raise RuntimeError(f"No TTS backend for language {lang}")
+
+    for backend in chain:
+        try:
+            return await clip_cache.get(text, lang, backend.name, backend.synthesize)
+        except Exception as e:
+            error = e
+            print(f"❌ TTS backend {backend.name} failed:", e)
+    raise error
+
+
+def snapshot():
+    return [backend.to_dict() for backend in BACKENDS.values()]
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+
+# ================= CONFIG =================
+CACHE_DIR = "tts_cache"
+MEMORY_BYTES = 16 * 1024 * 1024     # clips kept in RAM
+DISK_BYTES = 256 * 1024 * 1024      # clips kept on disk
+
+
+# =========================================================
+# TTS CLIP CACHE
+# =========================================================
+# Clips are keyed by (backend, normalized text, lang), so each voice
+# keeps its own copy of a phrase. Lookups go memory ->
+# disk -> synthesize; a disk hit is promoted to memory and a fresh clip
+# is written to both tiers. Each tier is an LRU bounded by total bytes.
+# Concurrent misses for the same key share one synthesis.
+#
+# <CACHE_DIR>/ab/abcdef....clip   named by the sha1 of "backend\0lang\0text"
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class ClipCache:
+    def __init__(self, root: str = CACHE_DIR, memory_bytes: int = MEMORY_BYTES,
+                 disk_bytes: int = DISK_BYTES):
+        self.root = root
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+
+        self.memory = OrderedDict()     # digest -> bytes
+        self.memory_used = 0
+        self.disk = None                # digest -> size, oldest first; loaded lazily
+        self.disk_used = 0
+        self._inflight = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text: str, lang: str, backend: str) -> str:
+        return hashlib.sha1(f"{backend}\0{lang}\0{normalize(text)}".encode()).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.clip")
+
+    # ---------------- MEMORY TIER ----------------
+    def _remember(self, digest: str, audio: bytes):
+        if digest in self.memory:
+            self.memory.move_to_end(digest)
+            return
+        self.memory[digest] = audio
+        self.memory_used += len(audio)
+        while self.memory_used > self.memory_bytes and len(self.memory) > 1:
+            _, old = self.memory.popitem(last=False)
+            self.memory_used -= len(old)
+
+    # ---------------- DISK TIER (worker thread) ----------------
+    def _scan(self):
+        entries = []
+        if os.path.exists(self.root):
+            for prefix in os.listdir(self.root):
+                folder = os.path.join(self.root, prefix)
+                for name in os.listdir(folder):
+                    if not name.endswith(".clip"):
+                        continue
+                    st = os.stat(os.path.join(folder, name))
+                    entries.append((st.st_mtime, name[:-5], st.st_size))
+        entries.sort()
+        return OrderedDict((digest, size) for _, digest, size in entries)
+
+    def _read(self, digest: str) -> bytes:
+        path = self._path(digest)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # LRU order survives a restart
+        return data
+
+    def _write(self, digest: str, audio: bytes, evict):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(audio)
+        os.replace(f"{path}.tmp", path)
+        for old in evict:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+
+    async def _disk_index(self):
+        if self.disk is None:
+            disk = await asyncio.to_thread(self._scan)
+            if self.disk is None:
+                self.disk = disk
+                self.disk_used = sum(disk.values())
+        return self.disk
+
+    async def _load(self, digest: str):
+        disk = await self._disk_index()
+        if digest not in disk:
+            return None
+        try:
+            audio = await asyncio.to_thread(self._read, digest)
+        except FileNotFoundError:
+            self.disk_used -= disk.pop(digest, 0)
+            return None
+        disk.move_to_end(digest)
+        return audio
+
+    async def _store(self, digest: str, audio: bytes):
+        disk = await self._disk_index()
+        if digest not in disk:
+            disk[digest] = len(audio)
+            self.disk_used += len(audio)
+
+        evict = []
+        while self.disk_used > self.disk_bytes and len(disk) > 1:
+            old, size = disk.popitem(last=False)
+            self.disk_used -= size
+            evict.append(old)
+        self.evictions += len(evict)
+
+        await asyncio.to_thread(self._write, digest, audio, evict)
+
+    # ---------------- PUBLIC ----------------
+    async def get(self, text: str, lang: str, backend: str, synthesize) -> bytes:
+        """Cached clip for (backend, text, lang), or `await synthesize(text, lang)` once."""
+        digest = self.key(text, lang, backend)
+
+        audio = self.memory.get(digest)
+        if audio is not None:
+            self.memory.move_to_end(digest)
+            self.memory_hits += 1
+            return audio
+
+        inflight = self._inflight.get(digest)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            audio = await self._load(digest)
+            if audio is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                audio = await synthesize(text, lang)
+                try:
+                    await self._store(digest, audio)
+                except OSError as e:
+                    print("❌ TTS cache write error:", e)
+
+            self._remember(digest, audio)
+            future.set_result(audio)
+            return audio
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            del self._inflight[digest]
+
+    def snapshot(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0,
+            "memory_clips": len(self.memory),
+            "memory_mb": round(self.memory_used / (1024 * 1024), 2),
+            "disk_clips": len(self.disk or ()),
+            "disk_mb": round(self.disk_used / (1024 * 1024), 2),
+            "evictions": self.evictions,
+        }
+
+
+clip_cache = ClipCache()
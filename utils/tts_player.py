@@ -0,0 +1,123 @@
+import asyncio
+from io import BytesIO
+
+import discord
+
+from utils.tts import synthesize
+from utils.voice_connections import connections
+
+# ================= CONFIG =================
+QUEUE_SIZE = 20         # messages waiting per guild; extra ones are dropped
+IDLE_SECONDS = 300      # a guild's worker exits after this long with nothing to say
+
+
+# =========================================================
+# PER-GUILD TTS PLAYER
+# =========================================================
+# Each guild gets its own queue and worker task, so one guild's speech
+# never waits behind another's. Clips are synthesized in memory by the
+# guild's TTS backend (utils/tts) and the next clip's synthesis starts
+# as soon as the current one begins to play, so there is no gap for the
+# HTTP round trip between clips. The voice connection is shared
+# through utils/voice_connections: queuing a clip warms it up, playing
+# one acquires it. Playback moves on when FFmpeg's `after` callback
+# fires. The worker exits after IDLE_SECONDS without work and is
+# restarted by the next message.
+
+class GuildPlayer:
+    def __init__(self, bot, guild_id: int):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.played = 0
+        self.dropped = 0
+        self.errors = 0
+        self._task = None
+
+    # ---------------- LIFECYCLE ----------------
+    def enqueue(self, channel_id: int, text: str, lang: str) -> bool:
+        try:
+            self.queue.put_nowait((channel_id, text, lang))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        connections.warm(self.guild_id, channel_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # ---------------- WORKER ----------------
+    def _synth(self, item):
+        channel_id, text, lang = item
+        return channel_id, asyncio.create_task(synthesize(text, lang, self.guild_id))
+
+    async def _run(self):
+        pending = None  # (channel_id, synthesis task) of the next clip
+        play = getter = None
+        try:
+            while True:
+                if pending is None:
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), IDLE_SECONDS)
+                    except asyncio.TimeoutError:
+                        return
+                    pending = self._synth(item)
+
+                channel_id, job = pending
+                pending = None
+                try:
+                    audio = await job
+                except Exception as e:
+                    self.errors += 1
+                    print("TTS Error:", e)
+                    continue
+
+                play = asyncio.create_task(self._play(channel_id, audio))
+
+                # prefetch: synthesize whatever arrives while this clip plays
+                getter = asyncio.create_task(self.queue.get())
+                done, _ = await asyncio.wait({play, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    pending = self._synth(getter.result())
+                else:
+                    getter.cancel()
+
+                try:
+                    await play
+                    self.played += 1
+                except Exception as e:
+                    self.errors += 1
+                    print("TTS Error:", e)
+        finally:
+            for task in (pending and pending[1], play, getter):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    # ---------------- PLAYBACK ----------------
+    async def _play(self, channel_id: int, audio: bytes):
+        vc = await connections.acquire(self.guild_id, channel_id)
+        if vc is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def after(error):
+            # called from the audio player thread
+            loop.call_soon_threadsafe(
+                lambda: finished.done() or finished.set_result(error)
+            )
+
+        vc.play(discord.FFmpegPCMAudio(BytesIO(audio), pipe=True), after=after)
+        try:
+            error = await finished
+        finally:
+            connections.release(self.guild_id)
+        if error:
+            raise error
@@ -0,0 +1,199 @@
+import asyncio
+import time
+
+# ================= CONFIG =================
+IDLE_DISCONNECT = 180   # seconds without speech before leaving the channel
+SWEEP_INTERVAL = 30
+CONNECT_TIMEOUT = 15
+
+
+# =========================================================
+# VOICE CONNECTIONS
+# =========================================================
+# One voice connection per guild, shared by everything that speaks.
+#
+# - warm():    called as soon as a clip is queued. If the guild has no
+#              connection, the handshake starts in the background and
+#              overlaps with synthesis of the first clip.
+# - acquire(): called right before playing. Waits for a pending
+#              handshake, and moves channel only if the clip is for a
+#              different channel than the one we're in.
+# - release(): called after playing; marks the guild as used.
+#
+# A sweep disconnects guilds idle for IDLE_DISCONNECT seconds. Our own
+# voice state updates tell us when the connection was dropped from the
+# outside (kicked, channel deleted) so the next clip reconnects.
+
+class GuildConnection:
+    __slots__ = ("guild_id", "last_used", "pending", "connected_before", "closing")
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.last_used = time.monotonic()
+        self.pending = None             # handshake task
+        self.connected_before = False
+        self.closing = False
+
+
+class VoiceConnections:
+    def __init__(self, idle_seconds: float = IDLE_DISCONNECT):
+        self.idle_seconds = idle_seconds
+        self.guilds = {}
+        self.bot = None
+        self._sweep_task = None
+
+        self.connects = 0
+        self.reconnects = 0
+        self.moves = 0
+        self.idle_disconnects = 0
+        self.drops = 0
+        self.failures = 0
+        self.handshakes = 0
+        self.handshake_total = 0.0
+        self.handshake_max = 0.0
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self, bot):
+        if self.bot is None:
+            self.bot = bot
+            bot.add_listener(self.on_voice_state_update)
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    def close(self):
+        if self._sweep_task:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+    def _state(self, guild_id: int) -> GuildConnection:
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = self.guilds[guild_id] = GuildConnection(guild_id)
+        return state
+
+    # ---------------- CONNECT ----------------
+    async def _connect(self, state: GuildConnection, channel):
+        started = time.perf_counter()
+        try:
+            vc = await channel.connect(timeout=CONNECT_TIMEOUT, self_deaf=True)
+        except Exception as e:
+            self.failures += 1
+            print("❌ Voice connect error:", e)
+            return None
+
+        elapsed = time.perf_counter() - started
+        self.handshakes += 1
+        self.handshake_total += elapsed
+        self.handshake_max = max(self.handshake_max, elapsed)
+        self.connects += 1
+        if state.connected_before:
+            self.reconnects += 1
+        state.connected_before = True
+        return vc
+
+    def _start_connect(self, state: GuildConnection, channel):
+        if state.pending is None or state.pending.done():
+            state.pending = asyncio.create_task(self._connect(state, channel))
+        return state.pending
+
+    async def _wait_connected(self, vc) -> bool:
+        # discord.py is resuming a dropped connection on its own
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not vc.is_connected():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    def warm(self, guild_id: int, channel_id: int):
+        """Start the handshake in the background if the guild isn't connected."""
+        if self.bot is None:
+            return
+        state = self._state(guild_id)
+        state.last_used = time.monotonic()
+
+        guild = self.bot.get_guild(guild_id)
+        if guild is None or guild.voice_client is not None:
+            return
+        channel = guild.get_channel(channel_id)
+        if channel is not None:
+            self._start_connect(state, channel)
+
+    async def acquire(self, guild_id: int, channel_id: int):
+        """Voice client in `channel_id`, or None if we can't get there."""
+        guild = self.bot.get_guild(guild_id) if self.bot else None
+        channel = guild.get_channel(channel_id) if guild else None
+        if channel is None:
+            return None
+
+        state = self._state(guild_id)
+        state.last_used = time.monotonic()
+
+        if guild.voice_client is None:
+            await asyncio.shield(self._start_connect(state, channel))
+
+        vc = guild.voice_client
+        if vc is None or not await self._wait_connected(vc):
+            return None
+
+        if vc.channel != channel:
+            await asyncio.wait_for(vc.move_to(channel), CONNECT_TIMEOUT)
+            self.moves += 1
+
+        state.last_used = time.monotonic()
+        return vc
+
+    def release(self, guild_id: int):
+        self._state(guild_id).last_used = time.monotonic()
+
+    # ---------------- IDLE SWEEP ----------------
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print("❌ Voice sweep error:", e)
+
+    async def sweep(self):
+        now = time.monotonic()
+        for vc in list(self.bot.voice_clients):
+            state = self._state(vc.guild.id)
+            if vc.is_playing() or (state.pending and not state.pending.done()):
+                state.last_used = now
+                continue
+            if now - state.last_used < self.idle_seconds:
+                continue
+
+            state.closing = True
+            try:
+                await vc.disconnect()
+                self.idle_disconnects += 1
+            finally:
+                state.closing = False
+
+    async def on_voice_state_update(self, member, before, after):
+        if member.id != self.bot.user.id:
+            return
+        if before.channel is not None and after.channel is None:
+            if not self._state(member.guild.id).closing:
+                self.drops += 1
+
+    # ---------------- STATS ----------------
+    def snapshot(self):
+        clients = list(self.bot.voice_clients) if self.bot else []
+        return {
+            "connected": sum(1 for vc in clients if vc.is_connected()),
+            "playing": sum(1 for vc in clients if vc.is_playing()),
+            "connecting": sum(1 for s in self.guilds.values() if s.pending and not s.pending.done()),
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "moves": self.moves,
+            "idle_disconnects": self.idle_disconnects,
+            "drops": self.drops,
+            "failures": self.failures,
+            "handshake_avg_ms": round(self.handshake_total / self.handshakes * 1000, 1) if self.handshakes else 0,
+            "handshake_max_ms": round(self.handshake_max * 1000, 1),
+        }
+
+
+connections = VoiceConnections()
@@ -0,0 +1,222 @@
+import time
+
+from utils.db import get_db
+
+DB_NAME = "bot.db"
+
+
+# =========================================================
+# VOICE SESSION TRACKER
+# =========================================================
+# One session per (user, guild) while the member is in a voice channel,
+# kept up to date from on_voice_state_update instead of walking every
+# channel on a timer. Time is accrued whenever the state changes and
+# whenever a consumer takes its share:
+#
+#   - total, muted, deafened and afk seconds per session
+#   - per consumer (levels, economy, ...) the seconds it hasn't paid
+#     out yet. A consumer can count only active time (not muted,
+#     deafened or afk) and skip the first `warmup` seconds of a session
+#
+# Join times are stored in voice_sessions so a restart doesn't reset
+# them; on ready the sessions are rebuilt from the channels' voice
+# states. Time while the bot was offline is not accrued.
+
+class VoiceSession:
+    __slots__ = (
+        "user_id", "guild_id", "channel_id", "joined_at", "since",
+        "muted", "deafened", "afk",
+        "total", "muted_time", "deaf_time", "afk_time", "accrued",
+    )
+
+    def __init__(self, user_id: int, guild_id: int, joined_at: float, now: float):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.channel_id = None
+        self.joined_at = joined_at
+        self.since = now
+        self.muted = False
+        self.deafened = False
+        self.afk = False
+        self.total = 0.0
+        self.muted_time = 0.0
+        self.deaf_time = 0.0
+        self.afk_time = 0.0
+        self.accrued = {}   # consumer -> seconds not paid out yet
+
+    @property
+    def active(self) -> bool:
+        return not (self.muted or self.deafened or self.afk)
+
+    def apply(self, state):
+        self.channel_id = state.channel.id
+        self.muted = state.self_mute or state.mute
+        self.deafened = state.self_deaf or state.deaf
+        self.afk = state.afk
+
+
+class Consumer:
+    __slots__ = ("name", "active_only", "warmup")
+
+    def __init__(self, name: str, active_only: bool, warmup: float):
+        self.name = name
+        self.active_only = active_only
+        self.warmup = warmup
+
+
+class VoiceTracker:
+    def __init__(self):
+        self.sessions = {}      # (user_id, guild_id) -> VoiceSession
+        self.ended = []         # closed sessions with time not paid out yet
+        self.consumers = {}
+        self.bot = None
+
+    # ---------------- LIFECYCLE ----------------
+    def start(self, bot):
+        if self.bot is None:
+            self.bot = bot
+            bot.add_listener(self.on_voice_state_update)
+            bot.add_listener(self.on_ready)
+
+    def register(self, name: str, active_only: bool = False, warmup: float = 0):
+        # a new consumer only earns from now on
+        self._accrue_all(time.time())
+        self.consumers[name] = Consumer(name, active_only, warmup)
+
+    # ---------------- ACCRUAL ----------------
+    def _accrue(self, s: VoiceSession, now: float):
+        t0 = s.since
+        if now <= t0:
+            return
+        span = now - t0
+        s.total += span
+        if s.muted:
+            s.muted_time += span
+        if s.deafened:
+            s.deaf_time += span
+        if s.afk:
+            s.afk_time += span
+
+        for c in self.consumers.values():
+            if c.active_only and not s.active:
+                continue
+            start = max(t0, s.joined_at + c.warmup)
+            if now > start:
+                s.accrued[c.name] = s.accrued.get(c.name, 0.0) + (now - start)
+        s.since = now
+
+    def _accrue_all(self, now: float):
+        for s in self.sessions.values():
+            self._accrue(s, now)
+
+    def _close(self, key, now: float):
+        s = self.sessions.pop(key)
+        self._accrue(s, now)
+        if any(s.accrued.values()):
+            self.ended.append(s)
+
+    def take(self, name: str, unit: float):
+        """Whole `unit`s of accrued time for a consumer: [(guild_id, user_id, units)].
+
+        Leftover time stays with the session; a closed session's leftover
+        (less than one unit) is dropped.
+        """
+        now = time.time()
+        self._accrue_all(now)
+        payouts = []
+
+        for s in self.sessions.values():
+            units = int(s.accrued.get(name, 0.0) // unit)
+            if units:
+                s.accrued[name] -= units * unit
+                payouts.append((s.guild_id, s.user_id, units))
+
+        for s in self.ended:
+            units = int(s.accrued.pop(name, 0.0) // unit)
+            if units:
+                payouts.append((s.guild_id, s.user_id, units))
+        self.ended = [s for s in self.ended if any(s.accrued.values())]
+
+        return payouts
+
+    # ---------------- EVENTS ----------------
+    async def on_voice_state_update(self, member, before, after):
+        if member.bot:
+            return
+
+        now = time.time()
+        key = (member.id, member.guild.id)
+        s = self.sessions.get(key)
+
+        if after.channel is None:
+            if s is not None:
+                self._close(key, now)
+                await get_db(DB_NAME).execute(
+                    "DELETE FROM voice_sessions WHERE user_id=? AND guild_id=?", key
+                )
+            return
+
+        if s is None:
+            s = self.sessions[key] = VoiceSession(member.id, member.guild.id, now, now)
+            s.apply(after)
+            await get_db(DB_NAME).execute(
+                "INSERT OR REPLACE INTO voice_sessions (user_id, guild_id, channel_id, joined_at) "
+                "VALUES (?,?,?,?)",
+                (member.id, member.guild.id, s.channel_id, int(now))
+            )
+            return
+
+        self._accrue(s, now)
+        moved = s.channel_id != after.channel.id
+        s.apply(after)
+        if moved:
+            await get_db(DB_NAME).execute(
+                "UPDATE voice_sessions SET channel_id=? WHERE user_id=? AND guild_id=?",
+                (s.channel_id, member.id, member.guild.id)
+            )
+
+    async def on_ready(self):
+        await self.rebuild(self.bot.guilds)
+
+    # ---------------- REBUILD ----------------
+    async def rebuild(self, guilds):
+        """Reconcile sessions with the live voice states, e.g. after a restart."""
+        now = time.time()
+        db = get_db(DB_NAME)
+        stored = {
+            (user_id, guild_id): joined_at
+            for user_id, guild_id, joined_at in await db.fetchall(
+                "SELECT user_id, guild_id, joined_at FROM voice_sessions"
+            )
+        }
+
+        live = {}
+        for guild in guilds:
+            for channel in (*guild.voice_channels, *guild.stage_channels):
+                for user_id, state in channel.voice_states.items():
+                    member = guild.get_member(user_id)
+                    if member is not None and not member.bot:
+                        live[(user_id, guild.id)] = state
+
+        for key in [k for k in self.sessions if k not in live]:
+            self._close(key, now)
+
+        for key, state in live.items():
+            s = self.sessions.get(key)
+            if s is None:
+                joined_at = stored.get(key) or now
+                s = self.sessions[key] = VoiceSession(*key, min(joined_at, now), now)
+            else:
+                self._accrue(s, now)
+            s.apply(state)
+
+        async with db.transaction() as conn:
+            await conn.execute("DELETE FROM voice_sessions")
+            await conn.executemany(
+                "INSERT INTO voice_sessions (user_id, guild_id, channel_id, joined_at) VALUES (?,?,?,?)",
+                [(s.user_id, s.guild_id, s.channel_id, int(s.joined_at)) for s in self.sessions.values()]
+            )
+        print(f"🎙 Voice sessions rebuilt: {len(self.sessions)} members in voice")
+
+
+voice = VoiceTracker()
@@ -0,0 +1,373 @@
+import asyncio
+import json
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import aiohttp
+
+# ================= CONFIG =================
+API_BASE = "https://www.googleapis.com/youtube/v3"
+FEED_BASE = "https://www.youtube.com/feeds/videos.xml"
+HTTP_TIMEOUT = 10
+FETCH_CONCURRENCY = 8     # channels fetched at once per tick
+VIDEOS_PER_CALL = 50      # videos.list id limit
+RECENT_VIDEOS = 5         # newest uploads looked at per channel
+LIVE_RECHECK = 120        # seconds between status checks of a running stream
+UPCOMING_RECHECK = 60     # ... of a scheduled stream once it is due
+UPCOMING_LEAD = 300       # a scheduled stream is due this long before its start time
+QUOTA_COST = {"search": 100, "channels": 1, "playlistItems": 1, "videos": 1}
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # the daily quota resets at midnight Pacific
+
+NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+    "media": "http://search.yahoo.com/mrss/",
+}
+
+
+# =========================================================
+# YOUTUBE POLLER
+# =========================================================
+# Each channel's newest uploads come from its Atom feed (no quota),
+# requested with If-None-Match / If-Modified-Since so an unchanged feed
+# is a bodyless 304. If the feed fails, the uploads playlist
+# (playlistItems, 1 unit, with ETag) is used instead. The Data API is
+# only asked about videos we haven't seen (videos.list, 1 unit) and
+# about streams that are live or about to start, so a quiet channel
+# costs no quota at all; the old search.list path cost 200 per check.
+#
+# A tick polls every tracked channel once, however many guilds follow
+# it: the feeds are fetched concurrently (FETCH_CONCURRENCY at a time),
+# then every video that needs a status check, across all channels, is
+# resolved in videos.list calls of up to 50 ids.
+#
+# Quota is counted per tick and per Pacific day. The HTTP layer is any
+# object with `async get(url, params, headers) -> HttpResponse`, and
+# both base URLs can be pointed at a local stand-in server.
+
+class HttpResponse:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else {}
+
+
+class AiohttpTransport:
+    def __init__(self, timeout: float = HTTP_TIMEOUT):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+
+    async def get(self, url: str, params: dict = None, headers: dict = None) -> HttpResponse:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        async with self._session.get(url, params=params, headers=headers) as resp:
+            return HttpResponse(resp.status, dict(resp.headers), await resp.read())
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class Video:
+    __slots__ = ("video_id", "title", "thumbnail", "status", "scheduled", "checked")
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.title = ""
+        self.thumbnail = None
+        self.status = None        # liveBroadcastContent: live / upcoming / none
+        self.scheduled = None     # scheduled start (epoch) of an upcoming stream
+        self.checked = 0.0
+
+    def due(self, now: float) -> bool:
+        """Does this video need a videos.list status check?"""
+        if self.status is None:
+            return True
+        if self.status == "live":
+            return now - self.checked >= LIVE_RECHECK
+        if self.status == "upcoming":
+            if self.scheduled is not None and time.time() < self.scheduled - UPCOMING_LEAD:
+                return False
+            return now - self.checked >= UPCOMING_RECHECK
+        return False
+
+    def to_alert(self):
+        if self.status == "live":
+            kind = "🔴 LIVE"
+        elif "#short" in self.title.lower():
+            kind = "🎬 SHORTS"
+        else:
+            kind = "📺 VIDEO"
+        return {
+            "video_id": self.video_id,
+            "title": self.title,
+            "url": f"https://youtu.be/{self.video_id}",
+            "thumbnail": self.thumbnail,
+            "type": kind,
+        }
+
+
+class ChannelState:
+    __slots__ = ("channel_id", "feed_etag", "feed_modified", "playlist_etag", "recent", "videos")
+
+    def __init__(self, channel_id: str):
+        self.channel_id = channel_id
+        self.feed_etag = None
+        self.feed_modified = None
+        self.playlist_etag = None
+        self.recent = []          # video ids, newest first
+        self.videos = {}
+
+    @property
+    def uploads_playlist(self) -> str:
+        # every channel's uploads playlist is its id with UC -> UU
+        return "UU" + self.channel_id[2:]
+
+    def merge(self, entries):
+        """Take the newest (video_id, title, thumbnail) entries."""
+        videos = {}
+        for video_id, title, thumbnail in entries:
+            video = self.videos.get(video_id) or Video(video_id)
+            video.title = title or video.title
+            video.thumbnail = video.thumbnail or thumbnail
+            videos[video_id] = video
+        self.videos = videos
+        self.recent = list(videos)
+
+    def current(self):
+        """The stream that's live, else the newest upload that isn't upcoming."""
+        videos = [self.videos[v] for v in self.recent]
+        for video in videos:
+            if video.status == "live":
+                return video
+        for video in videos:
+            if video.status == "none":
+                return video
+        return None
+
+
+class YouTubePoller:
+    def __init__(self, api_key: str, http=None, api_base: str = API_BASE, feed_base: str = FEED_BASE):
+        self.api_key = api_key
+        self.http = http or AiohttpTransport()
+        self.api_base = api_base.rstrip("/")
+        self.feed_base = feed_base
+        self.channels = {}
+
+        self.ticks = 0
+        self.tick_quota = 0
+        self.tick_started = 0.0
+        self.last_tick_quota = 0
+        self.last_tick_ms = 0.0
+        self.last_tick_channels = 0
+        self.quota_day = None
+        self.quota_today = 0
+        self.calls = Counter()      # endpoint -> requests
+        self.not_modified = 0
+        self.feed_fallbacks = 0
+
+    async def close(self):
+        if hasattr(self.http, "close"):
+            await self.http.close()
+
+    # ---------------- QUOTA ----------------
+    def begin_tick(self):
+        self.tick_quota = 0
+        self.tick_started = time.perf_counter()
+
+    def end_tick(self):
+        self.ticks += 1
+        self.last_tick_quota = self.tick_quota
+        self.last_tick_ms = (time.perf_counter() - self.tick_started) * 1000
+
+    def _spend(self, endpoint: str):
+        day = datetime.now(QUOTA_TZ).date()
+        if day != self.quota_day:
+            self.quota_day = day
+            self.quota_today = 0
+        cost = QUOTA_COST[endpoint]
+        self.tick_quota += cost
+        self.quota_today += cost
+
+    # ---------------- HTTP ----------------
+    async def _api(self, endpoint: str, params: dict, etag: str = None):
+        """(json, etag) from the Data API; json is None on 304 Not Modified."""
+        self._spend(endpoint)
+        self.calls[endpoint] += 1
+        resp = await self.http.get(
+            f"{self.api_base}/{endpoint}",
+            params={**params, "key": self.api_key},
+            headers={"If-None-Match": etag} if etag else {}
+        )
+        if resp.status == 304:
+            self.not_modified += 1
+            return None, etag
+
+        data = resp.json()
+        if resp.status != 200:
+            message = data.get("error", {}).get("message", "") if isinstance(data, dict) else ""
+            raise RuntimeError(f"YouTube {endpoint} {resp.status}: {message}")
+        return data, resp.headers.get("etag") or data.get("etag")
+
+    async def _feed(self, state: ChannelState):
+        headers = {}
+        if state.feed_etag:
+            headers["If-None-Match"] = state.feed_etag
+        if state.feed_modified:
+            headers["If-Modified-Since"] = state.feed_modified
+
+        self.calls["feed"] += 1
+        resp = await self.http.get(self.feed_base, params={"channel_id": state.channel_id}, headers=headers)
+        if resp.status == 304:
+            self.not_modified += 1
+            return None
+        if resp.status != 200:
+            raise RuntimeError(f"YouTube feed {resp.status}")
+
+        root = ET.fromstring(resp.body)
+        entries = []
+        for entry in root.findall("atom:entry", NS)[:RECENT_VIDEOS]:
+            thumb = entry.find("media:group/media:thumbnail", NS)
+            entries.append((
+                entry.findtext("yt:videoId", namespaces=NS),
+                entry.findtext("atom:title", namespaces=NS),
+                thumb.get("url") if thumb is not None else None,
+            ))
+
+        state.feed_etag = resp.headers.get("etag")
+        state.feed_modified = resp.headers.get("last-modified")
+        return entries
+
+    async def _playlist(self, state: ChannelState):
+        data, etag = await self._api("playlistItems", {
+            "part": "snippet",
+            "playlistId": state.uploads_playlist,
+            "maxResults": RECENT_VIDEOS,
+        }, state.playlist_etag)
+        if data is None:
+            return None
+
+        state.playlist_etag = etag
+        entries = []
+        for item in data.get("items", []):
+            snippet = item["snippet"]
+            entries.append((
+                snippet["resourceId"]["videoId"],
+                snippet.get("title"),
+                snippet.get("thumbnails", {}).get("high", {}).get("url"),
+            ))
+        return entries
+
+    async def _uploads(self, state: ChannelState):
+        """Newest uploads, or None if nothing changed since last time."""
+        try:
+            return await self._feed(state)
+        except Exception as e:
+            self.feed_fallbacks += 1
+            print(f"⚠️ YouTube feed failed for {state.channel_id}, using uploads playlist:", e)
+            return await self._playlist(state)
+
+    async def _refresh(self, videos):
+        """Live/upcoming status for videos, in videos.list calls of up to 50 ids."""
+        now = time.monotonic()
+        for i in range(0, len(videos), VIDEOS_PER_CALL):
+            chunk = {v.video_id: v for v in videos[i:i + VIDEOS_PER_CALL]}
+            data, _ = await self._api("videos", {
+                "part": "snippet,liveStreamingDetails",
+                "id": ",".join(chunk),
+            })
+
+            for item in data.get("items", []):
+                video = chunk.get(item["id"])
+                if video is None:
+                    continue
+                snippet = item["snippet"]
+                video.title = snippet.get("title", video.title)
+                video.thumbnail = snippet.get("thumbnails", {}).get("high", {}).get("url") or video.thumbnail
+                video.status = snippet.get("liveBroadcastContent", "none")
+                start = item.get("liveStreamingDetails", {}).get("scheduledStartTime")
+                video.scheduled = datetime.fromisoformat(start.replace("Z", "+00:00")).timestamp() if start else None
+
+            for video in chunk.values():
+                video.checked = now
+                if video.status is None:
+                    # private or deleted before we looked
+                    video.status = "gone"
+
+    # ---------------- PUBLIC ----------------
+    async def resolve_handle(self, handle: str):
+        data, _ = await self._api("channels", {"part": "id", "forHandle": f"@{handle}"})
+        items = data.get("items") if data else None
+        return items[0]["id"] if items else None
+
+    def _state(self, channel_id: str) -> ChannelState:
+        state = self.channels.get(channel_id)
+        if state is None:
+            state = self.channels[channel_id] = ChannelState(channel_id)
+        return state
+
+    async def poll(self, channel_ids) -> dict:
+        """channel id -> alert dict for its live stream or newest video.
+
+        Channels whose uploads couldn't be fetched this tick are left out.
+        """
+        gate = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(state: ChannelState) -> bool:
+            async with gate:
+                try:
+                    entries = await self._uploads(state)
+                except Exception as e:
+                    print(f"❌ YouTube fetch error for {state.channel_id}:", e)
+                    return False
+            if entries is not None:
+                state.merge(entries)
+            return True
+
+        states = [self._state(channel_id) for channel_id in dict.fromkeys(channel_ids)]
+        fetched = await asyncio.gather(*(fetch(state) for state in states))
+        states = [state for state, ok in zip(states, fetched) if ok]
+        self.last_tick_channels = len(states)
+
+        now = time.monotonic()
+        due = [v for state in states for v in state.videos.values() if v.due(now)]
+        if due:
+            try:
+                await self._refresh(due)
+            except Exception as e:
+                # statuses we already know still stand
+                print("❌ YouTube videos.list error:", e)
+
+        latest = {}
+        for state in states:
+            video = state.current()
+            latest[state.channel_id] = video.to_alert() if video else None
+        return latest
+
+    def forget(self, keep):
+        """Drop state for channels no longer tracked anywhere."""
+        for channel_id in list(self.channels):
+            if channel_id not in keep:
+                del self.channels[channel_id]
+
+    def snapshot(self):
+        return {
+            "channels": len(self.channels),
+            "ticks": self.ticks,
+            "last_tick_quota": self.last_tick_quota,
+            "last_tick_ms": round(self.last_tick_ms, 1),
+            "last_tick_channels": self.last_tick_channels,
+            "quota_today": self.quota_today,
+            "not_modified": self.not_modified,
+            "feed_fallbacks": self.feed_fallbacks,
+            "calls": dict(self.calls),
+        }